@@ -0,0 +1,60 @@
+import argparse, asyncio, sys, time
+import pandas as pd
+from tqdm import tqdm
+from utils.Backend_Clients import run_sync
+from utils.Comparison import compare_reports, OLLAMA_MODEL, OPENAI_MODEL
+from utils.Agreement import agreement, summarize
+from batch import read_reports, RESIDENT_COLUMN, ATTENDING_COLUMN
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Fused Structured and Multi-Agent styles side by side and report how often they agree.")
+    parser.add_argument("input", help="CSV with 'V1 - resident' and 'V2 - attending' columns (e.g. data/Sample_Reports.csv)")
+    parser.add_argument("--model", required=True, choices=OLLAMA_MODEL + OPENAI_MODEL)
+    parser.add_argument("--limit", type=int, default=None, help="only compare the first N rows")
+    parser.add_argument("--concurrency", type=int, default=2, help="report pairs processed at once")
+    parser.add_argument("--output", default=None, help="optional CSV with the per-row scores")
+    parser.add_argument("--encoding", default=None)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache")
+    return parser.parse_args(argv)
+
+async def run_style(resident: str, attending: str, style: str, args):
+    start = time.perf_counter()
+    _, table = await compare_reports(resident, attending, args.model, "Table Output", style, use_cache=not args.no_cache)
+    return table, time.perf_counter() - start
+
+async def run_agreement(args) -> int:
+    reports = read_reports(args.input, args.encoding)
+    pairs = [
+        (row, str(resident), str(attending))
+        for row, (resident, attending) in enumerate(zip(reports[RESIDENT_COLUMN], reports[ATTENDING_COLUMN]))
+        if str(resident).strip() and str(attending).strip()
+    ][:args.limit]
+
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    progress = tqdm(total=len(pairs), unit="report")
+
+    async def run_pair(row: int, resident: str, attending: str) -> dict:
+        async with semaphore:
+            (fused, fused_time), (multi, multi_time) = await asyncio.gather(
+                run_style(resident, attending, "Fused Structured", args),
+                run_style(resident, attending, "Multi-Agent", args),
+            )
+        progress.update(1)
+        return {"Number": row + 1, "Fused Seconds": fused_time, "Multi-Agent Seconds": multi_time, **agreement(fused, multi)}
+
+    scores = await asyncio.gather(*(run_pair(*pair) for pair in pairs))
+    progress.close()
+    if not scores:
+        print("no report pairs to compare", file=sys.stderr)
+        return 1
+
+    per_row = pd.DataFrame(scores)
+    if args.output:
+        per_row.to_csv(args.output, index=False)
+    print("Fused Structured vs Multi-Agent (Multi-Agent as reference):")
+    print(summarize(scores).to_string(index=False, float_format="%.2f"))
+    print(f"\nMean latency per comparison: fused {per_row['Fused Seconds'].mean():.2f}s, multi-agent {per_row['Multi-Agent Seconds'].mean():.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_sync(run_agreement(parse_args())))
@@ -0,0 +1,188 @@
+import argparse, asyncio, hashlib, json, os, sys
+import pandas as pd
+from tqdm import tqdm
+from utils.Backend_Clients import run_sync
+from utils.Local_Detectors import DETECTORS
+from utils.Ollama_Agent import preload_Ollama, KEEP_ALIVE
+from utils.Comparison import compare_reports, OLLAMA_MODEL, OPENAI_MODEL
+from utils.Result_Export import write_records
+from utils.Results_Store import get_results_store
+from utils.Triage import TRIAGE_THRESHOLD
+
+OUTPUT_TYPE = {"paragraph": "Paragraph Output", "table": "Table Output"}
+AGENT_STYLE = {"single": "Single Agent", "multi": "Multi-Agent", "fused": "Fused Structured"}
+CATEGORY_MODE = {"llm": "LLM", "local": "Local", "confirm": "Local + LLM Confirmation"}
+
+RESIDENT_COLUMN = "V1 - resident"
+ATTENDING_COLUMN = "V2 - attending"
+# Optional; without it the exam type is read from the reports
+EXAM_COLUMN = "Exam Type"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare resident/attending report pairs from a CSV without the Streamlit UI.")
+    parser.add_argument("input", help="CSV with 'V1 - resident' and 'V2 - attending' columns (e.g. data/Sample_Reports.csv)")
+    parser.add_argument("--output", default="comparison_outputs.csv", help="file to write, same columns as the UI download; .parquet and .jsonl select those formats")
+    parser.add_argument("--model", required=True, choices=OLLAMA_MODEL + OPENAI_MODEL)
+    parser.add_argument("--format", default="table", choices=OUTPUT_TYPE.keys())
+    parser.add_argument("--agents", default="multi", choices=AGENT_STYLE.keys())
+    parser.add_argument("--concurrency", type=int, default=2, help="report pairs processed at once")
+    parser.add_argument("--agent-concurrency", type=int, default=8, help="agent calls in flight per report pair (the model's RCT_*_CONCURRENCY limit still applies)")
+    parser.add_argument("--checkpoint", default=None, help="JSONL of finished rows (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--encoding", default=None, help="input encoding (default: UTF-8, falling back to cp1252)")
+    parser.add_argument("--prune-sections", action="store_true", help="only send report sections that differ between V1 and V2")
+    parser.add_argument("--section-memo", action="store_true", help="multi agents: reuse stored verdicts for section pairs already seen (utils/Section_Memo.py)")
+    parser.add_argument("--category-mode", action="append", default=[], metavar="CATEGORY=MODE",
+                        help=f"run a category locally, e.g. 3=local or 6=confirm (categories: {', '.join(map(str, DETECTORS))}; modes: {', '.join(CATEGORY_MODE)})")
+    parser.add_argument("--triage-model", default=None, choices=OLLAMA_MODEL + OPENAI_MODEL,
+                        help="multi agents: cascade mode, where this fast model picks the categories and sections sent to --model (utils/Triage.py)")
+    parser.add_argument("--triage-threshold", action="append", default=[], metavar="[CATEGORY=]PERCENT",
+                        help=f"likelihood (0-100) from the triage model at which a category is escalated, for all categories or one; later values win (default: {TRIAGE_THRESHOLD})")
+    parser.add_argument("--keep-alive", default=KEEP_ALIVE, help="Ollama keep_alive for the run (default: %(default)s)")
+    parser.add_argument("--num-ctx", type=int, default=0, help="Ollama context window (default: sized to each request)")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache")
+    parser.add_argument("--store-results", action="store_true", help="also add the results to the results store (session 'batch') for the Analytics page")
+    args = parser.parse_args(argv)
+    args.category_modes = {}
+    for item in args.category_mode:
+        category, _, mode = item.partition("=")
+        if not category.isdigit() or int(category) not in DETECTORS or mode not in CATEGORY_MODE:
+            parser.error(f"invalid --category-mode {item!r}")
+        args.category_modes[int(category)] = CATEGORY_MODE[mode]
+    args.triage_thresholds = parse_thresholds(parser, args.triage_threshold)
+    return args
+
+def parse_thresholds(parser, items: list) -> dict:
+    # ["30", "5=10"] -> {1: 30, ..., 7: 30, 5: 10}
+    thresholds = {}
+    for item in items:
+        category, _, percent = item.rpartition("=")
+        if not percent.isdigit() or int(percent) > 100 or category and category not in [str(c) for c in range(1, 8)]:
+            parser.error(f"invalid --triage-threshold {item!r}")
+        thresholds.update({int(category): int(percent)} if category else dict.fromkeys(range(1, 8), int(percent)))
+    return thresholds
+
+def read_reports(path: str, encoding: str = None) -> pd.DataFrame:
+    if encoding:
+        return pd.read_csv(path, encoding=encoding).fillna("")
+    try:
+        return pd.read_csv(path, encoding="utf-8-sig").fillna("")
+    except UnicodeDecodeError:
+        # Spreadsheets exported from Excel on Windows (like data/Sample_Reports.csv)
+        return pd.read_csv(path, encoding="cp1252").fillna("")
+
+def run_key(args) -> str:
+    # The settings that shape a row's result; checkpoint entries from a run
+    # with other settings are not reused
+    return digest([args.model, args.format, args.agents, args.prune_sections, sorted(args.category_modes.items()),
+                   args.triage_model, sorted(args.triage_thresholds.items())])
+
+def digest(value) -> str:
+    return hashlib.sha256(json.dumps(value).encode("utf-8")).hexdigest()
+
+def load_checkpoint(path: str, run: str, inputs: list) -> tuple:
+    # ({row: record}, entries ignored). inputs holds each row's digest, so an
+    # entry is only kept for the same run settings and the same report pair.
+    done = {}
+    ignored = 0
+    if not os.path.exists(path):
+        return done, ignored
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            row = entry["row"]
+            if entry.get("run") != run or row >= len(inputs) or entry.get("input") != inputs[row]:
+                ignored += 1
+                continue
+            done[row] = entry["record"]
+    return done, ignored
+
+def write_output(path: str, done: dict):
+    write_records([(row + 1, done[row]) for row in sorted(done)], path)
+
+def escalation_summary(records) -> str:
+    # Cascade mode: how much of the work the triage model passed on
+    records = [record for record in records if record.get("Triage Categories")]
+    categories = sum(record["Triage Categories"] for record in records)
+    sections = sum(record["Triage Sections"] for record in records)
+    escalated = sum(record["Escalated Categories"] for record in records)
+    escalated_sections = sum(record["Escalated Sections"] for record in records)
+    return (f"escalated {escalated} of {categories} category checks ({escalated / max(1, categories):.0%}) and "
+            f"{escalated_sections} of {sections} section checks ({escalated_sections / max(1, sections):.0%})")
+
+async def run_batch(args) -> int:
+    reports = read_reports(args.input, args.encoding)
+    missing = {RESIDENT_COLUMN, ATTENDING_COLUMN} - set(reports.columns)
+    if missing:
+        raise SystemExit(f"{args.input} is missing columns: {', '.join(sorted(missing))}")
+
+    checkpoint = args.checkpoint or args.output + ".checkpoint.jsonl"
+    exam_types = reports[EXAM_COLUMN] if EXAM_COLUMN in reports.columns else [""] * len(reports)
+    rows = list(zip(reports[RESIDENT_COLUMN], reports[ATTENDING_COLUMN], exam_types))
+    run = run_key(args)
+    inputs = [digest([str(resident), str(attending), str(exam_type)]) for resident, attending, exam_type in rows]
+    done, ignored = load_checkpoint(checkpoint, run, inputs)
+    if ignored:
+        print(f"ignoring {ignored} checkpoint entries from other settings or input rows", file=sys.stderr)
+    pending = [
+        (row, resident, attending, exam_type)
+        for row, (resident, attending, exam_type) in enumerate(rows)
+        if row not in done and str(resident).strip() and str(attending).strip()
+    ]
+    print(f"{len(done)} rows already done, {len(pending)} to process", file=sys.stderr)
+
+    ollama_options = {"keep_alive": args.keep_alive, "num_ctx": args.num_ctx}
+    # Pay the model loads once up front rather than inside the first rows
+    for model in dict.fromkeys([args.model, args.triage_model]):
+        if pending and model in OLLAMA_MODEL:
+            try:
+                await preload_Ollama(model, ollama_options)
+            except Exception as e:
+                # The rows load the model themselves, or fail one by one
+                print(f"could not preload {model}: {e!r}", file=sys.stderr)
+
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    failures = 0
+    progress = tqdm(total=len(pending), unit="report")
+
+    async def run_row(row: int, resident: str, attending: str, exam_type: str):
+        nonlocal failures
+        async with semaphore:
+            try:
+                record, _ = await compare_reports(
+                    str(resident), str(attending), args.model, OUTPUT_TYPE[args.format], AGENT_STYLE[args.agents],
+                    max_concurrency=args.agent_concurrency, use_cache=not args.no_cache,
+                    prune_sections=args.prune_sections, category_modes=args.category_modes, section_memo=args.section_memo,
+                    ollama_options=ollama_options, exam_type=str(exam_type).strip() or None, session="batch", admit=False,
+                    triage_model=args.triage_model, triage_thresholds=args.triage_thresholds)
+            except Exception as e:
+                failures += 1
+                tqdm.write(f"row {row + 1} failed: {e!r}", file=sys.stderr)
+                return
+            finally:
+                progress.update(1)
+        # Only the event loop thread writes, so appends never interleave
+        done[row] = record
+        with open(checkpoint, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"row": row, "run": run, "input": inputs[row], "record": record}) + "\n")
+        if args.store_results:
+            get_results_store().add(record, "batch")
+
+    await asyncio.gather(*(run_row(*item) for item in pending))
+    progress.close()
+
+    write_output(args.output, done)
+    print(f"wrote {len(done)} rows to {args.output} ({failures} failed)", file=sys.stderr)
+    if args.section_memo:
+        lookups = sum(record.get("Memo Lookups", 0) for record in done.values())
+        hits = sum(record.get("Memo Hits", 0) for record in done.values())
+        print(f"reused {hits} of {lookups} section verdicts", file=sys.stderr)
+    if args.triage_model:
+        print(escalation_summary(done.values()), file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(run_sync(run_batch(parse_args())))
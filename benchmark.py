@@ -0,0 +1,346 @@
+import argparse, asyncio, json, os, sys, tempfile, time
+from contextlib import contextmanager
+import pandas as pd
+from utils.Fake_LLM import FakeLLMServer
+from utils import Prompt_Layout
+
+STYLES = {"single": "Single Agent", "multi": "Multi-Agent", "fused": "Fused Structured"}
+OUTPUT_TYPE = {"paragraph": "Paragraph Output", "table": "Table Output"}
+PERCENTILES = [50, 90, 95, 99]
+# Post-processing steps timed inside each comparison: row parsing (streamed or
+# not), building the table, the fused JSON, the stored CSV and the download
+STEPS = ["RowParser", "TableStream", "structured2df", "CSV export", "write_records"]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay report pairs through the comparison pipeline against a local stand-in LLM server and report latency and throughput.")
+    parser.add_argument("--input", default="data/Sample_Reports.csv", help="CSV with 'V1 - resident' and 'V2 - attending' columns")
+    parser.add_argument("--backend", default="both", choices=["ollama", "openai", "both"])
+    parser.add_argument("--styles", nargs="+", default=["single", "multi"], choices=STYLES.keys())
+    parser.add_argument("--format", default="table", choices=OUTPUT_TYPE.keys())
+    parser.add_argument("--ollama-model", default="llama3.3:latest")
+    parser.add_argument("--openai-model", default="gpt-4.1-mini")
+    parser.add_argument("--concurrency", type=int, default=4, help="report pairs in flight at once")
+    parser.add_argument("--repeat", type=int, default=1, help="times each report pair is replayed")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in server seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stand-in server seconds per streamed piece")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of stand-in requests that stall for --stall-seconds")
+    parser.add_argument("--stall-seconds", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stand-in requests answered with a 503")
+    parser.add_argument("--prefill-delay", type=float, default=0.0, help="stand-in server seconds per 1000 prompt tokens not in its prompt cache")
+    parser.add_argument("--prompt-layout", default=Prompt_Layout.PROMPT_LAYOUT, choices=Prompt_Layout.LAYOUTS, help="message layout (default: %(default)s)")
+    parser.add_argument("--triage-model", default=None, help="multi: cascade mode, triaging every comparison with this model first (e.g. gpt-4.1-mini)")
+    parser.add_argument("--service", action="store_true", help="send the comparisons through the HTTP service (service.py, started on a local port)")
+    parser.add_argument("--stream", action="store_true", help="stream the single-agent / paragraph responses as the UI does")
+    parser.add_argument("--startup", action="store_true", help="measure home.py cold start and rerun time instead")
+    parser.add_argument("--startup-runs", type=int, default=3, help="fresh processes to time the cold start in")
+    parser.add_argument("--startup-budget", type=float, default=2.0, help="allowed median first run of home.py, in seconds (default: %(default)s)")
+    parser.add_argument("--rerun-budget", type=float, default=0.15, help="allowed median rerun of home.py, in seconds (default: %(default)s)")
+    parser.add_argument("--analytics", type=int, default=0, metavar="N", help="time the analytics queries over N synthetic comparisons instead")
+    parser.add_argument("--query-budget", type=float, default=1.0, help="allowed slowest analytics query, in seconds (default: %(default)s)")
+    parser.add_argument("--save", default=None, help="write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", default=None, help="JSON from an earlier --save; exit 1 if any metric regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline (default: %(default)s)")
+    return parser.parse_args(argv)
+
+@contextmanager
+def timed(owner, name: str, label: str, timings: dict):
+    # Temporarily wraps owner.name so every call adds its duration to timings[label]
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            timings[label].append(time.perf_counter() - start)
+
+    setattr(owner, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(owner, name, original)
+
+def summarize(latencies: list, wall: float, timings: dict, records: list) -> dict:
+    series = pd.Series(latencies)
+    calls = [call for record in records for call in json.loads(record["Call Timings"])]
+    result = {"comparisons": len(latencies), "wall_s": wall, "throughput_per_s": len(latencies) / wall if wall else 0.0, "mean_s": series.mean(),
+              "retries": sum(call.get("Retries", 0) for call in calls), "hedged": sum(bool(call.get("Hedged")) for call in calls),
+              "input_tokens": sum(call.get("Input Tokens") or 0 for call in calls),
+              # OpenAI reports cached tokens; Ollama only a shorter prefill
+              "cached_tokens": sum(call.get("Cached Tokens") or 0 for call in calls),
+              "prefill_s": sum(call.get("Prefill (s)") or 0 for call in calls),
+              # Share of triaged categories sent on to the model (cascade mode)
+              "escalated": sum(record.get("Escalated Categories", 0) for record in records) / max(1, sum(record.get("Triage Categories", 0) for record in records)),
+              "model_calls": sum(call["Agent"] != "Triage" for call in calls)}
+    for p in PERCENTILES:
+        result[f"p{p}_s"] = series.quantile(p / 100)
+    for step in STEPS:
+        result[f"{step}_calls"] = len(timings[step])
+        result[f"{step}_ms"] = sum(timings[step]) * 1000
+    return result
+
+async def run_path(pairs: list, model: str, style: str, args, compare_reports) -> tuple:
+    output_type = OUTPUT_TYPE[args.format]
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    latencies = []
+    records = []
+    on_text = (lambda text: None) if args.stream else None
+
+    async def run_one(resident: str, attending: str):
+        async with semaphore:
+            start = time.perf_counter()
+            record, _ = await compare_reports(resident, attending, model, output_type, style, use_cache=False, on_text=on_text, admit=False,
+                                              triage_model=args.triage_model)
+            latencies.append(time.perf_counter() - start)
+            records.append(record)
+
+    # One untimed comparison first so client pools and agent caches are warm
+    await run_one(*pairs[0])
+    latencies.clear()
+    records.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(resident, attending) for resident, attending in pairs * args.repeat))
+    wall = time.perf_counter() - start
+    return latencies, records, wall
+
+# Run in a fresh interpreter so every import is cold. The first run of the
+# script is what a new session (or a new container) waits for; reruns happen
+# on every widget interaction.
+STARTUP_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+app.run()
+first = time.perf_counter() - start
+app.selectbox[0].select(sys.argv[2]).run()
+app.selectbox[1].select("Table Output").run()
+app.selectbox[2].select("Multi-Agent").run()
+reruns = []
+for _ in range(int(sys.argv[3])):
+    start = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({"first_run_s": first, "reruns": reruns, "exception": bool(app.exception),
+                  "agents_imported": "agents" in sys.modules}))
+"""
+
+def measure_startup(args) -> int:
+    import subprocess, statistics
+    server = FakeLLMServer(latency=args.latency).start()
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, OLLAMA_BASE_URL=server.url, RCT_RESULTS_PATH=os.path.join(workdir, "results.sqlite"),
+               RCT_CACHE_PATH=os.path.join(workdir, "responses.sqlite"), PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    home = os.path.join(os.path.dirname(os.path.abspath(__file__)), "home.py")
+    results = {}
+    for model in [args.ollama_model, args.openai_model]:
+        runs = []
+        for _ in range(max(1, args.startup_runs)):
+            out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, home, model, "20"], env=env, capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        reruns = pd.Series([t for run in runs for t in run["reruns"]])
+        results[model] = {
+            "first_run_s": statistics.median(run["first_run_s"] for run in runs),
+            "rerun_p50_s": reruns.quantile(0.5),
+            "rerun_p95_s": reruns.quantile(0.95),
+            "agents_imported": any(run["agents_imported"] for run in runs),
+            "errors": sum(run["exception"] for run in runs),
+        }
+    server.shutdown()
+
+    print(f"home.py with each model selected ({args.startup_runs} fresh processes, 20 reruns each):")
+    print(pd.DataFrame.from_dict(results, orient="index").to_string(float_format="%.3f"))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    over = [f"{model} {metric}: {result[metric]:.3f} s > {budget} s"
+            for model, result in results.items()
+            for metric, budget in [("first_run_s", args.startup_budget), ("rerun_p50_s", args.rerun_budget)]
+            if result[metric] > budget]
+    over += [f"{model}: the script raised" for model, result in results.items() if result["errors"]]
+    if over:
+        print("\nOver budget:\n  " + "\n  ".join(over), file=sys.stderr)
+        return 1
+    print(f"\nwithin budget (first run {args.startup_budget} s, rerun {args.rerun_budget} s)")
+    return 0
+
+def measure_analytics(args) -> int:
+    # Synthetic history in the Analytics_Store layout: N comparisons with
+    # 0-15 difference rows each, spread over a year, in 20 part files
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from utils.Analytics_Store import AnalyticsStore, TABLES
+    rng = np.random.default_rng(0)
+    store = AnalyticsStore(tempfile.mkdtemp())
+    models = np.array([args.ollama_model, args.openai_model, "gpt-4o", "gemma3:27b"])
+    exams = np.array(["CT of the abdomen and pelvis with intravenous contrast", "CTA of the chest with intravenous contrast",
+                      "CT of the chest without intravenous contrast", "MR of the abdomen with MRCP", "Unknown"])
+    sections = np.array(["liver", "kidney / spleen / adrenal", "bone", "lung", "node", "bowel", "pancreas", "impression", "heart", "bladder"])
+    ids = np.arange(1, args.analytics + 1)
+    created = (time.time() - rng.uniform(0, 365 * 86400, len(ids))).astype("int64")
+    comparisons = {"result_id": ids, "created": created, "session": np.full(len(ids), "benchmark"),
+                   "model": rng.choice(models, len(ids)), "output_style": np.full(len(ids), "Table Output"),
+                   "agent_style": rng.choice(np.array(["Single Agent", "Multi-Agent", "Fused Structured"]), len(ids)),
+                   "exam_type": rng.choice(exams, len(ids)), "differences": rng.integers(0, 16, len(ids))}
+    owner = np.repeat(np.arange(len(ids)), comparisons["differences"])
+    differences = {"result_id": ids[owner], "created": created[owner], "model": comparisons["model"][owner],
+                   "agent_style": comparisons["agent_style"][owner], "exam_type": comparisons["exam_type"][owner]}
+    differences["section_key"] = differences["section"] = rng.choice(sections, len(owner))
+    differences["difference_type"] = rng.integers(1, 8, len(owner))
+    for name, columns in [("comparisons", comparisons), ("differences", differences)]:
+        table = pa.table({field.name: pa.array(columns[field.name]).cast(field.type) for field in TABLES[name]})
+        for part, first in enumerate(range(0, len(table), max(1, len(table) // 20))):
+            pq.write_table(table.slice(first, max(1, len(table) // 20)), os.path.join(store.path, name, f"part-{part:012d}.parquet"))
+
+    queries = {
+        "by exam type": lambda: store.category_counts("exam_type"),
+        "by model (rates)": lambda: store.category_counts("model", per_comparison=True),
+        "by week": lambda: store.category_counts("week"),
+        "by month, filtered": lambda: store.category_counts("month", models=[args.ollama_model], exam_types=[str(exams[0])]),
+        "top sections": lambda: store.top_sections(),
+    }
+    start = time.perf_counter()
+    store.table("comparisons"), store.table("differences")
+    results = {"load parquet": {"seconds": time.perf_counter() - start}}
+    for label, query in queries.items():
+        runs = []
+        for _ in range(5):
+            start = time.perf_counter()
+            query()
+            runs.append(time.perf_counter() - start)
+        results[label] = {"seconds": sorted(runs)[len(runs) // 2]}
+    print(f"analytics over {len(ids):,} comparisons / {len(owner):,} difference rows (median of 5):")
+    print(pd.DataFrame.from_dict(results, orient="index").to_string(float_format="%.3f"))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    over = [f"{label}: {result['seconds']:.3f} s > {args.query_budget} s" for label, result in results.items() if result["seconds"] > args.query_budget]
+    if over:
+        print("\nOver budget:\n  " + "\n  ".join(over), file=sys.stderr)
+        return 1
+    print(f"\nwithin budget ({args.query_budget} s per query)")
+    return 0
+
+def check_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    # Latency percentiles and post-processing time per comparison may not grow
+    # by more than tolerance; paths missing from the baseline are skipped
+    regressions = []
+    for path, result in results.items():
+        before = baseline.get(path)
+        if before is None:
+            continue
+        metrics = [f"p{p}_s" for p in PERCENTILES] + [f"{step}_ms" for step in STEPS]
+        for metric in metrics:
+            old, new = before.get(metric), result.get(metric)
+            if metric.endswith("_ms"):
+                old = old / before["comparisons"] if old is not None else None
+                new = new / result["comparisons"]
+            if old and new > old * (1 + tolerance):
+                regressions.append(f"{path} {metric}: {old:.4f} -> {new:.4f}")
+    return regressions
+
+def start_service() -> str:
+    # service.py under uvicorn in a thread; the backends then run on its loop
+    import threading, uvicorn
+    from service import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    threading.Thread(target=server.run, name="service", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    host, port = server.servers[0].sockets[0].getsockname()[:2]
+    return f"http://{host}:{port}"
+
+def service_compare(url: str):
+    # compare_reports over HTTP, for run_path
+    from utils import Service_Client
+    Service_Client.SERVICE_URL = url
+
+    async def compare(resident: str, attending: str, model: str, output_type: str, style: str, on_text=None, admit: bool = True, **options):
+        request = {"resident": resident, "attending": attending, "model": model, "output_type": output_type, "agent_style": style,
+                   "stream_text": on_text is not None, "wait": not admit, **options}
+        result = await Service_Client.compare(request, lambda update: None)
+        return result["record"], result["rows"]
+    return compare
+
+def main(args) -> int:
+    if args.startup:
+        return measure_startup(args)
+    if args.analytics:
+        return measure_analytics(args)
+    server = FakeLLMServer(latency=args.latency, token_delay=args.token_delay, stall_rate=args.stall_rate,
+                           stall_seconds=args.stall_seconds, error_rate=args.error_rate, prefill_delay=args.prefill_delay).start()
+    Prompt_Layout.PROMPT_LAYOUT = args.prompt_layout
+    # The backends read these when first imported / first used
+    os.environ["OLLAMA_BASE_URL"] = server.url
+    os.environ["OPENAI_BASE_URL"] = server.url + "/v1"
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    os.environ["RCT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "responses.sqlite")
+
+    service_url = start_service() if args.service else None
+    import utils.Comparison as comparison
+    from utils.Report_Parsing import RowParser, TableStream
+    from utils.Backend_Clients import run_sync
+    from utils import Result_Export
+    from batch import read_reports, RESIDENT_COLUMN, ATTENDING_COLUMN
+
+    reports = read_reports(args.input)
+    pairs = [
+        (str(resident), str(attending))
+        for resident, attending in zip(reports[RESIDENT_COLUMN], reports[ATTENDING_COLUMN])
+        if str(resident).strip() and str(attending).strip()
+    ]
+    if not pairs:
+        print(f"no report pairs in {args.input}", file=sys.stderr)
+        return 1
+
+    backends = {"ollama": args.ollama_model, "openai": args.openai_model}
+    models = [backends[args.backend]] if args.backend in backends else list(backends.values())
+    results = {}
+    for model in models:
+        for style in args.styles:
+            timings = {step: [] for step in STEPS}
+            with timed(RowParser, "feed", "RowParser", timings), \
+                 timed(RowParser, "close", "RowParser", timings), \
+                 timed(TableStream, "frame", "TableStream", timings), \
+                 timed(comparison, "structured2df", "structured2df", timings), \
+                 timed(pd.DataFrame, "to_csv", "CSV export", timings):
+                latencies, records, wall = run_sync(run_path(pairs, model, STYLES[style], args, service_compare(service_url) if service_url else comparison.compare_reports))
+            # The session download the UI builds from the results
+            with timed(Result_Export, "write_records", "write_records", timings):
+                Result_Export.write_records(list(enumerate(records, start=1)), os.devnull)
+            results[f"{model} / {STYLES[style]}"] = summarize(latencies, wall, timings, records)
+
+    table = pd.DataFrame(results).T
+    print(f"{len(pairs)} report pairs x {args.repeat}, {args.format} output, concurrency {args.concurrency}, "
+          f"stand-in latency {args.latency}s (+{args.token_delay}s per piece), "
+          f"{args.stall_rate:.0%} stalls of {args.stall_seconds}s, {args.error_rate:.0%} errors" + (f", through the HTTP service at {service_url}" if service_url else ""))
+    print("\nEnd-to-end latency (s) and throughput (comparisons/s):")
+    print(table[["comparisons", "mean_s"] + [f"p{p}_s" for p in PERCENTILES] + ["throughput_per_s", "retries", "hedged"]].to_string(float_format="%.3f"))
+    if args.triage_model:
+        print(f"\nCascade mode, triaged by {args.triage_model} (share of categories escalated, calls to the selected model):")
+        print(table[["escalated", "model_calls"]].to_string(float_format="%.3f"))
+    if args.prefill_delay:
+        print(f"\nPrompt tokens, {args.prompt_layout} layout (input, cached by OpenAI, seconds of prefill):")
+        print(table[["input_tokens", "cached_tokens", "prefill_s"]].to_string(float_format="%.1f"))
+    print("\nPost-processing time (ms, all comparisons):")
+    print(table[[f"{step}_ms" for step in STEPS]].to_string(float_format="%.2f"))
+    print(f"\nstand-in requests: {server.requests}")
+    server.shutdown()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = check_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against " + args.baseline + ":\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+        print(f"\nno regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
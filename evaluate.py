@@ -0,0 +1,187 @@
+import argparse, asyncio, json, sys
+import pandas as pd
+from tqdm import tqdm
+from utils.Backend_Clients import run_sync
+from utils.Comparison import compare_reports, OLLAMA_MODEL, OPENAI_MODEL
+from utils.Agreement import agreement, summarize, split_categories, label_categories, CATEGORIES
+from utils.Ollama_Agent import preload_Ollama
+from utils.Report_Parsing import parse_rows, rows2df
+from utils.Triage import TRIAGE_THRESHOLD
+from batch import read_reports, RESIDENT_COLUMN, ATTENDING_COLUMN, OUTPUT_TYPE, AGENT_STYLE
+
+LABEL_COLUMNS = ["Section", "Resident Report", "Attending Report", "Difference Type"]
+# Optional label column naming the report pair (1-based row of --reports)
+PAIR_COLUMN = "Number"
+# Word labels as used in data/Example.csv; anything else needs --label-map
+LABEL_ALIASES = {
+    "addition": "1", "deletion": "2", "negative finding": "3",
+    "simplified phrasing": "4", "compression": "4", "terminology standardization": "4",
+    "proofreading": "4", "stylistic/content balance": "4",
+    "diagnosis": "5", "follow-up": "6", "recommendation": "6", "certainty": "7",
+}
+PERCENTILES = [50, 95]
+# Triage column of the Multi-Agent runs without cascade mode
+NO_TRIAGE = "off"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run every model x agent style x output format over labeled report pairs and score them against the labels.")
+    parser.add_argument("labels", help="CSV in the data/Example.csv format (Section, Resident Report, Attending Report, Difference Type), optionally with a 'Number' column")
+    parser.add_argument("--reports", default=None, help="CSV with 'V1 - resident' and 'V2 - attending' columns whose rows the labels' Number refers to; "
+                                                         "without it each pair is rebuilt from its label rows")
+    parser.add_argument("--models", nargs="+", required=True, choices=OLLAMA_MODEL + OPENAI_MODEL)
+    parser.add_argument("--styles", nargs="+", default=list(AGENT_STYLE), choices=AGENT_STYLE.keys())
+    parser.add_argument("--formats", nargs="+", default=["table"], choices=OUTPUT_TYPE.keys())
+    parser.add_argument("--label-map", action="append", default=[], metavar="LABEL=CATEGORY", help='map a word label to a category, e.g. "Omission=2"')
+    parser.add_argument("--triage-model", default=None, choices=OLLAMA_MODEL + OPENAI_MODEL,
+                        help="also run the Multi-Agent style in cascade mode, triaged by this model, once per --triage-thresholds value")
+    parser.add_argument("--triage-thresholds", nargs="+", type=int, default=[TRIAGE_THRESHOLD], metavar="PERCENT",
+                        help="escalation thresholds to compare (default: %(default)s); the triage answer is cached, so extra thresholds only cost the escalated calls")
+    parser.add_argument("--ollama-concurrency", type=int, default=2, help="comparisons in flight for the Ollama model being evaluated")
+    parser.add_argument("--openai-concurrency", type=int, default=8, help="comparisons in flight across the OpenAI models")
+    parser.add_argument("--repeat", type=int, default=1, help="times each comparison is run (use with --no-cache for latency samples)")
+    parser.add_argument("--output", default=None, help="optional CSV with the summary and per-category scores")
+    parser.add_argument("--details", default=None, help="optional CSV with the per-comparison scores and timings")
+    parser.add_argument("--encoding", default=None)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache")
+    args = parser.parse_args(argv)
+    args.aliases = dict(LABEL_ALIASES)
+    for item in args.label_map:
+        label, _, category = item.rpartition("=")
+        if not label or category not in CATEGORIES:
+            parser.error(f"invalid --label-map {item!r}")
+        args.aliases[label.strip().lower()] = category
+    return args
+
+def load_pairs(args) -> list:
+    # [(number, resident, attending, label rows)], one per labeled report pair
+    labels = read_reports(args.labels, args.encoding)
+    missing = set(LABEL_COLUMNS) - set(labels.columns)
+    if missing:
+        raise SystemExit(f"{args.labels} is missing columns: {', '.join(sorted(missing))}")
+    groups = labels.groupby(PAIR_COLUMN, sort=True) if PAIR_COLUMN in labels.columns else [(1, labels)]
+    reports = read_reports(args.reports, args.encoding) if args.reports else None
+    pairs = []
+    for number, rows in groups:
+        if reports is not None:
+            if not 1 <= int(number) <= len(reports):
+                raise SystemExit(f"{args.labels}: Number {number} is not a row of {args.reports}")
+            resident, attending = reports[RESIDENT_COLUMN].iloc[int(number) - 1], reports[ATTENDING_COLUMN].iloc[int(number) - 1]
+        else:
+            # Example.csv quotes each section, so the quotes make up the reports
+            resident = "\n".join(f"{section}: {text}" for section, text in zip(rows["Section"], rows["Resident Report"]))
+            attending = "\n".join(f"{section}: {text}" for section, text in zip(rows["Section"], rows["Attending Report"]))
+        pairs.append((int(number), str(resident), str(attending), rows[LABEL_COLUMNS].reset_index(drop=True)))
+    return pairs
+
+def unmapped_labels(pairs: list, aliases: dict) -> pd.Series:
+    # Label values that name no category
+    labels = pd.concat([rows["Difference Type"] for *_, rows in pairs])
+    return labels[labels.map(lambda label: not label_categories(label, aliases))]
+
+async def run_sweep(args) -> int:
+    pairs = load_pairs(args)
+    unmapped = unmapped_labels(pairs, args.aliases)
+    if len(unmapped):
+        counts = ", ".join(f"{label} x{count}" for label, count in unmapped.value_counts().items())
+        print(f"ignoring {len(unmapped)} label rows without a category (--label-map to include them): {counts}", file=sys.stderr)
+
+    # Multi-Agent runs once without and once per threshold with the cascade
+    triage = {NO_TRIAGE: None}
+    if args.triage_model:
+        triage.update({f"{args.triage_model} >= {threshold}": threshold for threshold in args.triage_thresholds})
+    combos = [(model, AGENT_STYLE[style], OUTPUT_TYPE[fmt], label) for model in args.models for style in args.styles for fmt in args.formats
+              for label in (triage if style == "multi" else [NO_TRIAGE])]
+    jobs = {model: [(combo, pair) for combo in combos if combo[0] == model for pair in pairs for _ in range(max(1, args.repeat))] for model in args.models}
+    progress = tqdm(total=sum(len(model_jobs) for model_jobs in jobs.values()), unit="comparison")
+    results = []
+
+    async def run_job(combo: tuple, pair: tuple, semaphore: asyncio.Semaphore, lane: str):
+        model, style, output_type, label = combo
+        number, resident, attending, labels = pair
+        threshold = triage[label]
+        cascade = {"triage_model": args.triage_model, "triage_thresholds": dict.fromkeys(range(1, 8), threshold)} if threshold is not None else {}
+        async with semaphore:
+            try:
+                record, _ = await compare_reports(resident, attending, model, output_type, style,
+                                                  use_cache=not args.no_cache, session=f"evaluate-{lane}", admit=False, **cascade)
+            except Exception as e:
+                tqdm.write(f"{model} / {style} / {output_type} / triage {label} pair {number} failed: {e!r}", file=sys.stderr)
+                results.append({"Model": model, "Agent Style": style, "Output": output_type, "Triage": label, "Number": number, "Failed": 1})
+                return
+            finally:
+                progress.update(1)
+        calls = json.loads(record["Call Timings"])
+        result = {"Model": model, "Agent Style": style, "Output": output_type, "Triage": label, "Number": number, "Failed": 0,
+                  **{key: record[key] for key in ["Seconds", "Queue Seconds", "Input Tokens", "Output Tokens"]},
+                  # Cached calls take no time or tokens, so they skew both
+                  "Cached": sum(bool(call["Cached"]) for call in calls) / len(calls) if calls else 0.0}
+        if record.get("Triage Categories"):
+            result["Escalated"] = record["Escalated Categories"] / record["Triage Categories"]
+        # Single Agent paragraph output has no table to score
+        if record.get("Difference Rows") is not None:
+            predicted = rows2df(parse_rows(record["Difference Rows"]))
+            result.update(agreement(split_categories(predicted), split_categories(labels, args.aliases)))
+        results.append(result)
+
+    async def ollama_lane():
+        # One local model at a time, so the GPU never swaps models mid-run
+        semaphore = asyncio.Semaphore(max(1, args.ollama_concurrency))
+        for model in [model for model in args.models if model in OLLAMA_MODEL]:
+            try:
+                await preload_Ollama(model)
+            except Exception as e:
+                # Its comparisons will fail (and be counted) on their own
+                tqdm.write(f"could not preload {model}: {e!r}", file=sys.stderr)
+            await asyncio.gather(*(run_job(combo, pair, semaphore, "ollama") for combo, pair in jobs[model]))
+
+    async def openai_lane():
+        # Remote models share the API limits, not a GPU, so they all run at once
+        semaphore = asyncio.Semaphore(max(1, args.openai_concurrency))
+        await asyncio.gather(*(run_job(combo, pair, semaphore, "openai") for model in args.models if model in OPENAI_MODEL for combo, pair in jobs[model]))
+
+    # The two backends run side by side
+    await asyncio.gather(ollama_lane(), openai_lane())
+    progress.close()
+
+    details = pd.DataFrame(results)
+    summary, categories = summarize_sweep(details, combos)
+    if args.details:
+        details.to_csv(args.details, index=False)
+    if args.output:
+        summary.join(categories).to_csv(args.output)
+    print(f"{len(pairs)} labeled report pair{'s' if len(pairs) != 1 else ''}, {len(combos)} combinations:\n")
+    print(summary.to_string(float_format="%.2f"))
+    print("\nPrecision / recall per category:\n")
+    print(categories.to_string(float_format="%.2f"))
+    return 1 if details["Failed"].any() else 0
+
+def summarize_sweep(details: pd.DataFrame, combos: list) -> tuple:
+    # (one row per combination, its per-category precision/recall), in combos order
+    keys = ["Model", "Agent Style", "Output", "Triage"]
+    summary, categories = {}, {}
+    runs_by_combo = dict(list(details.groupby(keys, sort=False)))
+    for combo in combos:
+        runs = runs_by_combo[combo]
+        done = runs[runs["Failed"] == 0]
+        scored = done.dropna(subset=["Matched"]) if "Matched" in done.columns else done.iloc[:0]
+        scores = summarize(scored.to_dict("records")).set_index("Category") if len(scored) else None
+        row = {"Comparisons": len(done), "Failed": int(runs["Failed"].sum())}
+        for metric in ["Precision", "Recall", "F1"]:
+            row[metric] = scores.loc["All", metric] if scores is not None else float("nan")
+        for p in PERCENTILES:
+            row[f"p{p} s"] = done["Seconds"].quantile(p / 100) if len(done) else float("nan")
+        row["Input Tokens"] = done["Input Tokens"].mean() if len(done) else float("nan")
+        row["Output Tokens"] = done["Output Tokens"].mean() if len(done) else float("nan")
+        row["Cached"] = done["Cached"].mean() if len(done) else float("nan")
+        # Share of the triaged categories sent on to the model
+        row["Escalated"] = done["Escalated"].mean() if "Escalated" in done.columns else float("nan")
+        summary[combo] = row
+        categories[combo] = {
+            f"{category} {metric[0]}": scores.loc[category, metric] if scores is not None else float("nan")
+            for category in CATEGORIES for metric in ["Precision", "Recall"]
+        }
+    index = pd.MultiIndex.from_tuples(list(summary), names=keys)
+    return pd.DataFrame(list(summary.values()), index=index), pd.DataFrame(list(categories.values()), index=index)
+
+if __name__ == "__main__":
+    sys.exit(run_sync(run_sweep(parse_args())))
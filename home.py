@@ -1,555 +1,129 @@
-from io import StringIO
+import json, uuid
 import streamlit as st
 import pandas as pd
-import json, re, csv, asyncio
-from utils.Ollama_Agent import extract_Ollama
-from utils.OpenAI_Agent import extract_OpenAI
-
-SYSTEM_PROMPT_PARAGRAPH ='''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goals:
-    - extract the stylistic and content changes made by the attending physician to the resident report
-    - present the changes ***as succinctly as possible*** while still being readable
-    - treat this as feedback meant to inform the resident on how they can improve their report writing to better match the attending
-    - The format of the output should include the following headings: Findings, Impression, Stylistic Approach, Change Characteristics
-    - Regarding Change Characteristics, the following rating system will be used. Please identify ***all*** instances of each type and provide a brief explanation for each number chosen (multiple numbers can be used, and repeat numbers can be used for different examples within the reports)
-        * 1: Addition of missing positive findings (e.g. "Lung Bases: Unremarkable" --> "Scattered subcentimeter nodules likely incidental.")
-        * 2: Deletion of (incorrect) positive findings (e.g. “Small left pleural effusion is noted, possibly related to recent infection.” --> “No definite pleural effusion is identified; left basilar opacity likely reflects adjacent atelectasis.”)
-        * 3: Addition of negative findings (e.g. “Lungs are clear with no consolidation.” --> “Lungs are clear with no consolidation, effusion, or pneumothorax.”)
-        * 4: Correction of the expression of findings / Proofreading (e.g. “Pancreas has hazy borders suggestive of inflammation.” --> “The pancreas demonstrates ill-defined margins with surrounding stranding, consistent with pancreatitis.”)
-        * 5: Correction of the diagnosis (e.g. “Thickened bowel loops likely represent Crohn’s disease.” --> “Thickened distal ileum may represent infectious or inflammatory ileitis; Crohn’s is a consideration but not definitive.”)
-        * 6: Follow-up exam or treatment recommendations (e.g. “Stable hepatic lesion, likely benign hemangioma.” --> “Stable hepatic lesion measuring 1.5 cm, likely benign hemangioma. Recommend 6-month follow-up MRI to confirm stability.”)
-        * 7: Level of certainty of finding (e.g. “There is a 4 mm right upper lobe nodule that could represent malignancy.” --> “4 mm right upper lobe nodule is indeterminate, but likely benign given size and morphology.”)
-    - Under **Change Characteristics**, return bullet points in the following format (this format must be strictly followed):
-
-        - [number]: "[Resident quote]" --> "[Attending quote]"
-
-            [One-sentence explanation of the change]
-    - Under each heading will be a ***short summary paragraph*** of the improvements that could be made regarding the given headings – an example is shown below
-
-Example:
-"**Findings:**
-
-The attending version removes some descriptive qualifiers and incidental findings, focusing on clinically relevant features while standardizing language. Specific changes include simplifying liver lesion descriptions, omitting details about the appendix, ascites, and cystic lesion characteristics that the resident included. The attending adds minor incidental lung nodules that were not mentioned in the resident's version.
-
-**Impression:**
-
-Both reports convey the same major findings but the attending condenses phrasing, focusing on diagnostic clarity without repeating measurement values unnecessarily.
-
-**Stylistic Approach:**
-
-The attending emphasizes brevity and clarity, using terms like "normal" instead of "unremarkable," omitting redundant or non-actionable details, and ensuring a standardized structure that’s easier to scan for key findings.
-
-**Change Characteristics**
-- 1: “Unremarkable.” --> “No focal consolidation. Scattered subcentimeter nodules likely incidental.”
-
-    The attending included specific incidental findings to add clinical nuance.
-
-- 4: "The liver demonstrates a heterogeneous lesion in the right hepatic lobe measuring 4.2 x 3.8 cm, consistent with a hepatic adenoma. This lesion was smaller on prior imaging, previously measuring 2.5 x 2.0 cm, indicating interval growth. There is associated mild contour nodularity suggesting early chronic changes." --> "Interval enlargement of a right hepatic lobe lesion, now measuring 4.2 x 3.8 cm, consistent with a hepatic adenoma. Mild surface nodularity is noted."
-
-    The language was streamlined to emphasize key changes while reducing redundancy.
-
-- 4: "The pancreas demonstrates an ill-defined hypodense area involving the pancreatic tail measuring approximately 3.7 x 2.9 cm, consistent with complex pancreatitis. There is surrounding inflammatory stranding and an adjacent phlegmon measuring approximately 4.5 x 3.1 cm. No discrete fluid collection is identified." --> "Complex inflammatory changes and ill-defined low-attenuation area in the pancreatic tail measuring 3.7 x 2.9 cm. Adjacent phlegmon measuring 4.5 x 3.1 cm."
-
-    The phrasing was tightened for clarity and radiologic convention.
-
-- 4: "The uterus is enlarged with multiple fibroids, the largest located in the anterior fundal region measuring 5.4 x 4.8 cm. There is a left adnexal cystic lesion measuring 4.2 x 3.9 x 4.0 cm, likely representing an ovarian cyst. No solid components or septations are identified." --> "Normal."
-
-    The attending omitted detail, favoring a high-level summary likely reflecting clinical priorities.
-"
-'''
-
-SYSTEM_PROMPT_TABLE ='''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goals:
-    - extract the stylistic and content changes made by the attending physician to the resident report
-    - present the changes ***as succinctly as possible*** while still being readable
-    - treat this as feedback meant to inform the resident on how they can improve their report writing to better match the attending
-    - The format of the output should be a CSV table with the following columns: Section, Resident Report, Attending Report, Difference Type
-    - The rows should ***match the sections of the findings***
-    - Regarding the "Difference Type" Column, it will be a ***list of numbers (i.e. allowed repeats for multiple identifications, multiple numbers allowed in list)*** for the following categories:
-        * 1: Addition of missing positive findings (e.g. "Lung Bases: Unremarkable" --> "Scattered subcentimeter nodules likely incidental.")
-        * 2: Deletion of (incorrect) positive findings (e.g. “Small left pleural effusion is noted, possibly related to recent infection.” --> “No definite pleural effusion is identified; left basilar opacity likely reflects adjacent atelectasis.”)
-        * 3: Addition of negative findings (e.g. “Lungs are clear with no consolidation.” --> “Lungs are clear with no consolidation, effusion, or pneumothorax.”)
-        * 4: Correction of the expression of findings / Proofreading (e.g. “Pancreas has hazy borders suggestive of inflammation.” --> “The pancreas demonstrates ill-defined margins with surrounding stranding, consistent with pancreatitis.”)
-        * 5: Correction of the diagnosis (e.g. “Thickened bowel loops likely represent Crohn’s disease.” --> “Thickened distal ileum may represent infectious or inflammatory ileitis; Crohn’s is a consideration but not definitive.”)
-        * 6: Follow-up exam or treatment recommendations (e.g. “Stable hepatic lesion, likely benign hemangioma.” --> “Stable hepatic lesion measuring 1.5 cm, likely benign hemangioma. Recommend 6-month follow-up MRI to confirm stability.”)
-        * 7: Level of certainty of finding (e.g. “There is a 4 mm right upper lobe nodule that could represent malignancy.” --> “4 mm right upper lobe nodule is indeterminate, but likely benign given size and morphology.”)
-    - Return only raw CSV (***NO EXPLANATION, MARKDOWN, OR EXTRA TEXT ASIDE FROM THE CSV***), and include headers in the first row
-
-Example:
-"Section","Resident Report","Attending Report","Difference Type"
-"Lung Bases","Unremarkable.","No focal consolidation. Scattered subcentimeter nodules.","1"
-"Liver","Heterogeneous lesion", "mild contour nodularity.","Interval enlargement, mild surface nodularity.","4"
-"Biliary System","Explicit duct sizes, no obstructing mass mentioned.","Duct sizes, no mention of obstruction.",""
-"Pancreas","Complex pancreatitis, no discrete fluid collection.","Complex changes, omits fluid collection comment.","4"
-"Spleen/Adrenals/Kidneys","Unremarkable.","Normal.",""
-"Pelvis/Bladder","Ovarian cyst description includes "no solid components."","No mention of solid components.","4"
-"Bowel","Appendix unremarkable.","Appendix not mentioned.",""
-"Mesentery/Peritoneum","Notes no ascites.","Ascites not mentioned.",""
-"Bones & Soft Tissues","Degenerative changes, no aggressive lesion.","Degenerative changes only.",""
-"Style Overall","Detailed, more explanatory.","Concise, standardized, focused on clinical impact.",""
-'''
-
-SYSTEM_PROMPT_PARAGRAPH_MULTI ='''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goals:
-    - extract the stylistic and content changes made by the attending physician to the resident report
-    - present the changes ***as succinctly as possible*** while still being readable
-    - treat this as feedback meant to inform the resident on how they can improve their report writing to better match the attending
-    - The format of the output should include the following headings: Findings, Impression, Stylistic Approach
-    - Under each heading will be a ***short summary paragraph*** of the improvements that could be made regarding the given headings – an example is shown below
-
-Example:
-"**Findings:**
-
-The attending version removes some descriptive qualifiers and incidental findings, focusing on clinically relevant features while standardizing language. Specific changes include simplifying liver lesion descriptions, omitting details about the appendix, ascites, and cystic lesion characteristics that the resident included. The attending adds minor incidental lung nodules that were not mentioned in the resident's version.
-
-**Impression:**
-
-Both reports convey the same major findings but the attending condenses phrasing, focusing on diagnostic clarity without repeating measurement values unnecessarily.
-
-**Stylistic Approach:**
-
-The attending emphasizes brevity and clarity, using terms like "normal" instead of "unremarkable," omitting redundant or non-actionable details, and ensuring a standardized structure that’s easier to scan for key findings.
-"
-'''
-
-AGENT_PROMPT_1 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy the addition of positive findings – when the attending report contains a positive finding that the resident report lacks
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Resident Report", "Attending Report", "Difference Type", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "1" if a positive finding is identified for a given section
-            - Explanation: Consice 1-sentence summary explaining the observed addition of positive finding, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with a positive finding
-
-Inclusion Criteria:
-    - Addition of positive finding
-    - Addition of detail that contributes to positive finding
-Exclusion Criteria:
-    - Addition of negative finding
-    - Phrasing adjustments/correction of expression used
-    - Correction of a diagnosis
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-    - Adjusting the level of certainty
-
-Example Inclusion:
-
-Input:
-    Resident Report: "Lung Bases: Unremarkable."
-    Attending Report: "Lung Bases: No focal consolidation. Scattered subcentimeter nodules likely incidental."
-
-Output:
-    Section: Lung Bases
-    Resident Report: Unremarkable.
-    Attending Report: No focal consolidation. Scattered subcentimeter nodules likely incidental.
-    Difference Type: 1
-    Explanation: The attending added previously unmentioned subcentimeter lung nodules, highlighting clinically nuanced findings absent from the resident’s draft.
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "No ascites."
-    Attending Quotation: "No ascites. No abnormal focal fluid collections. No free air."
-Explanation: While an addition is made, it is an addition of ***negative*** findings, and should not be included
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Lung Bases","Unremarkable.","No focal consolidation. Scattered subcentimeter nodules likely incidental.","1","The attending added previously unmentioned subcentimeter lung nodules, highlighting clinically nuanced findings absent from the resident’s draft."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-
-Example Output 3:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Spleen/Adrenals/Kidneys","Unremarkable.","Incidental 3.5 x 3.2 cm mass in the upper pole of the right kidney.","1","The attending added previously unmentioned mass in the right kidney."
-'''
-
-AGENT_PROMPT_2 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy the deletion of ***incorrect*** positive findings – when the attending report removes a finding that the resident report contained
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Difference Type", "Quote Identified", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "2" if a positive finding is removed for a given section
-            - Explanation: Consice 1-sentence summary explaining the observed removal of positive finding, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with a deletion of a positive finding
-
-Inclusion Criteria:
-    - Deletion of positive finding
-Exclusion Criteria:
-    - Addition of positive finding
-    - Addition of negative finding
-    - Exclusion of details that contribute to a positive finding (as long as the main finding is present in both resident and attending reports)
-    - Phrasing adjustments/correction of expression used
-    - Correction of a diagnosis
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-    - Adjusting the level of certainty
-
-Example Inclusion:
-
-Input:
-    Resident Report: "Mesentery/Peritoneum: Mild inflammatory stranding is present surrounding the aforementioned right lower quadrant collection. No free air is identified outside this loculated process. No additional abnormal fluid collections are seen."
-    Attending Report: "Mesentery/Peritoneum: No free air."
-
-Output:
-    Section: Mesentary/Peritoneum
-    Resident Report: Mild inflammatory stranding is present surrounding the aforementioned right lower quadrant collection. No free air is identified outside this loculated process. No additional abnormal fluid collections are seen.
-    Attending Report: No free air.
-    Difference Type: 2
-    Explanation: "The attending did not identify surrounding inflammatory stranding."
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "Multiple gallstones present within the gallbladder, consistent with cholelithiasis. There is no gallbladder wall thickening or pericholecystic fluid to suggest acute cholecystitis. Compared to the prior study, there is increased prominence of pericholecystic fat stranding, suggesting interval worsening of gallbladder pathology, although no acute inflammatory signs are present."
-    Attending Quotation: "Cholelithiasis with increased pericholecystic fat stranding compared to prior."
-Explanation: While the attending quotation omits information, all major findings are present, and the overall information communicated is the same.
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Lung Bases","Mild inflammatory stranding is present surrounding the aforementioned right lower quadrant collection. No free air is identified outside this loculated process. No additional abnormal fluid collections are seen.","No free air.","2","The attending did not identify surrounding inflammatory stranding."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-'''
-
-AGENT_PROMPT_3 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy the addition of negative findings – when the attending report contains a negative finding that the resident report contained
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Difference Type", "Quote Identified", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "3" if a negative finding is identified for a given section
-            - Explanation: Consice 1-sentence summary explaining the observed addition of negative finding, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with an addition of a negative finding finding
-
-Inclusion Criteria:
-    - Addition of negative finding
-Exclusion Criteria:
-    - Addition of positive finding
-    - Addition of details that contribute to a positive finding
-    - Phrasing adjustments/correction of expression used
-    - Correction of a diagnosis
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-    - Adjusting the level of certainty
-
-Example Inclusion:
-
-Input:
-    Resident Report: "Mesentary/Peritoneum: No ascites."
-    Attending Report: "Mesentary/Peritoneum: No ascites. No abnormal focal fluid collections. No free air."
-
-Output:
-    Section: Mesentary/Peritoneum
-    Resident Report: No ascites.
-    Attending Report: No ascites. No abnormal focal fluid collections. No free air.
-    Difference Type: 3
-    Explanation: "Important negative findings (fluid collections, free air) added for completeness."
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "Lung Bases: Unremarkable."
-    Attending Quotation: "Lung Bases: No focal consolidation. Scattered subcentimeter nodules likely incidental."
-Explanation: While the attending quotation adds new information, it is a positive finding (even if only incidental).
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Mesentary/Peritoneum","No ascites.","No ascites. No abnormal focal fluid collections. No free air.","3","Important negative findings (fluid collections, free air) added for completeness."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-'''
-
-AGENT_PROMPT_4 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy the correction of the expression of findings – when the attending report contains a ***major*** rephrasing of resident findings (general information communicated is the same, but largely different phrasing)
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Difference Type", "Quote Identified", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "4" if a correction of expression is made
-            - Explanation: Consice 1-sentence summary explaining the correction/rephrasing of resident findings, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with major corrections of expression/rephrasing
-
-Inclusion Criteria:
-    - ***Major*** phrasing adjustments/correction of expression used
-Exclusion Criteria:
-    - ***Minor*** phrasing adjustments/correction of expression used (e.g. "Normal" --> "Unremarkable")
-    - Addition of positive finding
-    - Addition of details that contribute to a positive finding
-    - Correction of a diagnosis
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-    - Adjusting the level of certainty
-
-Example Inclusion:
-
-Input:
-    Resident Quotation: "Pancreas: The pancreas demonstrates an ill-defined hypodense area involving the pancreatic tail measuring approximately 3.7 x 2.9 cm, consistent with complex pancreatitis. There is surrounding inflammatory stranding and an adjacent phlegmon measuring approximately 4.5 x 3.1 cm. No discrete fluid collection is identified."
-    Attending Quotation: "Pancreas: Complex inflammatory changes and ill-defined low-attenuation area in the pancreatic tail measuring 3.7 x 2.9 cm. Adjacent phlegmon measuring 4.5 x 3.1 cm."
-
-Output:
-    Section: Pancreas
-    Resident Report: The pancreas demonstrates an ill-defined hypodense area involving the pancreatic tail measuring approximately 3.7 x 2.9 cm, consistent with complex pancreatitis. There is surrounding inflammatory stranding and an adjacent phlegmon measuring approximately 4.5 x 3.1 cm. No discrete fluid collection is identified.
-    Attending Report: Complex inflammatory changes and ill-defined low-attenuation area in the pancreatic tail measuring 3.7 x 2.9 cm. Adjacent phlegmon measuring 4.5 x 3.1 cm.
-    Difference Type: 4
-    Explanation: "The attending streamlines and clarifies the description, condensing phrasing for improved clarity and radiologic convention."
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "Spleen: Unremarkable."
-    Attending Quotation: "Spleen: Normal."
-Explanation: While the attending quotation uses different phrasing than the resident, it is a minor change that should not be included.
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Pancreas","The pancreas demonstrates an ill-defined hypodense area involving the pancreatic tail measuring approximately 3.7 x 2.9 cm, consistent with complex pancreatitis. There is surrounding inflammatory stranding and an adjacent phlegmon measuring approximately 4.5 x 3.1 cm. No discrete fluid collection is identified.","Complex inflammatory changes and ill-defined low-attenuation area in the pancreatic tail measuring 3.7 x 2.9 cm. Adjacent phlegmon measuring 4.5 x 3.1 cm.","3","The attending streamlines and clarifies the description, condensing phrasing for improved clarity and radiologic convention."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-'''
-
-AGENT_PROMPT_5 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy the correction of a diagnosis – when the attending report contains a correction of the diagnosis from the resident's report
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Difference Type", "Quote Identified", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "5" if a correction of a diagnosis is made
-            - Explanation: Consice 1-sentence summary explaining the correction of the diagnosis, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with major corrections of a diagnosis
-
-Inclusion Criteria:
-    - Correction of diagnosis
-Exclusion Criteria:
-    - Deletion of positive findings
-    - Deletion of negative findings
-    - Addition of positive finding
-    - Addition of details that contribute to a positive finding
-    - Addition of negative finding
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-    - Adjusting the level of certainty
-
-Example Inclusion:
-
-Input:
-    Resident Report: "Bowel: Thickened bowel loops likely represent Crohn’s disease."
-    Attending Report: "Bowel: Thickened distal ileum may represent infectious or inflammatory ileitis."
-
-Output:
-    Section: Pancreas
-    Resident Report: Thickened bowel loops likely represent Crohn’s disease.
-    Attending Report: Thickened distal ileum may represent infectious or inflammatory ileitis.
-    Difference Type: 5
-    Explanation: "The attending identifies a different diagnosis than the resident."
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "Lung Bases: Unremarkable."
-    Attending Quotation: "Lung Bases: No focal consolidation. Scattered subcentimeter nodules likely incidental."
-Explanation: While the attending quotation includes new information, it is not indicative of a different diagnosis, and should not be included.
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Pancreas","Thickened bowel loops likely represent Crohn’s disease.","Thickened distal ileum may represent infectious or inflammatory ileitis.","5","The attending identifies a different diagnosis than the resident."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-'''
-
-AGENT_PROMPT_6 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy the addition of a follow-up exam or treatment plan – when the attending report contains a follow-up exam or treatment plan that is not present in the resident's report
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Difference Type", "Quote Identified", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "6" if a follow-up exam or treatment plan is added
-            - Explanation: Consice 1-sentence summary explaining the addition of a follow-up exam or treatment plan, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with major corrections of a diagnosis
-
-Inclusion Criteria:
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-Exclusion Criteria:
-    - Deletion of positive findings
-    - Deletion of negative findings
-    - Addition of positive finding
-    - Addition of details that contribute to a positive finding
-    - Addition of negative finding
-    - Adjusting the level of certainty
-    - Correction of diagnosis
-
-Example Inclusion:
-
-Input:
-    Resident Quotation: "IMPRESSION: 1. Ruptured appendicitis with a periappendiceal abscess measuring approximately 5.7 x 4.9 x 6.2 cm, containing gas locules and surrounded by inflammatory changes.\n2. Cholelithiasis without definitive evidence of acute cholecystitis; however, interval worsening of pericholecystic fat stranding compared to prior study suggests progression of gallbladder disease.\n3. Newly identified cystic lesion in the pancreatic head measuring 2.8 x 2.3 cm, likely representing a pancreatic cyst.\n4. Mild contour irregularity and periportal edema in the liver, not previously noted, concerning for early chronic liver changes."
-    Attending Quotation: "IMPRESSION: 1. Ruptured appendicitis with abscess formation.\n2. Incidental right renal mass requiring further evaluation.\n3. Pancreatic head cystic lesion.\n4. Mild new periportal edema."
-
-Output:
-    Section: IMPRESSION
-    Resident Report: 1. Ruptured appendicitis with a periappendiceal abscess measuring approximately 5.7 x 4.9 x 6.2 cm, containing gas locules and surrounded by inflammatory changes.\n2. Cholelithiasis without definitive evidence of acute cholecystitis; however, interval worsening of pericholecystic fat stranding compared to prior study suggests progression of gallbladder disease.\n3. Newly identified cystic lesion in the pancreatic head measuring 2.8 x 2.3 cm, likely representing a pancreatic cyst.\n4. Mild contour irregularity and periportal edema in the liver, not previously noted, concerning for early chronic liver changes.
-    Attending Report: 1. Ruptured appendicitis with abscess formation.\n2. Incidental right renal mass requiring further evaluation.\n3. Pancreatic head cystic lesion.\n4. Mild new periportal edema.
-    Difference Type: 6
-    Explanation: "The attending gives a recommendation for follow-up imaging for a renal mass."
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "Lung Bases: Unremarkable."
-    Attending Quotation: "Lung Bases: No focal consolidation. Scattered subcentimeter nodules likely incidental."
-Explanation: While the attending quotation includes new information, it is not indicative of a follow up study or treatment plan.
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Pancreas","1. Ruptured appendicitis with a periappendiceal abscess measuring approximately 5.7 x 4.9 x 6.2 cm, containing gas locules and surrounded by inflammatory changes.\n2. Cholelithiasis without definitive evidence of acute cholecystitis; however, interval worsening of pericholecystic fat stranding compared to prior study suggests progression of gallbladder disease.\n3. Newly identified cystic lesion in the pancreatic head measuring 2.8 x 2.3 cm, likely representing a pancreatic cyst.\n4. Mild contour irregularity and periportal edema in the liver, not previously noted, concerning for early chronic liver changes.","1. Ruptured appendicitis with abscess formation.\n2. Incidental right renal mass requiring further evaluation.\n3. Pancreatic head cystic lesion.\n4. Mild new periportal edema.","6","The attending gives a recommendation for follow-up imaging for a renal mass."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-'''
-
-AGENT_PROMPT_7 = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report.
-
-Goal: Identitfy an adjustment in the level of certainty within the report – when the attending report adjusts the confidence of a finding that is present in the resident's report
-    - This will be done on a section-by-section basis (e.g. compare the "liver" section of resident and attending reports)
-    - Please adhere ***strictly*** to the below inclusion and exclusion criteria. Do NOT include any findings if it does not fit into the below criteria
-    - Output format: csv format as described below – DO NOT INCLUDE EXPLANATIONS OR TRAILING MARKS/WRAPPERS
-        - Columns: "Section", "Difference Type", "Quote Identified", "Explanation"
-            - Section: The name of the section (e.g. "Lung Bases", "Liver", "Biliary System", etc.)
-            - Resident Report: The section text of the ***resident report***
-            - Attending Report: The section text of the ***attending report***
-            - Difference Type: The number "7" if a confidence adjustment is made
-            - Explanation: Consice 1-sentence summary explaining the adjusted report confidence, phrased as feedback for the resident
-        - Rows: The rows should ***match the sections of the findings*** but ONLY include sections with major corrections of a diagnosis
-
-Inclusion Criteria:
-    - Adjusting the level of certainty
-Exclusion Criteria:
-    - Deletion of positive findings
-    - Deletion of negative findings
-    - Addition of positive finding
-    - Addition of details that contribute to a positive finding
-    - Addition of negative finding
-    - Addition of a follow-up exam
-    - Addition of a treatment recommendation
-    - Adjusting the level of certainty
-    - Correction of diagnosis
-
-Example Inclusion:
-
-Input:
-    Resident Quotation: "Bowel: There is a mass in the right lower quadrant, likely representing an appendiceal abscess."
-    Attending Quotation: "Bowel: There is a soft tissue density in the right lower quadrant, which may represent an appendiceal abscess; correlation with clinical findings is recommended."
-
-Output:
-    Section: Bowel
-    Resident Report: There is a mass in the right lower quadrant, likely representing an appendiceal abscess.
-    Attending Report: There is a soft tissue density in the right lower quadrant, which may represent an appendiceal abscess; correlation with clinical findings is recommended.
-    Difference Type: 7
-    Explanation: "The attending softened the diagnostic certainty and emphasized the need for clinical correlation."
-
-Example Exclusion:
-
-Input:
-    Resident Quotation: "Lung Bases: Unremarkable."
-    Attending Quotation: "Lung Bases: No focal consolidation. Scattered subcentimeter nodules likely incidental."
-Explanation: While the attending quotation includes new information, it is not altering the confidence of the diagnosis, and should not be included.
-
-Example Output 1:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-"Pancreas","There is a mass in the right lower quadrant, likely representing an appendiceal abscess.","There is a soft tissue density in the right lower quadrant, which may represent an appendiceal abscess; correlation with clinical findings is recommended.","7","The attending softened the diagnostic certainty and emphasized the need for clinical correlation."
-
-Example Output 2:
-"Section","Resident Report","Attending Report","Difference Type","Explanation"
-'''
-
-OLLAMA_MODEL = ["deepseek-r1:70b", "llama3.3:latest", "llama3.2-vision:90b", "gemma3:27b"]
-OPENAI_MODEL = [ "gpt-4.1", "gpt-4o", "gpt-4.1-mini", "gpt-4o-mini"]
+import httpx
+from utils.Agent_Runner import MAX_CONCURRENCY
+from utils.Backend_Clients import run_with_updates
+from utils.Report_Sections import prune_reports
+from utils.Report_Parsing import COLUMNS
+from utils.Local_Detectors import DETECTORS, CATEGORY_MODES
+from utils.Comparison import OLLAMA_MODEL, OPENAI_MODEL, OUTPUT_TYPES, AGENT_STYLES
+from utils.Comparison_API import RequestError
+from utils.Result_Export import ResultExport, FORMATS as EXPORT_FORMATS
+from utils.Results_Store import get_results_store
+from utils.Scheduler import SchedulerBusy
+from utils.Service_Client import compare, queue_state, backend_state, cache_stats, warm_up, KEEP_ALIVE, SERVICE_URL
+from utils.Triage import DEFAULT_TRIAGE_MODEL, TRIAGE_THRESHOLD
+from utils.Prompts import (
+    SYSTEM_PROMPT_PARAGRAPH, SYSTEM_PROMPT_TABLE, SYSTEM_PROMPT_PARAGRAPH_MULTI,
+    AGENT_PROMPT_1, AGENT_PROMPT_2, AGENT_PROMPT_3, AGENT_PROMPT_4,
+    AGENT_PROMPT_5, AGENT_PROMPT_6, AGENT_PROMPT_7, AGENT_PROMPT_FUSED,
+)
 
 model_options = ["--Select--"] + OLLAMA_MODEL + OPENAI_MODEL
-output_options = ["--Select--", "Paragraph Output", "Table Output"]
-agent_format = ["--Select--", "Single Agent", "Multi-Agent"]
-
-
-def strip_llm_wrappers(text: str) -> str:
-    if not isinstance(text, str):
-        return text
-
-    # Remove all <think>...</think> blocks
-    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
-
-    # Remove fenced code blocks like ```json\n...\n```
-    text = re.sub(r"```(?:\w+)?\n(.*?)```", r"\1", text, flags=re.DOTALL)
-
-    # Remove triple single or double quotes
-    text = re.sub(r"'''(.*?)'''", r"\1", text, flags=re.DOTALL)
-    text = re.sub(r'"""(.*?)"""', r"\1", text, flags=re.DOTALL)
-
-    # Remove ~~~ fenced blocks
-    text = re.sub(r"~~~(?:\w+)?\n(.*?)~~~", r"\1", text, flags=re.DOTALL)
-
-    # Final cleanup
-    return text.strip()
-
-def string2df(response: str):
-    reader = csv.DictReader(StringIO(response))
-    data = list(reader)
-    df = pd.DataFrame(data)
-
-    return df
+output_options = ["--Select--"] + OUTPUT_TYPES
+agent_format = ["--Select--"] + AGENT_STYLES
+HISTORY_PAGE_SIZE = 20
+
+@st.cache_data(ttl=10, show_spinner=False)
+def ollama_hosts():
+    # Of the process running the comparisons (Service_Client); None when the
+    # comparison service cannot be reached
+    return backend_state()
+
+def warm_up_once(key: str, model: str, ollama_options: dict):
+    # Start loading a newly selected model right away instead of on the first Analyze
+    if st.session_state.get(key) != (model, ollama_options):
+        warm_up(model, ollama_options)
+        st.session_state[key] = (model, ollama_options)
+        ollama_hosts.clear()
 
 st.set_page_config(page_title="Report Comparison Tool", layout="wide")
 
 st.title("Report Comparison Tool")
 
-if "results" not in st.session_state:
-    st.session_state["results"] = []
+# Results live in the results store, tagged with a session id kept in the URL,
+# so a reload or server restart still finds them
+store = get_results_store()
+if "session" not in st.query_params:
+    st.query_params["session"] = uuid.uuid4().hex
+session_id = st.query_params["session"]
 
 # --- Dropdown Menus ---
 model = st.selectbox("Choose a Model:", model_options, index=0)
 output_type = st.selectbox("Choose Output Format:", output_options, index=0)
 output_agent_style = st.selectbox("Choose Agent Style:", agent_format, index=0)
 
+# --- Ollama Settings ---
+with st.sidebar:
+    st.header("Ollama")
+    keep_alive = st.text_input("Keep Alive", value=KEEP_ALIVE, help="How long a model stays in memory after its last request (e.g. 30m, 2h, -1 for indefinitely).")
+    num_ctx = st.number_input("Context Window (num_ctx)", min_value=0, value=0, step=1024, help="0 sizes the context to each request (8192 tokens, doubled for long reports).")
+    ollama_options = {"keep_alive": keep_alive.strip(), "num_ctx": int(num_ctx)}
+
+    # The OpenAI backend is only imported once one of its models is picked
+    if model in OLLAMA_MODEL + OPENAI_MODEL:
+        warm_up_once("warmed_model", model, ollama_options)
+
+    st.subheader("Resident Models")
+    hosts = ollama_hosts()
+    running = hosts["resident_models"] if hosts is not None else None
+    if hosts is None:
+        st.caption(f"Comparison service unreachable at {SERVICE_URL}.")
+    elif running is None:
+        st.caption("No Ollama host reachable.")
+    elif not running:
+        st.caption("No models loaded.")
+    else:
+        st.dataframe(pd.DataFrame([{
+            "Model": m.get("name"),
+            "Host": m.get("host"),
+            "VRAM (GB)": round(m.get("size_vram", 0) / 1e9, 1),
+            "Expires": m.get("expires_at", ""),
+        } for m in running]), hide_index=True)
+    if running is not None and hosts["unreachable"]:
+        st.caption("Unreachable: " + ", ".join(hosts["unreachable"]))
+    st.subheader("Model Queue")
+    queues = queue_state()
+    if queues is None:
+        st.caption(f"Comparison service unreachable at {SERVICE_URL}.")
+    elif not queues:
+        st.caption("No calls scheduled yet.")
+    else:
+        st.dataframe(pd.DataFrame([{
+            "Model": name,
+            "Running": f"{queue['running']}/{queue['limit']}",
+            "Waiting": queue["queued"],
+            "Avg Call (s)": round(queue["mean_seconds"], 1) if queue["mean_seconds"] is not None else None,
+        } for name, queue in queues.items()]), hide_index=True)
+    if st.button("Refresh"):
+        ollama_hosts.clear()
+        st.rerun()
+
+# --- Response Cache / Streaming ---
+bypass_cache = st.checkbox("Bypass Response Cache", value=False)
+stream_output = st.checkbox("Stream Output", value=True)
+prune_sections = st.checkbox("Send Only Changed Sections", value=False, help="Drop report sections that are identical (ignoring case, spacing and punctuation) in both reports before calling the agents.")
+section_memo = st.checkbox("Reuse Section Verdicts", value=False, help="Multi-Agent only: reuse what each category agent said about a resident/attending section pair it has already seen in another report, and only send the new sections. Ignored when bypassing the cache.")
+cache = cache_stats()
+if cache is not None:
+    st.caption(f"Response cache: {cache['hits']} hits, {cache['misses']} misses, {cache['entries']} entries ({cache['bytes'] / 1e6:.1f} MB)")
+
 output_setting = output_type == "Paragraph Output"
 output_agent_setting = output_agent_style == "Single Agent"
+fused_agent_setting = output_agent_style == "Fused Structured"
 # --- Prompt Editing Box ---
 default_prompt = SYSTEM_PROMPT_PARAGRAPH if output_setting else SYSTEM_PROMPT_TABLE
 multi_agent_prompts = [None, None, None, None, None, None, None]
+category_modes = {}
+triage_model, triage_thresholds = None, None
 
 if not output_type == "--Select--" and output_agent_setting:
     edited_prompt = st.text_area("Prompt Editing", value=default_prompt, height=300)
+elif not output_type == "--Select--" and fused_agent_setting:
+    fused_prompt = st.text_area("Prompt Editing – Fused Agent", value = AGENT_PROMPT_FUSED, height = 300)
+    if output_setting:
+        system_prompt_paragraph_multi = st.text_area("Prompt Editing – Paragraph Agent", value = SYSTEM_PROMPT_PARAGRAPH_MULTI, height = 200)
 elif not output_type == "--Select--" and not output_agent_style == "--Select--":
     multi_agent_prompts[0] = st.text_area("Prompt Editing – Scale 1 Agent", value = AGENT_PROMPT_1, height = 200)
     multi_agent_prompts[1] = st.text_area("Prompt Editing – Scale 2 Agent", value = AGENT_PROMPT_2, height = 200)
@@ -559,6 +133,21 @@ elif not output_type == "--Select--" and not output_agent_style == "--Select--":
     multi_agent_prompts[5] = st.text_area("Prompt Editing – Scale 6 Agent", value = AGENT_PROMPT_6, height = 200)
     multi_agent_prompts[6] = st.text_area("Prompt Editing – Scale 7 Agent", value = AGENT_PROMPT_7, height = 200)
     system_prompt_paragraph_multi = st.text_area("Prompt Editing – Paragraph Agent", value = SYSTEM_PROMPT_PARAGRAPH_MULTI, height = 200)
+    max_concurrency = st.number_input("Max Concurrent Agent Calls", min_value=1, max_value=MAX_CONCURRENCY, value=MAX_CONCURRENCY, step=1)
+    with st.expander("Local Detectors"):
+        st.caption("Local: rule-based detector only. Local + LLM Confirmation: the agent only runs when the detector finds a candidate.")
+        for category in DETECTORS:
+            category_modes[category] = st.selectbox(f"Scale {category} Agent", CATEGORY_MODES, index=0, key=f"category_mode_{category}")
+    with st.expander("Cascade Triage"):
+        st.caption("A fast model first rates how likely each category's changes are and in which sections; only the categories at or above the threshold are sent to the selected model, with only those sections. Local detector categories are not triaged.")
+        if st.checkbox("Triage with a Fast Model", value=False):
+            triage_options = OLLAMA_MODEL + OPENAI_MODEL
+            default_triage = DEFAULT_TRIAGE_MODEL["ollama" if model in OLLAMA_MODEL else "openai"]
+            triage_model = st.selectbox("Triage Model", triage_options, index=triage_options.index(default_triage))
+            threshold = st.slider("Escalation Threshold (%)", min_value=0, max_value=100, value=TRIAGE_THRESHOLD,
+                                  help="Categories the triage model rates at least this likely are sent on. Lower it to miss fewer changes, raise it to save more calls.")
+            triage_thresholds = dict.fromkeys(range(1, 8), threshold)
+            warm_up_once("warmed_triage_model", triage_model, ollama_options)
 
 # --- Text Inputs Side-by-Side ---
 col1, col2 = st.columns(2)
@@ -569,6 +158,9 @@ with col1:
 with col2:
     attending_text = st.text_area("Attending Revised Report", height=300)
 
+# Recorded with the result for the Analytics page
+exam_type = st.text_input("Exam Type", placeholder="Taken from the reports' EXAM or TECHNIQUE section if left empty").strip() or None
+
 # --- Button Enable Condition ---
 button_disabled = (
     model == "--Select--" or
@@ -580,109 +172,121 @@ button_disabled = (
 
 # --- Analyze Button ---
 if st.button("Analyze", disabled=button_disabled):
-    response = ""
-    columns = ["Section", "Resident Report", "Attending Report", "Difference Type", "Explanation"]
-    multi_df = pd.DataFrame(columns=columns)
-    text = "Resident Report:\n" + resident_text + "\n\nAttending Report:\n" + attending_text
-
-    if output_agent_setting:
-        system_prompt = edited_prompt
-        if model in OLLAMA_MODEL:
-            response = extract_Ollama(system_prompt,text,model)
-        else:
-            response = asyncio.run(extract_OpenAI(system_prompt,text,model))
-        
-        result = strip_llm_wrappers(response)
-
-        st.session_state["results"].append({
-            "Model": model,
-            "Output Style": output_type,
-            "Single or Multi-Agent": output_agent_style,
-            "Prompt": system_prompt,
-            "Resident Note": resident_text.strip(),
-            "Attending Note": attending_text.strip(),
-            "Output": result.strip(),
-        })
-
-        # Display the result
-        if output_setting:
-            st.write(result)
+    if prune_sections:
+        _, _, changed_sections, total_sections = prune_reports(resident_text, attending_text)
+        st.caption(f"Sending {changed_sections} of {total_sections} report sections (the rest are unchanged).")
+    queue_status = st.empty()
+    live_output = st.empty()
+
+    def show_update(update):
+        kind, value = update
+        if kind == "status":
+            # Waiting for a model slot shared with the other sessions
+            if value is None:
+                queue_status.empty()
+            else:
+                eta = f", about {value['eta']:.0f} s" if value["eta"] is not None else ""
+                queue_status.info(f"Waiting for {value['model']}: position {value['position']} in the queue{eta} "
+                                  f"({value['waiting']} call{'s' if value['waiting'] != 1 else ''} waiting).")
+        elif output_setting:
+            # Paragraph output streams as text, table output as the rows parsed so far
+            live_output.markdown(value)
         else:
-            # print(result)
-            df = string2df(result)
-            st.dataframe(df)
+            live_output.dataframe(pd.DataFrame(value, columns=COLUMNS), hide_index=True)
+
+    # The comparison service's request (utils/Comparison_API.py)
+    request = {
+        "resident": resident_text, "attending": attending_text, "model": model, "output_type": output_type,
+        "agent_style": output_agent_style, "session": session_id, "exam_type": exam_type, "stream_text": stream_output,
+        "use_cache": not bypass_cache, "prune_sections": prune_sections, "ollama_options": ollama_options,
+    }
+    if fused_agent_setting:
+        request.update(fused_prompt=fused_prompt, paragraph_prompt=system_prompt_paragraph_multi if output_setting else None)
+    elif output_agent_setting:
+        request.update(system_prompt=edited_prompt)
     else:
-        model_type = model in OLLAMA_MODEL
-        prompt = ""
-        ind = 1
-        for agent_prompt in multi_agent_prompts:
-            prompt += f"{ind}:\n{agent_prompt}\n\n"
-            ind += 1
-            agent_response = None
-            if model_type:
-                agent_response = extract_Ollama(agent_prompt,text,model)
-            else:
-                agent_response = asyncio.run(extract_OpenAI(agent_prompt,text,model))
-            clean = strip_llm_wrappers(agent_response)
-            df = string2df(clean)
-
-            multi_df = pd.concat([multi_df,df], ignore_index=True)
-        
-        if output_setting:
-            first_part = ""
-            second_part = ""
-            prompt += f"Paragraph Portion Prompt:\n{system_prompt_paragraph_multi}\n\n"
-            if model_type:
-                first_part = extract_Ollama(system_prompt_paragraph_multi,text,model)
-            else:
-                first_part = asyncio.run(extract_OpenAI(system_prompt_paragraph_multi,text,model))
-            
-            first_part = strip_llm_wrappers(first_part)
-
-            for _, row in multi_df.iterrows():             
-                second_part += f"\n\n{row["Difference Type"]}: \"{row["Resident Report"]}\" --> \"{row["Attending Report"]}\"\n\n{row["Explanation"]}"
-            
-            resp = first_part + second_part
-            st.write(resp)
-            st.session_state["results"].append({
-                "Model": model,
-                "Output Style": output_type,
-                "Single or Multi-Agent": output_agent_style,
-                "Prompt": prompt,
-                "Resident Note": resident_text.strip(),
-                "Attending Note": attending_text.strip(),
-                "Output": resp.strip(),
-            })
+        request.update(
+            agent_prompts=multi_agent_prompts, paragraph_prompt=system_prompt_paragraph_multi if output_setting else None,
+            max_concurrency=int(max_concurrency), category_modes=category_modes, section_memo=section_memo,
+            triage_model=triage_model, triage_thresholds=triage_thresholds)
+
+    try:
+        result = run_with_updates(lambda emit: compare(request, emit), show_update)
+    except (SchedulerBusy, RequestError) as e:
+        # Turned away before any call was queued
+        st.error(str(e))
+        st.stop()
+    except httpx.TransportError as e:
+        st.error(f"Comparison service unreachable at {SERVICE_URL}: {e}")
+        st.stop()
+    queue_status.empty()
+    live_output.empty()
+    record = result["record"]
+    table = pd.DataFrame(result["rows"], columns=COLUMNS)
+
+    store.add(record, session_id)
+    if record.get("Memo Lookups"):
+        st.caption(f"Reused {record['Memo Hits']} of {record['Memo Lookups']} section verdicts.")
+    if record.get("Triage Categories"):
+        st.caption(f"{record['Triage Model']} escalated {record['Escalated Categories']} of {record['Triage Categories']} categories "
+                   f"({record['Escalated Sections']} of {record['Triage Sections']} section checks) to {model}.")
+
+    # Display the result
+    if output_setting:
+        st.write(record["Output"])
+    else:
+        st.dataframe(table)
+
+    # Per-call breakdown, to see which agent dominates the latency
+    cached_tokens = f" ({record['Cached Tokens']} cached)" if record.get("Cached Tokens") else ""
+    with st.expander(f"Timing: {record['Seconds']:.1f} s, {record['Input Tokens']} input{cached_tokens} / {record['Output Tokens']} output tokens"):
+        calls = pd.DataFrame(json.loads(record["Call Timings"]))
+        if calls.empty:
+            st.caption("No model calls were made.")
         else:
-            st.dataframe(multi_df)
-
-            st.session_state["results"].append({
-                "Model": model,
-                "Output Style": output_type,
-                "Single or Multi-Agent": output_agent_style,
-                "Prompt": prompt,
-                "Resident Note": resident_text.strip(),
-                "Attending Note": attending_text.strip(),
-                "Output": multi_df.to_csv(index=False).strip(),
-            })
-
-# --- Generate download if there is anything to export ---
-export_columns = ["Number", "Model", "Output Style", "Single or Multi-Agent", "Prompt", "Resident Note", "Attending Note", "Output"]
-
-if "results" in st.session_state and st.session_state["results"]:
-    df_to_save = pd.DataFrame(st.session_state["results"])
-    df_to_save.insert(0, "Number", range(1, len(df_to_save) + 1))
+            slowest = calls.loc[calls["Wall (s)"].idxmax()]
+            st.caption(f"Slowest call: {slowest['Agent']} ({slowest['Wall (s)']:.2f} s). "
+                       f"Queue time is spent waiting for a concurrency or model slot; model load and prefill time are reported by Ollama only, cached tokens by OpenAI only.")
+            st.dataframe(calls.sort_values("Wall (s)", ascending=False), hide_index=True)
+
+# --- History ---
+st.subheader("History")
+scope = st.radio("Show", ["This Session", "All Sessions"], horizontal=True)
+scope_session = session_id if scope == "This Session" else None
+total = store.count(scope_session)
+pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+history = store.page(scope_session, (page - 1) * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE)
+if history:
+    st.dataframe(pd.DataFrame(history), hide_index=True)
+    selected = st.selectbox("Open Result", [row["ID"] for row in history])
+    with st.expander(f"Result {selected}"):
+        entry = store.get(selected)
+        st.write(f"{entry['Model']} · {entry['Output Style']} · {entry['Single or Multi-Agent']}")
+        st.text_area("Resident Note", entry["Resident Note"], disabled=True, key="history_resident")
+        st.text_area("Attending Note", entry["Attending Note"], disabled=True, key="history_attending")
+        st.text_area("Output", entry["Output"], height=250, disabled=True, key="history_output")
+        st.text_area("Prompt", entry["Prompt"], height=250, disabled=True, key="history_prompt")
 else:
-    df_to_save = pd.DataFrame(columns=export_columns)
-
-csv_buffer = StringIO()
-df_to_save.to_csv(csv_buffer, index=False)
-csv_data = csv_buffer.getvalue()
-
-# --- Render download button immediately ---
-st.download_button(
-    label="📥 Download All Results as CSV",
-    data=csv_data,
-    file_name="comparison_outputs.csv",
-    mime="text/csv"
-)
\ No newline at end of file
+    st.caption("No results yet.")
+
+# --- Export ---
+# Built only when asked for, from the results store; only results added since
+# the last download are serialized, and nothing is rebuilt on every rerun
+exports = st.session_state.setdefault("exports", {})
+if scope_session not in exports:
+    exports[scope_session] = ResultExport(store, scope_session)
+export_format = st.radio("Export Format", list(EXPORT_FORMATS), horizontal=True)
+last_id = store.last_id(scope_session)
+if st.button(f"Prepare Download ({total} results)", disabled=not total):
+    st.session_state["prepared_export"] = (export_format, scope_session, last_id)
+
+if st.session_state.get("prepared_export") == (export_format, scope_session, last_id):
+    file_name, mime = EXPORT_FORMATS[export_format]
+    st.download_button(
+        label=f"📥 Download {scope} as {export_format}",
+        data=exports[scope_session].data(export_format),
+        file_name=file_name,
+        mime=mime,
+        on_click="ignore",
+    )
@@ -0,0 +1,58 @@
+import datetime, time
+import streamlit as st
+from utils.Analytics_Store import get_analytics_store, GROUPS, PERIODS
+from utils.Results_Store import get_results_store
+
+st.set_page_config(page_title="Analytics – Report Comparison Tool", layout="wide")
+st.title("Comparison Analytics")
+
+# Results stored since the last visit are parsed into the Parquet tables first
+analytics = get_analytics_store()
+added = analytics.sync(get_results_store())
+options = analytics.options()
+if options["first"] is None:
+    st.info("No comparisons stored yet. Results from the main page (and batch.py --store-results) show up here.")
+    st.stop()
+if added:
+    st.caption(f"Added {added} new comparison{'s' if added != 1 else ''}.")
+
+# --- Filters ---
+with st.sidebar:
+    st.header("Filters")
+    first, last = options["first"].date(), options["last"].date()
+    dates = st.date_input("Date Range (UTC)", value=(first, last), min_value=first, max_value=last)
+    models = st.multiselect("Models", options["models"])
+    exam_types = st.multiselect("Exam Types", options["exam_types"])
+    agent_styles = st.multiselect("Agent Styles", options["agent_styles"])
+    per_comparison = st.checkbox("Per Comparison", value=False, help="Rows of each category per comparison instead of row counts.")
+
+filters = {"models": models, "exam_types": exam_types, "agent_styles": agent_styles}
+if len(dates) == 2:
+    filters["start"] = datetime.datetime.combine(dates[0], datetime.time())
+    filters["end"] = datetime.datetime.combine(dates[1] + datetime.timedelta(days=1), datetime.time())
+
+started = time.perf_counter()
+by_group = {label: analytics.category_counts(column, per_comparison, **filters) for label, column in GROUPS.items()}
+period = st.radio("Over Time By", list(PERIODS), index=1, horizontal=True)
+over_time = analytics.category_counts(PERIODS[period], per_comparison, **filters)
+sections = analytics.top_sections(**filters)
+elapsed = time.perf_counter() - started
+
+comparisons = int(over_time["Comparisons"].sum()) if len(over_time) else 0
+st.caption(f"{comparisons:,} comparisons, queried in {elapsed * 1000:.0f} ms.")
+categories = [str(category) for category in range(1, 8)]
+value_format = "{:.2f}" if per_comparison else "{:,.0f}"
+
+st.subheader("Difference Types Over Time")
+st.line_chart(over_time[categories])
+
+for label, frame in by_group.items():
+    st.subheader(f"Difference Types by {label}")
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.bar_chart(frame[categories], horizontal=True)
+    with col2:
+        st.dataframe(frame.style.format(value_format, subset=categories))
+
+st.subheader("Most Edited Sections")
+st.dataframe(sections.style.format({"Share of Comparisons": "{:.1%}"}), hide_index=True)
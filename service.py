@@ -0,0 +1,153 @@
+import argparse, asyncio, json
+from contextlib import asynccontextmanager
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from utils.Agent_Runner import openai_backend
+from utils.Backend_Clients import use_loop
+from utils.Comparison import OLLAMA_MODEL, OPENAI_MODEL, OUTPUT_TYPES, AGENT_STYLES
+from utils.Comparison_API import run_compare, run_batch, admit_request, batch_bodies, warm_up, backend_state, cache_stats, RequestError
+from utils.Report_Parsing import COLUMNS
+from utils.Scheduler import get_scheduler, SchedulerBusy
+
+# The comparison pipeline as an HTTP API. Every request runs on the server's
+# event loop, which the backends share (Backend_Clients.use_loop), so one
+# process keeps any number of comparisons in flight; the Scheduler limits
+# what reaches each model. Run with: python service.py --port 8000
+#   POST /compare  one report pair (Comparison_API for the JSON); with
+#                  "stream": true the reply is NDJSON events: "status" (queue
+#                  position), "text" (partial output), then "result" or "error"
+#   POST /batch    many pairs with shared settings; with "stream": true one
+#                  "item" event per pair as it finishes
+#   GET  /queue    calls running and waiting per model
+#   GET  /backends models loaded on the Ollama hosts and unreachable hosts
+#   GET  /cache    response cache hits, misses and size
+#   POST /warm-up  start loading {"model": ..., "ollama_options": ...}
+#   GET  /health   models, output types, agent styles and the row columns
+# Status and partial-output updates are gathered for FLUSH_INTERVAL seconds
+# and only the latest of each kind is sent
+COALESCED = {"status", "text"}
+FLUSH_INTERVAL = 0.05
+RETRY_AFTER = "30"
+
+def error(status: int, message: str, **headers) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status, headers=headers or None)
+
+async def read_body(request: Request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise RequestError("the request body is not valid JSON")
+
+def event_stream(run) -> StreamingResponse:
+    # run(emit) is a coroutine function; its updates and then its "result"
+    # (or "error") go out as NDJSON lines. A client that disconnects cancels it.
+    updates = asyncio.Queue()
+
+    async def produce():
+        try:
+            updates.put_nowait(("result", await run(updates.put_nowait)))
+        except Exception as e:
+            updates.put_nowait(("error", {"message": str(e) or repr(e)}))
+        finally:
+            updates.put_nowait(None)
+
+    async def lines():
+        task = asyncio.create_task(produce())
+        try:
+            finished = False
+            while not finished:
+                burst = [await updates.get()]
+                if burst[0] is not None and burst[0][0] in COALESCED:
+                    await asyncio.sleep(FLUSH_INTERVAL)
+                while not updates.empty():
+                    burst.append(updates.get_nowait())
+                finished = burst[-1] is None
+                burst = [update for update in burst if update is not None]
+                last = {kind: index for index, (kind, _) in enumerate(burst) if kind in COALESCED}
+                yield "".join(json.dumps({"event": kind, "data": data}) + "\n"
+                              for index, (kind, data) in enumerate(burst) if kind not in COALESCED or last[kind] == index)
+        finally:
+            task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def compare(request: Request):
+    try:
+        body = await read_body(request)
+        # Turned away before anything is queued or streamed
+        admit_request(body)
+    except RequestError as e:
+        return error(400, str(e))
+    except SchedulerBusy as e:
+        return error(503, str(e), **{"Retry-After": RETRY_AFTER})
+    if body.get("stream"):
+        return event_stream(lambda emit: run_compare(body, emit, admit=False))
+    try:
+        return JSONResponse(await run_compare(body, admit=False))
+    except Exception as e:
+        # The backends failed after their retries
+        return error(502, str(e) or repr(e))
+
+async def batch(request: Request):
+    try:
+        body = await read_body(request)
+        batch_bodies(body)
+    except RequestError as e:
+        return error(400, str(e))
+    if body.get("stream"):
+        return event_stream(lambda emit: run_batch(body, emit))
+    # Failed pairs are reported per item
+    return JSONResponse({"results": await run_batch(body)})
+
+async def queue(request: Request):
+    return JSONResponse(await get_scheduler().queue_state())
+
+async def backends(request: Request):
+    return JSONResponse(await backend_state())
+
+async def cache(request: Request):
+    return JSONResponse(cache_stats())
+
+async def warm(request: Request):
+    try:
+        warm_up(await read_body(request))
+    except RequestError as e:
+        return error(400, str(e))
+    return JSONResponse({"status": "loading"}, status_code=202)
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok", "models": OLLAMA_MODEL + OPENAI_MODEL, "output_types": OUTPUT_TYPES,
+                         "agent_styles": AGENT_STYLES, "columns": COLUMNS})
+
+@asynccontextmanager
+async def lifespan(app):
+    use_loop(asyncio.get_running_loop())
+    # Imported now rather than inside the first OpenAI call, where the import
+    # would hold up every request in flight
+    openai_backend()
+    yield
+
+app = Starlette(routes=[
+    Route("/compare", compare, methods=["POST"]),
+    Route("/batch", batch, methods=["POST"]),
+    Route("/queue", queue),
+    Route("/backends", backends),
+    Route("/cache", cache),
+    Route("/warm-up", warm, methods=["POST"]),
+    Route("/health", health),
+], lifespan=lifespan)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the comparison pipeline over HTTP (POST /compare, POST /batch).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    # One process: the Scheduler's limits and queues only hold within it
+    uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
@@ -0,0 +1,12 @@
+import os, tempfile
+from utils.Fake_LLM import FakeLLMServer
+
+# The backends read their settings on import, so the stand-in LLM server
+# (benchmark.py's) is started and pointed at before any test imports them
+server = FakeLLMServer(latency=0).start()
+workdir = tempfile.mkdtemp()
+os.environ.update(
+    OLLAMA_BASE_URL=server.url, OPENAI_BASE_URL=server.url + "/v1", OPENAI_API_KEY="test", OPENAI_AGENTS_DISABLE_TRACING="1",
+    RCT_CACHE_PATH=os.path.join(workdir, "responses.sqlite"), RCT_MEMO_PATH=os.path.join(workdir, "section_memo.sqlite"),
+    RCT_RESULTS_PATH=os.path.join(workdir, "results.sqlite"), RCT_ANALYTICS_PATH=os.path.join(workdir, "analytics"),
+)
@@ -0,0 +1,31 @@
+import pandas as pd
+from batch import parse_args, run_batch
+from utils.Backend_Clients import run_sync
+
+def write_reports(path, attending: str):
+    pd.DataFrame({
+        "V1 - resident": ["FINDINGS:\nLiver: Normal.\n\nIMPRESSION:\nNormal.", "IMPRESSION:\nNo fracture."],
+        "V2 - attending": ["FINDINGS:\nLiver: Enlarged.\n\nIMPRESSION:\nHepatomegaly.", attending],
+    }).to_csv(path, index=False)
+
+def run(tmp_path, *options) -> pd.DataFrame:
+    output = tmp_path / "out.csv"
+    args = parse_args([str(tmp_path / "reports.csv"), "--output", str(output), "--model", "gpt-4.1", "--no-cache", *options])
+    assert run_sync(run_batch(args)) == 0
+    return pd.read_csv(output)
+
+def test_checkpoint_reused_for_same_run(tmp_path, capsys):
+    write_reports(tmp_path / "reports.csv", "IMPRESSION:\nRib fracture.")
+    run(tmp_path)
+    run(tmp_path)
+    assert "2 rows already done, 0 to process" in capsys.readouterr().err
+
+def test_checkpoint_ignored_for_other_settings_or_input(tmp_path, capsys):
+    write_reports(tmp_path / "reports.csv", "IMPRESSION:\nRib fracture.")
+    run(tmp_path)
+    frame = run(tmp_path, "--agents", "single")
+    assert "0 rows already done, 2 to process" in capsys.readouterr().err
+    assert set(frame["Single or Multi-Agent"]) == {"Single Agent"}
+    write_reports(tmp_path / "reports.csv", "IMPRESSION:\nNo fracture. Small effusion.")
+    run(tmp_path, "--agents", "single")
+    assert "1 rows already done, 1 to process" in capsys.readouterr().err
@@ -0,0 +1,106 @@
+import asyncio, time
+import httpx
+import pytest
+import utils.Call_Policy as Call_Policy
+from utils.Backend_Clients import run_sync
+from utils.Call_Policy import DeadlineExceeded, call_with_policy
+
+MODEL = "gpt-4.1-mini"
+FALLBACK = "gpt-4.1"
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    monkeypatch.setattr(Call_Policy, "BACKOFF_BASE", 0)
+    monkeypatch.setattr(Call_Policy, "MAX_RETRIES", 2)
+    monkeypatch.setattr(Call_Policy, "_latencies", {})
+
+def failing(failures: int, error: Exception):
+    # A call that raises error for its first failures attempts
+    attempts = []
+
+    async def call(model: str) -> str:
+        attempts.append(model)
+        if len(attempts) <= failures:
+            raise error
+        return "answer"
+    return call, attempts
+
+def test_transient_errors_retried():
+    call, attempts = failing(2, httpx.ConnectError("refused"))
+    assert run_sync(call_with_policy(call, MODEL, False)) == ("answer", MODEL)
+    assert len(attempts) == 3
+
+def test_retries_give_up():
+    call, attempts = failing(5, httpx.ConnectError("refused"))
+    with pytest.raises(httpx.ConnectError):
+        run_sync(call_with_policy(call, MODEL, False))
+    assert len(attempts) == 3
+
+def test_other_errors_not_retried():
+    call, attempts = failing(1, ValueError("bad request"))
+    with pytest.raises(ValueError):
+        run_sync(call_with_policy(call, MODEL, False))
+    assert len(attempts) == 1
+
+def test_retry_vetoed():
+    call, attempts = failing(1, httpx.ConnectError("refused"))
+    with pytest.raises(httpx.ConnectError):
+        run_sync(call_with_policy(call, MODEL, False, retryable=lambda: False))
+    assert len(attempts) == 1
+
+def test_deadline_retried(monkeypatch):
+    monkeypatch.setattr(Call_Policy, "CALL_DEADLINE", 0.05)
+    attempts = []
+
+    async def call(model: str) -> str:
+        attempts.append(model)
+        if len(attempts) == 1:
+            await asyncio.sleep(1)
+        return "answer"
+
+    assert run_sync(call_with_policy(call, MODEL, False)) == ("answer", MODEL)
+    assert len(attempts) == 2
+
+def test_stream_idle_deadline(monkeypatch):
+    monkeypatch.setattr(Call_Policy, "CALL_DEADLINE", 0.1)
+    monkeypatch.setattr(Call_Policy, "STREAM_IDLE_DEADLINE", 0.1)
+    last_chunk = None
+
+    async def stream(model: str) -> str:
+        # Runs past CALL_DEADLINE while chunks keep coming, then stalls
+        nonlocal last_chunk
+        for _ in range(6):
+            await asyncio.sleep(0.04)
+            last_chunk = time.monotonic()
+        await asyncio.sleep(1)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="sent nothing"):
+        run_sync(call_with_policy(stream, MODEL, False, hedge=False, retryable=lambda: last_chunk is None, progress=lambda: last_chunk))
+    assert 0.24 < time.perf_counter() - start < 0.6
+
+def test_slow_call_hedged_to_fallback(monkeypatch):
+    monkeypatch.setattr(Call_Policy, "HEDGE", True)
+    monkeypatch.setitem(Call_Policy.HEDGE_MODELS, MODEL, FALLBACK)
+    for _ in range(Call_Policy.MIN_SAMPLES):
+        Call_Policy.observe_latency(MODEL, 0.02)
+
+    async def call(model: str) -> str:
+        await asyncio.sleep(1 if model == MODEL else 0)
+        return model
+
+    start = time.perf_counter()
+    assert run_sync(call_with_policy(call, MODEL, False)) == (FALLBACK, FALLBACK)
+    assert time.perf_counter() - start < 0.5
+
+def test_no_hedge_without_samples(monkeypatch):
+    monkeypatch.setattr(Call_Policy, "HEDGE", True)
+    calls = []
+
+    async def call(model: str) -> str:
+        calls.append(model)
+        await asyncio.sleep(0.05)
+        return model
+
+    assert run_sync(call_with_policy(call, MODEL, False)) == (MODEL, MODEL)
+    assert calls == [MODEL]
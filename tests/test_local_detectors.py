@@ -0,0 +1,44 @@
+from io import StringIO
+import pandas as pd
+from utils.Backend_Clients import run_sync
+from utils.Comparison import run_comparison
+from utils.Local_Detectors import DETECTORS
+from utils.Report_Parsing import COLUMNS
+
+RESIDENT = "FINDINGS:\nLiver: Normal in size.\nSpleen: Normal.\n\nIMPRESSION:\nNo acute abnormality."
+ATTENDING = ("FINDINGS:\nLiver: Normal in size. No ascites.\nSpleen: Normal.\n\n"
+             "IMPRESSION:\nNo acute abnormality. Recommend follow-up ultrasound in 6 months.")
+
+def compare(output_type: str, category_modes: dict, resident: str = RESIDENT, attending: str = ATTENDING):
+    return run_sync(run_comparison(resident, attending, "gpt-4.1", output_type, "Multi-Agent",
+                                   use_cache=False, category_modes=category_modes))
+
+def expected_rows(category: int, resident: str = RESIDENT, attending: str = ATTENDING) -> list:
+    rows = DETECTORS[category](resident, attending)
+    assert rows
+    return [[row[column] for column in COLUMNS] for row in rows]
+
+def test_local_rows_in_table():
+    _, table = compare("Table Output", {3: "Local", 6: "Local"})
+    for category in DETECTORS:
+        rows = table[table["Difference Type"] == str(category)].values.tolist()
+        assert rows == expected_rows(category)
+    assert not (table["Section"] == "Section").any()
+
+def test_local_rows_in_paragraph():
+    record, table = compare("Paragraph Output", {3: "Local"})
+    assert table is None
+    for section, resident, attending, category, explanation in expected_rows(3):
+        assert f'{category}: "{resident}" --> "{attending}"\n\n{explanation}' in record["Output"]
+    assert '"Resident Report" --> "Attending Report"' not in record["Output"]
+    rows = pd.read_csv(StringIO(record["Difference Rows"]), dtype=str)
+    assert rows[rows["Difference Type"] == "3"].values.tolist() == expected_rows(3)
+
+def test_confirmation_without_hits():
+    # No added recommendation: category 6 makes no call and adds no rows
+    attending = ATTENDING.replace(" Recommend follow-up ultrasound in 6 months.", "")
+    assert not DETECTORS[6](RESIDENT, attending)
+    record, table = compare("Table Output", {3: "Local + LLM Confirmation", 6: "Local + LLM Confirmation"}, attending=attending)
+    assert "6 (Local + LLM Confirmation): local detector" in record["Prompt"]
+    assert not (table["Difference Type"] == "6").any()
+    assert not (table["Section"] == "Section").any()
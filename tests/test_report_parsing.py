@@ -0,0 +1,64 @@
+from utils.Report_Parsing import COLUMNS, RowParser, ThinkFilter, parse_rows, string2df
+
+HEADER = '"Section","Resident Report","Attending Report","Difference Type","Explanation"'
+
+def test_multiple_categories_kept():
+    rows = parse_rows("\n".join([
+        HEADER,
+        '"Liver","Normal.","Hepatomegaly.","1, 4, 4","Report the enlarged liver."',
+        '"Lungs","Clear.","Clear, no effusion.","[3, 7]","Add the pertinent negative."',
+        '"Spleen","Normal.","Normal.","Category 5","Correct the diagnosis."',
+    ]))
+    assert [row[3] for row in rows] == ["1, 4, 4", "3, 7", "5"]
+
+def test_unquoted_category_list():
+    rows = parse_rows("Section,Resident Report,Attending Report,Difference Type,Explanation\n"
+                      "Liver,Normal.,Hepatomegaly.,1, 4,Report the enlarged liver, and its size.")
+    assert rows == [["Liver", "Normal.", "Hepatomegaly.", "1, 4", "Report the enlarged liver, and its size."]]
+
+def test_quoted_commas_and_quotes():
+    rows = parse_rows(HEADER + '\n"Lungs","Clear, no consolidation.","Clear, no "acute" findings, no effusion.","3","Add ""effusion""."')
+    assert rows == [["Lungs", "Clear, no consolidation.", 'Clear, no "acute" findings, no effusion.', "3", 'Add "effusion".']]
+
+def test_wrappers_dropped():
+    response = ("<think>Compare the liver, then \"the lungs\".\nSection,Notes\n</think>\n```csv\n" + HEADER
+                + '\n"Liver","Normal.","Hepatomegaly.","1","Report the enlarged liver."\n```\nThat is all.')
+    frame = string2df(response)
+    assert list(frame.columns) == COLUMNS
+    assert frame.values.tolist() == [["Liver", "Normal.", "Hepatomegaly.", "1", "Report the enlarged liver."]]
+
+def feed_in_pieces(text: str, size: int) -> list:
+    parser = RowParser()
+    rows = []
+    for start in range(0, len(text), size):
+        rows += parser.feed(text[start:start + size])
+    return rows + parser.close()
+
+def test_rows_split_across_chunks():
+    response = ("<think>Check each section.</think>\n```csv\n" + HEADER
+                + '\n"Liver","Normal.","Hepatomegaly, 19 cm.","1","Report the\nenlarged liver."'
+                + '\n"Lungs","Clear.","Clear, no ""acute"" findings.","3","Add the negative."\n```')
+    whole = parse_rows(response)
+    assert whole == [
+        ["Liver", "Normal.", "Hepatomegaly, 19 cm.", "1", "Report the\nenlarged liver."],
+        ["Lungs", "Clear.", 'Clear, no "acute" findings.', "3", "Add the negative."],
+    ]
+    for size in (1, 2, 3, 7, 64):
+        assert feed_in_pieces(response, size) == whole
+
+def test_think_tags_split_across_chunks():
+    think = ThinkFilter()
+    visible = "".join(think.feed(chunk) for chunk in ["Before <th", "ink>hidden</thi", "nk> after <", "b>"]) + think.flush()
+    assert visible == "Before  after <b>"
+
+def test_unterminated_think_dropped():
+    think = ThinkFilter()
+    assert think.feed("Answer.<think>still reasoning") == "Answer."
+    assert think.flush() == ""
+    rows = feed_in_pieces(HEADER + '\n"Liver","Normal.","Hepatomegaly.","1","Report it."\n<think>"Lungs","Clear.","Effusion.","3","Add it."', 5)
+    assert rows == [["Liver", "Normal.", "Hepatomegaly.", "1", "Report it."]]
+
+def test_unterminated_quoted_field_flushed_on_close():
+    parser = RowParser()
+    assert parser.feed(HEADER + '\n"Liver","Normal.","Hepatomegaly.","1","Report the enlarged') == []
+    assert parser.close() == [["Liver", "Normal.", "Hepatomegaly.", "1", "Report the enlarged"]]
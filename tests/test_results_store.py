@@ -0,0 +1,12 @@
+import os
+from utils.Results_Store import ResultsStore
+
+def test_record_fields_round_trip(tmp_path):
+    store = ResultsStore(os.path.join(tmp_path, "results.sqlite"))
+    record = {
+        "Model": "gpt-4.1", "Output Style": "Table Output", "Single or Multi-Agent": "Multi-Agent",
+        "Cached Tokens": 1024, "Memo Hits": 3, "Memo Lookups": 7, "Triage Model": "gpt-4.1-mini",
+        "Escalated Categories": 2, "Triage Categories": 7, "Escalated Sections": 3, "Triage Sections": 21,
+    }
+    stored = store.get(store.add(record, "session"))
+    assert {key: stored[key] for key in record} == record
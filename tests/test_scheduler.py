@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+import utils.Scheduler as Scheduler_Module
+from utils.Backend_Clients import run_sync
+from utils.Scheduler import Scheduler, SchedulerBusy, scheduler_job
+
+MODEL = "gpt-4.1-mini"
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setitem(Scheduler_Module.MODEL_CONCURRENCY, MODEL, 1)
+    return Scheduler()
+
+def test_round_robin_between_sessions(scheduler):
+    served = []
+
+    async def call(session: str, name: str):
+        with scheduler_job(session):
+            async with scheduler.slot(MODEL, False):
+                served.append(name)
+                await asyncio.sleep(0.01)
+
+    async def main():
+        # The first call holds the only slot while the rest queue up in order
+        tasks = [asyncio.ensure_future(call("a", "a1"))]
+        await asyncio.sleep(0)
+        for session, name in [("a", "a2"), ("a", "a3"), ("a", "a4"), ("b", "b1"), ("b", "b2")]:
+            tasks.append(asyncio.ensure_future(call(session, name)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    run_sync(main())
+    assert served == ["a1", "a2", "b1", "a3", "b2", "a4"]
+
+def test_cancelled_waiter_gives_up_its_place(scheduler):
+    served = []
+
+    async def call(name: str):
+        async with scheduler.slot(MODEL, False):
+            served.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        first = asyncio.ensure_future(call("first"))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(call("cancelled"))
+        last = asyncio.ensure_future(call("last"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(first, last)
+        return await scheduler.queue_state()
+
+    state = run_sync(main())
+    assert served == ["first", "last"]
+    assert state[MODEL]["running"] == 0 and state[MODEL]["queued"] == 0
+
+def test_admission_refuses_long_queues(scheduler, monkeypatch):
+    monkeypatch.setattr(Scheduler_Module, "MAX_QUEUED_CALLS", 3)
+    monkeypatch.setattr(Scheduler_Module, "MAX_WAIT_SECONDS", 10)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def call():
+            async with scheduler.slot(MODEL, False):
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(call()) for _ in range(3)]
+        await asyncio.sleep(0)
+        try:
+            # Free slot taken, two calls waiting
+            with pytest.raises(SchedulerBusy, match="already waiting"):
+                scheduler.admit(MODEL, False, 2)
+            scheduler.admit(MODEL, False, 1)
+            # Too much work queued once calls are known to take 6 s each
+            scheduler._queue(MODEL, False).mean_seconds = 6
+            with pytest.raises(SchedulerBusy, match="queued work"):
+                scheduler.admit(MODEL, False, 1)
+            assert not scheduler.has_capacity(MODEL, False)
+        finally:
+            release.set()
+            await asyncio.gather(*tasks)
+        # Nothing in flight: always admitted
+        scheduler.admit(MODEL, False, 100)
+
+    run_sync(main())
@@ -0,0 +1,24 @@
+from utils.Backend_Clients import run_sync
+from utils.Comparison import run_comparison
+from utils.Section_Memo import get_section_memo
+
+RESIDENT = "FINDINGS:\nLiver: Normal in size.\nSpleen: Normal.\n\nIMPRESSION:\nNo acute abnormality."
+ATTENDING = "FINDINGS:\nLiver: Enlarged, 19 cm.\nSpleen: Normal.\n\nIMPRESSION:\nHepatomegaly."
+
+def compare(use_cache: bool) -> dict:
+    record, _ = run_sync(run_comparison(RESIDENT, ATTENDING, "gpt-4.1", "Table Output", "Multi-Agent",
+                                        use_cache=use_cache, section_memo=True))
+    return record
+
+def test_memo_bypassed_with_cache():
+    memo = get_section_memo()
+    memo.clear()
+    record = compare(use_cache=False)
+    assert "Memo Lookups" not in record
+    assert memo.stats() == {"hits": 0, "misses": 0, "entries": 0}
+
+def test_memo_reused_with_cache():
+    get_section_memo().clear()
+    compare(use_cache=True)
+    record = compare(use_cache=True)
+    assert record["Memo Lookups"] and record["Memo Hits"] == record["Memo Lookups"]
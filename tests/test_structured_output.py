@@ -0,0 +1,25 @@
+import json
+import pytest
+import utils.Agent_Runner as Agent_Runner
+from utils.Backend_Clients import run_sync
+from utils.Response_Cache import get_response_cache
+from utils.Structured_Output import structured2df
+
+ROW = {"section": "Impression", "resident_report": "No acute abnormality.", "attending_report": "Hepatomegaly.", "difference_type": 3, "explanation": "Missed finding."}
+
+def test_wrapped_document_parsed():
+    frame = structured2df("<think>rows</think>\n```json\n" + json.dumps({"rows": [ROW]}) + "\n```")
+    assert frame["Difference Type"].tolist() == ["3"]
+
+@pytest.mark.parametrize("response", ['{"rows": [{"section": "Impression",', "No differences found.", '{"rows": [{"section": 1}]}'])
+def test_malformed_document_raises(response):
+    with pytest.raises(ValueError):
+        structured2df(response)
+
+def test_malformed_document_not_cached(monkeypatch):
+    async def truncated(prompt, text, model, schema, ollama_options):
+        return '{"rows": [{"section": "Impression",'
+    monkeypatch.setattr(Agent_Runner, "extract_Ollama_async", truncated)
+    with pytest.raises(ValueError):
+        run_sync(Agent_Runner.extract("Fused prompt", "Report pair", "llama3.3:latest", True, structured=True))
+    assert get_response_cache().get("llama3.3:latest (structured)", "Fused prompt", "Report pair") is None
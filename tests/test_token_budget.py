@@ -0,0 +1,51 @@
+import utils.Token_Budget as Token_Budget
+from utils.Comparison import build_text
+from utils.Report_Sections import parse_sections
+from utils.Token_Budget import chunk_reports, context_size, count_tokens, fits, output_reserve, prompt_tokens
+
+MODEL = "gpt-4.1"
+PROMPT = "Compare the reports."
+ORGANS = ["Liver", "Gallbladder", "Pancreas", "Bowel", "Bladder", "Bones"]
+FILLER = "Unremarkable appearance without focal lesion, mass, collection or other abnormality. " * 2
+
+def reports() -> tuple:
+    resident = ["EXAM: CT abdomen and pelvis."] + [f"{organ}: {FILLER}" for organ in ORGANS[:3]]
+    resident += [f"Spleen/Adrenals/Kidneys: {FILLER}"] + [f"{organ}: {FILLER}" for organ in ORGANS[3:]]
+    attending = ["EXAM: CT abdomen and pelvis."] + [f"{organ}: {FILLER}" for organ in ORGANS[:3]]
+    attending += [f"{organ}: {FILLER}" for organ in ["Spleen", "Adrenals", "Kidneys"]] + [f"{organ}: {FILLER}Changed." for organ in ORGANS[3:]]
+    return "\n".join(resident), "\n".join(attending)
+
+def split(chunk: str) -> tuple:
+    resident, attending = chunk[len("Resident Report:\n"):].split("\n\nAttending Report:\n")
+    return [name for name, _ in parse_sections(resident)], [name for name, _ in parse_sections(attending)]
+
+def test_small_reports_not_chunked():
+    resident, attending = reports()
+    assert chunk_reports(resident, attending, PROMPT, MODEL, False, build_text) == [build_text(resident, attending)]
+
+def test_chunks_keep_aligned_sections_together(monkeypatch):
+    resident, attending = reports()
+    # Room for about three sections a side per call
+    overhead = prompt_tokens(PROMPT, MODEL) + output_reserve(MODEL) + count_tokens(build_text("", ""), MODEL)
+    monkeypatch.setitem(Token_Budget.CALL_BUDGET, "openai", overhead + 6 * count_tokens(f"Liver: {FILLER}", MODEL))
+    chunks = chunk_reports(resident, attending, PROMPT, MODEL, False, build_text)
+    assert len(chunks) > 1
+
+    names = [split(chunk) for chunk in chunks]
+    # Every section is sent exactly once, in report order
+    assert [name for resident_names, _ in names for name in resident_names] == [name for name, _ in parse_sections(resident)]
+    assert [name for _, attending_names in names for name in attending_names] == [name for name, _ in parse_sections(attending)]
+    # The combined resident section travels with the attending sections it covers
+    combined = [attending_names for resident_names, attending_names in names if "Spleen/Adrenals/Kidneys" in resident_names]
+    assert combined and {"Spleen", "Adrenals", "Kidneys"} <= set(combined[0])
+    for resident_names, attending_names in names:
+        assert [name for name in resident_names if "/" not in name] == \
+               [name for name in attending_names if name not in ("Spleen", "Adrenals", "Kidneys")]
+    # The combined section's group is the only one allowed over budget
+    for chunk, (resident_names, _) in zip(chunks, names):
+        assert fits(PROMPT, chunk, MODEL, False) or "Spleen/Adrenals/Kidneys" in resident_names
+
+def test_context_size_powers_of_two():
+    assert context_size([PROMPT], ["Short report."], MODEL) == Token_Budget.DEFAULT_CONTEXT
+    size = context_size([PROMPT], ["word " * 20000], "llama3.3:latest")
+    assert size > Token_Budget.DEFAULT_CONTEXT and size & (size - 1) == 0
@@ -0,0 +1,140 @@
+import asyncio, sys, threading, time
+from contextlib import nullcontext
+from utils.Ollama_Agent import extract_Ollama_async, stream_Ollama
+from utils.Report_Parsing import ThinkFilter, merge_responses
+from utils.Response_Cache import get_response_cache
+from utils.Structured_Output import DifferenceTable, DIFFERENCE_SCHEMA, parse_structured
+from utils.Call_Stats import track_call, record_usage
+from utils.Call_Policy import call_with_policy
+from utils.Prompt_Layout import shared_prefix
+
+MAX_CONCURRENCY = 8
+
+def openai_backend():
+    # The agents SDK (with openai, pydantic models and mcp) takes over a second
+    # to import, so it is only loaded once an OpenAI model is used
+    from utils import OpenAI_Agent
+    return OpenAI_Agent
+
+def warm_up_OpenAI():
+    # Imports the OpenAI backend in the background, e.g. as soon as an OpenAI
+    # model is selected; a no-op once it is loaded
+    if "utils.OpenAI_Agent" not in sys.modules:
+        threading.Thread(target=openai_backend, name="openai-import", daemon=True).start()
+
+async def extract(prompt: str, text: str, model: str, use_ollama: bool, use_cache: bool = True, structured: bool = False, ollama_options: dict = None) -> str:
+    # structured=True asks for a DifferenceTable JSON document instead of free
+    # text, or structured=<pydantic model> for a document of that model;
+    # ollama_options ({"keep_alive", "num_ctx"}) only apply to Ollama models
+    output_type = DifferenceTable if structured is True else structured
+    schema = DIFFERENCE_SCHEMA if structured is True else output_type.model_json_schema() if structured else None
+    cache = get_response_cache() if use_cache else None
+    cache_model = model if not structured else model + (" (structured)" if structured is True else f" ({output_type.__name__})")
+    if cache is not None:
+        cached = cache.get(cache_model, prompt, text)
+        if cached is not None:
+            record_usage(cached=True)
+            return cached
+
+    async def call(use_model: str) -> str:
+        if use_ollama:
+            return await extract_Ollama_async(prompt, text, use_model, schema, ollama_options)
+        if structured:
+            return await openai_backend().extract_OpenAI_structured(prompt, text, use_model, output_type)
+        return await openai_backend().extract_OpenAI(prompt, text, use_model)
+
+    # Cache hits above never wait for a backend slot
+    response, served_by = await call_with_policy(call, model, use_ollama)
+    if structured:
+        # A malformed document raises here, before it can be cached
+        parse_structured(response, output_type)
+    # A hedge answered by a fallback model is not this model's answer to cache
+    if cache is not None and served_by == model:
+        cache.put(cache_model, prompt, text, response)
+    return response
+
+async def extract_streaming(prompt: str, text: str, model: str, use_ollama: bool, on_text, use_cache: bool = True, ollama_options: dict = None) -> str:
+    # Same as extract, but calls on_text with the visible (think-free) text so far
+    # as tokens arrive. Returns the full raw response.
+    think = ThinkFilter()
+    cache = get_response_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(model, prompt, text)
+        if cached is not None:
+            record_usage(cached=True)
+            on_text(think.feed(cached) + think.flush())
+            return cached
+
+    raw = []
+    visible = ""
+    last_chunk = None
+
+    async def call(use_model: str) -> str:
+        nonlocal visible, last_chunk
+        stream = stream_Ollama(prompt, text, use_model, ollama_options) if use_ollama else openai_backend().stream_OpenAI(prompt, text, use_model)
+        async for chunk in stream:
+            last_chunk = time.monotonic()
+            raw.append(chunk)
+            new_text = think.feed(chunk)
+            if new_text:
+                visible += new_text
+                on_text(visible)
+        return "".join(raw)
+
+    # Only retried while nothing has arrived yet; bounded by the gap between
+    # chunks rather than the total time, so long answers are not cut off
+    response, _ = await call_with_policy(call, model, use_ollama, hedge=False, retryable=lambda: not raw, progress=lambda: last_chunk)
+    visible += think.flush()
+    on_text(visible)
+
+    if cache is not None:
+        cache.put(model, prompt, text, response)
+    return response
+
+async def extract_chunks(prompt: str, texts: list, model: str, use_ollama: bool, use_cache: bool = True, structured: bool = False,
+                         ollama_options: dict = None, on_text=None, semaphore: asyncio.Semaphore = None, label: str = "Agent") -> str:
+    # Map-reduce over the section chunks from Token_Budget.chunk_reports: one
+    # call per chunk, partial outputs merged. A single chunk is a plain call
+    # (streamed if on_text is given). label names the calls in Call_Stats.
+    async def call(text: str, stream: bool, agent: str) -> str:
+        queued_at = time.perf_counter()
+        async with semaphore or nullcontext():
+            with track_call(agent, model, queued_at):
+                if stream:
+                    return await extract_streaming(prompt, text, model, use_ollama, on_text, use_cache, ollama_options)
+                return await extract(prompt, text, model, use_ollama, use_cache, structured, ollama_options)
+
+    if len(texts) == 1:
+        return await call(texts[0], on_text is not None and not structured, label)
+    responses = await asyncio.gather(*(
+        call(text, False, f"{label} (chunk {i}/{len(texts)})") for i, text in enumerate(texts, start=1)
+    ))
+    merged = merge_responses(responses)
+    if on_text is not None:
+        on_text(merged)
+    return merged
+
+async def run_agents(prompts: list, texts: list, model: str, use_ollama: bool, max_concurrency: int = MAX_CONCURRENCY, use_cache: bool = True, on_text: dict = None, ollama_options: dict = None, labels: list = None, prompt_texts: dict = None, separate: set = None) -> list:
+    # texts is the report pair as one or more section chunks; on_text optionally
+    # maps a prompt index to a callback that receives that agent's streamed text,
+    # and prompt_texts to chunks that agent gets instead of texts. The prompts
+    # at the separate indices (e.g. the paragraph agent's, which asks for no
+    # table) are always sent as the system message.
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    on_text = on_text or {}
+    prompt_texts = prompt_texts or {}
+    labels = labels or [f"Agent {index}" for index in range(1, len(prompts) + 1)]
+
+    # Every agent gets the same report text, so on Ollama it goes before the
+    # prompts (Prompt_Layout) where the KV cache can reuse it. No warm-up call
+    # first: the agents that get a slot at once each prefill it, and the ones
+    # queued behind them (Scheduler) find it cached.
+    shared = [index for index in range(len(prompts)) if index not in (separate or ())]
+    fan_out = len(shared) > 1 and use_ollama
+
+    async def run_one(index: int, prompt: str) -> str:
+        with shared_prefix() if fan_out and index in shared else nullcontext():
+            return await extract_chunks(prompt, prompt_texts.get(index, texts), model, use_ollama, use_cache, False, ollama_options, on_text.get(index), semaphore, labels[index])
+
+    # gather keeps the responses in the same order as the prompts
+    return await asyncio.gather(*(run_one(index, prompt) for index, prompt in enumerate(prompts)))
@@ -0,0 +1,70 @@
+import re
+import pandas as pd
+from utils.Report_Sections import heading_tokens
+
+CATEGORIES = [str(category) for category in range(1, 8)]
+
+def label_categories(label, aliases: dict = None) -> list:
+    # "1, 4" -> ["1", "4"]; aliases maps word labels (lower case, e.g.
+    # "addition") to a category
+    label = (aliases or {}).get(str(label).strip().lower(), label)
+    return list(dict.fromkeys(re.findall(r"[1-7]", str(label))))
+
+def split_categories(df: pd.DataFrame, aliases: dict = None) -> pd.DataFrame:
+    # One row per category, so "1, 4" counts as a 1 row and a 4 row; rows
+    # without a category 1-7 are dropped
+    if df is None or df.empty or "Difference Type" not in df.columns:
+        return pd.DataFrame(columns=["Section", "Difference Type"])
+    categories = df["Difference Type"].map(lambda label: label_categories(label, aliases))
+    return df.assign(**{"Difference Type": categories}).explode("Difference Type").dropna(subset=["Difference Type"]).reset_index(drop=True)
+
+def row_keys(df: pd.DataFrame) -> list:
+    # (heading tokens, category) for every row of a comparison table
+    if df is None or df.empty or "Difference Type" not in df.columns:
+        return []
+    sections = df["Section"] if "Section" in df.columns else [""] * len(df)
+    return [
+        (heading_tokens(str(section)), str(category).strip())
+        for section, category in zip(sections, df["Difference Type"])
+    ]
+
+def match_rows(candidate: list, reference: list) -> int:
+    # Greedy one-to-one matching: same category, overlapping section heading
+    unused = list(reference)
+    matched = 0
+    for tokens, category in candidate:
+        for i, (ref_tokens, ref_category) in enumerate(unused):
+            if category == ref_category and tokens & ref_tokens:
+                matched += 1
+                del unused[i]
+                break
+    return matched
+
+def agreement(candidate_df: pd.DataFrame, reference_df: pd.DataFrame) -> dict:
+    # Scores candidate rows (e.g. the fused agent) against reference rows
+    # (e.g. the seven-agent output), overall and per category
+    candidate, reference = row_keys(candidate_df), row_keys(reference_df)
+    scores = {"Candidate Rows": len(candidate), "Reference Rows": len(reference), "Matched": match_rows(candidate, reference)}
+    for category in CATEGORIES:
+        scores[f"Matched {category}"] = match_rows(
+            [key for key in candidate if key[1] == category],
+            [key for key in reference if key[1] == category],
+        )
+        scores[f"Candidate {category}"] = sum(1 for key in candidate if key[1] == category)
+        scores[f"Reference {category}"] = sum(1 for key in reference if key[1] == category)
+    return scores
+
+def summarize(scores: list) -> pd.DataFrame:
+    # Micro-averaged precision/recall/F1 per category over many comparisons
+    totals = pd.DataFrame(scores).sum(numeric_only=True)
+    summary = []
+    for label, suffix in [("All", "")] + [(category, f" {category}") for category in CATEGORIES]:
+        matched = totals.get("Matched" + suffix, 0)
+        candidate = totals.get("Candidate" + (suffix or " Rows"), 0)
+        reference = totals.get("Reference" + (suffix or " Rows"), 0)
+        precision = matched / candidate if candidate else float("nan")
+        recall = matched / reference if reference else float("nan")
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else float("nan")
+        summary.append({"Category": label, "Candidate Rows": int(candidate), "Reference Rows": int(reference),
+                        "Matched": int(matched), "Precision": precision, "Recall": recall, "F1": f1})
+    return pd.DataFrame(summary)
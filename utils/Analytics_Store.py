@@ -0,0 +1,219 @@
+import glob, os, re, threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from utils.Report_Parsing import parse_rows
+from utils.Report_Sections import heading_tokens
+
+ANALYTICS_PATH = os.environ.get("RCT_ANALYTICS_PATH", os.path.join("results", "analytics"))
+# Part files per table before they are merged into one
+COMPACT_FILES = 16
+
+# The parsed Difference Type rows of every stored result, as Parquet files
+# under ANALYTICS_PATH: "comparisons" has one row per result (the denominators)
+# and "differences" one row per table row. sync() appends the results added
+# to the ResultsStore since the last sync as one part file per table, so each
+# result is parsed once; queries read only the columns they need and
+# aggregate with Arrow. Everything here can be rebuilt from the ResultsStore.
+COMPARISONS = pa.schema([
+    ("result_id", pa.int64()),
+    ("created", pa.timestamp("s")),
+    ("session", pa.string()),
+    ("model", pa.string()),
+    ("output_style", pa.string()),
+    ("agent_style", pa.string()),
+    ("exam_type", pa.string()),
+    ("differences", pa.int32()),
+])
+DIFFERENCES = pa.schema([
+    ("result_id", pa.int64()),
+    ("created", pa.timestamp("s")),
+    ("model", pa.string()),
+    ("agent_style", pa.string()),
+    ("exam_type", pa.string()),
+    ("section", pa.string()),
+    ("section_key", pa.string()),
+    ("difference_type", pa.int8()),
+])
+TABLES = {"comparisons": COMPARISONS, "differences": DIFFERENCES}
+
+# Grouping choices for category_counts; the periods group over time
+GROUPS = {"Exam Type": "exam_type", "Model": "model", "Agent Style": "agent_style"}
+PERIODS = {"Day": "day", "Week": "week", "Month": "month"}
+UNKNOWN_EXAM = "Unknown"
+
+def section_key(section: str) -> str:
+    # "Spleen/Adrenals/Kidneys" and "Kidneys, Spleen, Adrenal glands" count as one section
+    return " / ".join(sorted(heading_tokens(section) - {""})) or "(none)"
+
+def difference_types(value) -> list:
+    # "1", "1.0" or "Category 1: ..." -> [1]; "1, 4" -> [1, 4]; [None] if
+    # there is no category number
+    return [int(digit) for digit in re.findall(r"[1-7]", str(value))] or [None]
+
+def result_rows(result: dict) -> tuple:
+    # (comparison row, difference rows) for one ResultsStore.iter_differences item
+    rows = parse_rows(result["Difference Rows"] or "")
+    base = {
+        "result_id": result["ID"],
+        "created": int(result["Created"]),
+        "model": result["Model"],
+        "agent_style": result["Single or Multi-Agent"],
+        "exam_type": result["Exam Type"] or UNKNOWN_EXAM,
+    }
+    # A row listing several categories counts once for each
+    differences = [
+        {**base, "section": section, "section_key": section_key(section), "difference_type": difference_type}
+        for section, _, _, category, _ in rows for difference_type in difference_types(category)
+    ]
+    comparison = {**base, "session": result["Session"], "output_style": result["Output Style"], "differences": len(differences)}
+    return comparison, differences
+
+class AnalyticsStore:
+    def __init__(self, path: str = ANALYTICS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # name -> (part files it was read from, table)
+        self._loaded = {}
+        for name in TABLES:
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+
+    def _files(self, name: str) -> list:
+        return sorted(glob.glob(os.path.join(self.path, name, "part-*.parquet")))
+
+    def table(self, name: str) -> pa.Table:
+        # Read once and kept until a sync or compaction changes the part files
+        files = self._files(name)
+        signature = [(file, os.path.getmtime(file)) for file in files]
+        loaded = self._loaded.get(name)
+        if loaded is None or loaded[0] != signature:
+            # One multithreaded read over all the part files
+            table = pq.read_table(files, schema=TABLES[name]) if files else TABLES[name].empty_table()
+            loaded = self._loaded[name] = (signature, table.combine_chunks())
+        return loaded[1]
+
+    def last_id(self) -> int:
+        ids = self.table("comparisons")["result_id"]
+        return pc.max(ids).as_py() if len(ids) else 0
+
+    def _write(self, name: str, rows: list, first_id: int):
+        # Named by the first result id, so a sync retried after a crash
+        # rewrites the same part rather than adding a duplicate
+        target = os.path.join(self.path, name, f"part-{first_id:012d}.parquet")
+        pq.write_table(pa.Table.from_pylist(rows, schema=TABLES[name]), target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+    def sync(self, results_store) -> int:
+        # Adds the results stored since the last sync; returns how many. Only
+        # one process should sync a given ANALYTICS_PATH at a time.
+        with self._lock:
+            after = self.last_id()
+            comparisons, differences = [], []
+            for results in results_store.iter_differences(after):
+                for result in results:
+                    comparison, rows = result_rows(result)
+                    comparisons.append(comparison)
+                    differences += rows
+            if not comparisons:
+                return 0
+            # differences first: a part counts as synced once its comparisons exist
+            self._write("differences", differences, comparisons[0]["result_id"])
+            self._write("comparisons", comparisons, comparisons[0]["result_id"])
+            for name in TABLES:
+                if len(self._files(name)) > COMPACT_FILES:
+                    self._compact(name)
+            return len(comparisons)
+
+    def _compact(self, name: str):
+        # Many small syncs leave many small files; merge them into the first one
+        files = self._files(name)
+        table = self.table(name)
+        pq.write_table(table, files[0] + ".tmp")
+        for file in files[1:]:
+            os.remove(file)
+        os.replace(files[0] + ".tmp", files[0])
+
+    def rebuild(self, results_store) -> int:
+        with self._lock:
+            for name in TABLES:
+                for file in self._files(name):
+                    os.remove(file)
+            self._loaded.clear()
+        return self.sync(results_store)
+
+    def _filtered(self, name: str, start=None, end=None, models: list = None, exam_types: list = None, agent_styles: list = None) -> pa.Table:
+        # start/end are datetimes (end exclusive); empty lists mean no filter
+        table = self.table(name)
+        masks = []
+        if start is not None:
+            masks.append(pc.greater_equal(table["created"], pa.scalar(pd.Timestamp(start).to_pydatetime(), pa.timestamp("s"))))
+        if end is not None:
+            masks.append(pc.less(table["created"], pa.scalar(pd.Timestamp(end).to_pydatetime(), pa.timestamp("s"))))
+        for column, values in (("model", models), ("exam_type", exam_types), ("agent_style", agent_styles)):
+            if values:
+                masks.append(pc.is_in(table[column], value_set=pa.array(values, pa.string())))
+        if not masks:
+            return table
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = pc.and_(mask, other)
+        return table.filter(mask)
+
+    def options(self) -> dict:
+        # Values for the filter widgets
+        table = self.table("comparisons")
+        return {
+            "models": sorted(pc.unique(table["model"]).to_pylist()),
+            "exam_types": sorted(pc.unique(table["exam_type"]).to_pylist()),
+            "agent_styles": sorted(pc.unique(table["agent_style"]).to_pylist()),
+            "first": pc.min(table["created"]).as_py() if len(table) else None,
+            "last": pc.max(table["created"]).as_py() if len(table) else None,
+        }
+
+    def category_counts(self, by: str = "exam_type", per_comparison: bool = False, **filters) -> pd.DataFrame:
+        # Rows per category (columns 1-7) for each group, with the number of
+        # comparisons in the group; by is a GROUPS column or a PERIODS unit.
+        # per_comparison divides the counts by the comparisons.
+        groups = []
+        for name in ("comparisons", "differences"):
+            table = self._filtered(name, **filters)
+            key = pc.floor_temporal(table["created"], unit=by) if by in PERIODS.values() else table[by]
+            table = table.append_column("group", key)
+            keys = ["group", "difference_type"] if name == "differences" else ["group"]
+            groups.append(table.group_by(keys).aggregate([("result_id", "count")]).to_pandas())
+        comparisons, differences = groups
+        counts = differences.dropna(subset=["difference_type"]).pivot_table(
+            index="group", columns="difference_type", values="result_id_count", aggfunc="sum", fill_value=0)
+        counts = counts.reindex(columns=range(1, 8), fill_value=0)
+        counts.columns = [str(category) for category in counts.columns]
+        frame = comparisons.set_index("group").rename(columns={"result_id_count": "Comparisons"}).join(counts).fillna(0)
+        if per_comparison:
+            frame[counts.columns] = frame[counts.columns].div(frame["Comparisons"], axis=0)
+        frame.index.name = next((label for label, column in {**GROUPS, **PERIODS}.items() if column == by), by)
+        if by in PERIODS.values():
+            return frame.sort_index()
+        return frame.sort_values("Comparisons", ascending=False, kind="stable")
+
+    def top_sections(self, limit: int = 20, **filters) -> pd.DataFrame:
+        # The sections with the most difference rows, and in how many comparisons they changed
+        table = self._filtered("differences", **filters)
+        comparisons = len(self._filtered("comparisons", **filters))
+        grouped = table.group_by("section_key").aggregate([("result_id", "count"), ("result_id", "count_distinct")])
+        grouped = grouped.sort_by([("result_id_count", "descending")]).slice(0, limit).to_pandas()
+        return pd.DataFrame({
+            "Section": grouped["section_key"],
+            "Differences": grouped["result_id_count"],
+            "Comparisons": grouped["result_id_count_distinct"],
+            "Share of Comparisons": grouped["result_id_count_distinct"] / comparisons if comparisons else 0.0,
+        })
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+def get_analytics_store() -> AnalyticsStore:
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = AnalyticsStore()
+    return _analytics
@@ -0,0 +1,95 @@
+import asyncio, queue, threading
+import httpx
+
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 600
+
+_lock = threading.Lock()
+_loop = None
+_ollama_client = None
+_openai_http_client = None
+_service_client = None
+
+# --- Shared event loop ---
+# Every backend call runs on one long-lived loop in a daemon thread, so the
+# async HTTP clients below (which are bound to a loop) survive across calls
+# and Streamlit reruns instead of being torn down by a fresh asyncio.run.
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="backend-loop", daemon=True).start()
+    return _loop
+
+def use_loop(loop: asyncio.AbstractEventLoop):
+    # For a server that runs its own loop (service.py): the backends run on it
+    # instead of on a thread of their own. Call from that loop before anything
+    # else uses the backends, and never call run_sync on it.
+    global _loop
+    with _lock:
+        if _loop is not None and _loop is not loop:
+            raise RuntimeError("the backend event loop is already running")
+        _loop = loop
+
+def run_sync(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+def run_background(coro):
+    # Fire-and-forget; returns a concurrent.futures.Future
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run_with_updates(coro_fn, on_update, poll: float = 0.05):
+    # coro_fn(emit) runs on the backend loop; whatever it emits is handed to
+    # on_update on the calling thread (Streamlit can only draw from there).
+    # Only the latest pending update is delivered, so slow redraws never lag behind.
+    updates = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(coro_fn(updates.put), get_loop())
+    while True:
+        finished = future.done()
+        try:
+            latest = updates.get(block=not finished, timeout=poll)
+        except queue.Empty:
+            if finished:
+                break
+            continue
+        while not updates.empty():
+            latest = updates.get_nowait()
+        on_update(latest)
+    return future.result()
+
+# --- Ollama ---
+def get_ollama_client() -> httpx.AsyncClient:
+    # Only use from coroutines running on get_loop()
+    global _ollama_client
+    with _lock:
+        if _ollama_client is None:
+            _ollama_client = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            )
+    return _ollama_client
+
+# --- OpenAI ---
+def get_openai_http_client() -> httpx.AsyncClient:
+    global _openai_http_client
+    with _lock:
+        if _openai_http_client is None:
+            _openai_http_client = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            )
+    return _openai_http_client
+
+# --- Comparison service ---
+def get_service_client() -> httpx.AsyncClient:
+    # Used by Service_Client; no read timeout, since a comparison can wait in
+    # the service's queue and the service enforces its own call deadlines
+    global _service_client
+    with _lock:
+        if _service_client is None:
+            _service_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(REQUEST_TIMEOUT, read=None),
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            )
+    return _service_client
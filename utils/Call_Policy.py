@@ -0,0 +1,148 @@
+import asyncio, os, random, sys, time
+from collections import deque
+import httpx
+from utils.Scheduler import get_scheduler
+from utils.Call_Stats import record_attempts
+
+# Deadlines, retries and hedging for single backend calls. Each attempt takes
+# its own Scheduler slot and must finish within its model's deadline of getting
+# it; a streamed attempt instead only has to keep sending, with at most
+# STREAM_IDLE_DEADLINE seconds between chunks once the first one is in. Transient failures (timeouts, dropped connections, 429/5xx) are
+# retried with jittered exponential backoff. With hedging on, an attempt still
+# running after the model's recent p95 gets a second copy, sent to the same
+# model or to its HEDGE_MODELS fallback, and the first answer wins. A hedge is
+# only sent when its model has a free slot, so it never adds to a queue.
+CALL_DEADLINE = float(os.environ.get("RCT_CALL_DEADLINE", 600))
+# Per-model overrides, e.g. "deepseek-r1:70b=1200,gpt-4.1-mini=120"
+MODEL_DEADLINES = {
+    model.strip(): float(seconds)
+    for model, _, seconds in (item.rpartition("=") for item in os.environ.get("RCT_MODEL_DEADLINES", "").split(",") if "=" in item)
+}
+STREAM_IDLE_DEADLINE = float(os.environ.get("RCT_STREAM_IDLE_DEADLINE", 120))
+MAX_RETRIES = int(os.environ.get("RCT_MAX_RETRIES", 2))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 20.0
+HEDGE = os.environ.get("RCT_HEDGE", "0").lower() in ("1", "true", "yes", "on")
+HEDGE_PERCENTILE = float(os.environ.get("RCT_HEDGE_PERCENTILE", 95))
+# Fallbacks on the same backend, e.g. "deepseek-r1:70b=llama3.3:latest,gpt-4.1=gpt-4.1-mini";
+# models without one are hedged with a duplicate request
+HEDGE_MODELS = {
+    model.strip(): fallback.strip()
+    for model, _, fallback in (item.partition("=") for item in os.environ.get("RCT_HEDGE_MODELS", "").split(",") if "=" in item)
+}
+# Hedge delays come from the latest successful calls; none before MIN_SAMPLES
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+_latencies = {}
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (DeadlineExceeded, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS
+    # openai is only imported once an OpenAI model has been used (Agent_Runner.openai_backend)
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return False
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRY_STATUS
+    return False
+
+def backoff(retry: int) -> float:
+    # "Full jitter": anywhere up to the exponential step, so retries spread out
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** retry))
+
+def observe_latency(model: str, seconds: float):
+    _latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+def hedge_delay(model: str) -> float:
+    # Seconds after which a still-running call is hedged; None when hedging is
+    # off or there are too few samples to know what slow means
+    samples = _latencies.get(model)
+    if not HEDGE or samples is None or len(samples) < MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+
+def call_deadline(model: str) -> float:
+    return MODEL_DEADLINES.get(model, CALL_DEADLINE)
+
+async def attempt(call, model: str, use_ollama: bool, progress=None):
+    # One backend call in its own slot. progress(), for streamed calls, returns
+    # the time.monotonic() of the latest chunk (None before the first); the
+    # model's deadline then only bounds the wait for that first chunk.
+    async with get_scheduler().slot(model, use_ollama):
+        start = time.perf_counter()
+        deadline = call_deadline(model)
+        if progress is None:
+            try:
+                response = await asyncio.wait_for(call(model), deadline)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"{model} did not answer within {deadline:g} s") from None
+        else:
+            task = asyncio.ensure_future(call(model))
+            try:
+                started = time.monotonic()
+                while True:
+                    last = progress()
+                    expires = started + deadline if last is None else last + STREAM_IDLE_DEADLINE
+                    done, _ = await asyncio.wait({task}, timeout=max(0, expires - time.monotonic()))
+                    if done:
+                        break
+                    if progress() == last:
+                        if last is None:
+                            raise DeadlineExceeded(f"{model} did not start answering within {deadline:g} s")
+                        raise DeadlineExceeded(f"{model} sent nothing for {STREAM_IDLE_DEADLINE:g} s")
+            finally:
+                task.cancel()
+            response = task.result()
+        observe_latency(model, time.perf_counter() - start)
+        return response
+
+async def hedged(call, model: str, use_ollama: bool, hedge: bool = True, progress=None) -> tuple:
+    # (response, model that answered)
+    primary = asyncio.ensure_future(attempt(call, model, use_ollama, progress))
+    tasks = {primary: model}
+    try:
+        delay = hedge_delay(model) if hedge else None
+        if delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            backup_model = HEDGE_MODELS.get(model, model)
+            if not done and get_scheduler().has_capacity(backup_model, use_ollama):
+                record_attempts(hedged=True)
+                tasks[asyncio.ensure_future(attempt(call, backup_model, use_ollama, progress))] = backup_model
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), tasks[task]
+        # Every copy failed; report the original call's error
+        raise primary.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def call_with_policy(call, model: str, use_ollama: bool, hedge: bool = True, retryable=None, progress=None) -> tuple:
+    # call(model) is a coroutine function making one backend request. Returns
+    # (response, model that answered). Streamed calls pass hedge=False (two
+    # copies would interleave their text), a retryable() that vetoes a retry
+    # once text has been shown, and a progress() for the idle deadline.
+    for retry in range(MAX_RETRIES + 1):
+        try:
+            response, served_by = await hedged(call, model, use_ollama, hedge, progress)
+            record_attempts(served_by=served_by)
+            return response, served_by
+        except Exception as e:
+            if retry == MAX_RETRIES or not is_transient(e) or (retryable is not None and not retryable()):
+                raise
+            record_attempts(retries=retry + 1)
+            await asyncio.sleep(backoff(retry))
@@ -0,0 +1,109 @@
+import json, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Per-call timing and token counts. compare_reports opens a collector; every
+# backend call made inside it (including from gathered tasks, which inherit the
+# context) appends one entry, and the backends fill in what their APIs report.
+_calls = ContextVar("calls", default=None)
+_current = ContextVar("current_call", default=None)
+
+SUMMARY_COLUMNS = ["Seconds", "Queue Seconds", "Model Load Seconds", "Input Tokens", "Output Tokens", "Call Timings"]
+
+@contextmanager
+def collect_calls():
+    calls = []
+    token = _calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _calls.reset(token)
+
+@contextmanager
+def track_call(agent: str, model: str, queued_at: float = None):
+    # queued_at: perf_counter() from before waiting for a concurrency slot
+    start = time.perf_counter()
+    stats = {
+        "Agent": agent,
+        "Model": model,
+        "Queue (s)": round(start - queued_at, 3) if queued_at is not None else 0.0,
+        "Wall (s)": None,
+        "Model Load (s)": None,
+        "Input Tokens": None,
+        "Output Tokens": None,
+        "Cached Tokens": None,
+        "Prefill (s)": None,
+        "Cached": False,
+        "Retries": 0,
+        "Hedged": False,
+        "Served By": None,
+    }
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        stats["Wall (s)"] = round(time.perf_counter() - start, 3)
+        calls = _calls.get()
+        if calls is not None:
+            calls.append(stats)
+
+def record_usage(input_tokens: int = None, output_tokens: int = None, load_seconds: float = None, cached: bool = None,
+                 cached_tokens: int = None, prefill_seconds: float = None):
+    # Called by the backends; a no-op outside track_call
+    stats = _current.get()
+    if stats is None:
+        return
+    if input_tokens is not None:
+        stats["Input Tokens"] = input_tokens
+    if output_tokens is not None:
+        stats["Output Tokens"] = output_tokens
+    if load_seconds is not None:
+        stats["Model Load (s)"] = round(load_seconds, 3)
+    if cached is not None:
+        stats["Cached"] = cached
+    if cached_tokens is not None:
+        stats["Cached Tokens"] = cached_tokens
+    if prefill_seconds is not None:
+        stats["Prefill (s)"] = round(prefill_seconds, 3)
+
+def record_attempts(retries: int = None, hedged: bool = None, served_by: str = None):
+    # Called by Call_Policy; a no-op outside track_call
+    stats = _current.get()
+    if stats is None:
+        return
+    if retries is not None:
+        stats["Retries"] = retries
+    if hedged is not None:
+        stats["Hedged"] = hedged
+    if served_by is not None:
+        stats["Served By"] = served_by
+
+def record_queue(seconds: float):
+    # Time spent waiting for a Scheduler slot counts as queue time too
+    stats = _current.get()
+    if stats is not None:
+        stats["Queue (s)"] = round(stats["Queue (s)"] + seconds, 3)
+
+def record_ollama_usage(response: dict):
+    # Ollama reports durations in nanoseconds on the final (done) message. It
+    # does not report cached tokens: prompt_eval_count and the prefill time
+    # only cover the part of the prompt its KV cache did not already hold.
+    load = response.get("load_duration")
+    prefill = response.get("prompt_eval_duration")
+    record_usage(response.get("prompt_eval_count"), response.get("eval_count"), load / 1e9 if load is not None else None,
+                 prefill_seconds=prefill / 1e9 if prefill is not None else None)
+
+def summarize_calls(calls: list, seconds: float) -> dict:
+    # The export columns for one comparison, plus the cached input tokens
+    def total(key):
+        return sum(call[key] or 0 for call in calls)
+    return {
+        "Seconds": round(seconds, 3),
+        "Queue Seconds": round(total("Queue (s)"), 3),
+        "Model Load Seconds": round(total("Model Load (s)"), 3),
+        "Input Tokens": total("Input Tokens"),
+        "Output Tokens": total("Output Tokens"),
+        "Cached Tokens": total("Cached Tokens"),
+        "Call Timings": json.dumps(calls),
+    }
@@ -0,0 +1,269 @@
+import asyncio, time
+import pandas as pd
+from utils.Agent_Runner import extract_chunks, run_agents, MAX_CONCURRENCY
+from utils.Report_Parsing import COLUMNS, strip_llm_wrappers, looks_like_table, TableStream
+from utils.Structured_Output import structured2df
+from utils.Report_Sections import prune_reports, diff_reports, format_sections, find_exam_type
+from utils.Section_Memo import get_section_memo, memo_key, assign_rows
+from utils.Local_Detectors import DETECTORS
+from utils.Triage import triage_reports, number_groups
+from utils.Token_Budget import chunk_reports, context_size
+from utils.Call_Stats import collect_calls, summarize_calls, SUMMARY_COLUMNS
+from utils.Scheduler import get_scheduler, scheduler_job
+from utils.Prompts import (
+    SYSTEM_PROMPT_PARAGRAPH, SYSTEM_PROMPT_TABLE, SYSTEM_PROMPT_PARAGRAPH_MULTI,
+    AGENT_PROMPT_1, AGENT_PROMPT_2, AGENT_PROMPT_3, AGENT_PROMPT_4,
+    AGENT_PROMPT_5, AGENT_PROMPT_6, AGENT_PROMPT_7, AGENT_PROMPT_FUSED,
+)
+
+OLLAMA_MODEL = ["deepseek-r1:70b", "llama3.3:latest", "llama3.2-vision:90b", "gemma3:27b"]
+OPENAI_MODEL = [ "gpt-4.1", "gpt-4o", "gpt-4.1-mini", "gpt-4o-mini"]
+
+OUTPUT_TYPES = ["Paragraph Output", "Table Output"]
+AGENT_STYLES = ["Single Agent", "Multi-Agent", "Fused Structured"]
+MULTI_AGENT_PROMPTS = [AGENT_PROMPT_1, AGENT_PROMPT_2, AGENT_PROMPT_3, AGENT_PROMPT_4, AGENT_PROMPT_5, AGENT_PROMPT_6, AGENT_PROMPT_7]
+
+# Backend calls per comparison before any chunking, for Scheduler admission
+EXPECTED_CALLS = {"Single Agent": 1, "Multi-Agent": len(MULTI_AGENT_PROMPTS) + 1, "Fused Structured": 2}
+
+EXPORT_COLUMNS = ["Number", "Model", "Output Style", "Single or Multi-Agent", "Prompt", "Resident Note", "Attending Note", "Output"] + SUMMARY_COLUMNS
+
+def build_text(resident_text: str, attending_text: str) -> str:
+    return "Resident Report:\n" + resident_text + "\n\nAttending Report:\n" + attending_text
+
+def default_prompt(output_type: str) -> str:
+    return SYSTEM_PROMPT_PARAGRAPH if output_type == "Paragraph Output" else SYSTEM_PROMPT_TABLE
+
+def assemble_paragraph(paragraph_response: str, multi_df: pd.DataFrame) -> str:
+    first_part = strip_llm_wrappers(paragraph_response)
+    second_part = "".join(
+        f"\n\n{difference_type}: \"{resident}\" --> \"{attending}\"\n\n{explanation}"
+        for difference_type, resident, attending, explanation in zip(
+            multi_df["Difference Type"], multi_df["Resident Report"], multi_df["Attending Report"], multi_df["Explanation"])
+    )
+    return (first_part + second_part).strip()
+
+def finish_record(record: dict, multi_df: pd.DataFrame, paragraph_response: str = None):
+    # The parsed rows are kept for Analytics_Store even when the output is a paragraph
+    record["Difference Rows"] = multi_df.to_csv(index=False).strip()
+    if paragraph_response is None:
+        record["Output"] = multi_df.to_csv(index=False).strip()
+        return record, multi_df
+    record["Output"] = assemble_paragraph(paragraph_response, multi_df)
+    return record, None
+
+def plan_memo(groups: dict, agent_prompts: list, model: str) -> tuple:
+    # Looks up every (section group, category) verdict; groups maps each
+    # category to the section groups its agent covers. Returns
+    # ({category: (uncached groups, their memo keys, cached rows, partial)}, hits, lookups);
+    # partial means some groups were cached, so the agent needs its own text.
+    keys = {category: [memo_key(group, category, model, agent_prompts[category - 1]) for group in category_groups]
+            for category, category_groups in groups.items()}
+    found = get_section_memo().get_many([key for category_keys in keys.values() for key in category_keys])
+    plan = {}
+    for category, category_groups in groups.items():
+        missing = [i for i, key in enumerate(keys[category]) if key not in found]
+        cached = [row for key in keys[category] if key in found for row in found[key]]
+        plan[category] = ([category_groups[i] for i in missing], [keys[category][i] for i in missing], cached,
+                          len(missing) < len(category_groups) or not category_groups)
+    hits = sum(len(groups[category]) - len(plan[category][0]) for category in groups)
+    return plan, hits, sum(len(category_groups) for category_groups in groups.values())
+
+def admit_comparison(model: str, agent_style: str):
+    # Raises SchedulerBusy if the model's queue is too full to take a comparison
+    get_scheduler().admit(model, model in OLLAMA_MODEL, EXPECTED_CALLS.get(agent_style, 1))
+
+async def compare_reports(resident_text: str, attending_text: str, model: str, output_type: str, agent_style: str,
+                          session: str = None, on_status=None, admit: bool = True, **options):
+    # Runs run_comparison and adds the timing/token columns (Call_Stats) to its record.
+    # session and on_status go to the Scheduler (fair queuing between sessions,
+    # queue position updates). Raises SchedulerBusy if the model's queue is
+    # full, unless admit=False (batch work that should wait however long).
+    if admit:
+        admit_comparison(model, agent_style)
+    start = time.perf_counter()
+    with collect_calls() as calls, scheduler_job(session, on_status):
+        record, table = await run_comparison(resident_text, attending_text, model, output_type, agent_style, **options)
+    record.update(summarize_calls(calls, time.perf_counter() - start))
+    return record, table
+
+async def run_comparison(resident_text: str, attending_text: str, model: str, output_type: str, agent_style: str,
+                         system_prompt: str = None, agent_prompts: list = None, paragraph_prompt: str = None,
+                         max_concurrency: int = MAX_CONCURRENCY, use_cache: bool = True, on_text=None,
+                         prune_sections: bool = False, category_modes: dict = None, fused_prompt: str = None,
+                         ollama_options: dict = None, section_memo: bool = False, exam_type: str = None,
+                         triage_model: str = None, triage_thresholds: dict = None):
+    # Returns the result record (the export columns minus "Number" and timings) and, for
+    # table output, the parsed DataFrame shown to the user. If on_text is given,
+    # paragraph output is streamed to it as text as it arrives; table output
+    # instead sends the list of rows (in COLUMNS order) parsed so far. With
+    # prune_sections, only the report sections that differ between the two
+    # versions are sent to the agents.
+    # category_modes maps a category number with a local detector to one of
+    # Local_Detectors.CATEGORY_MODES (default "LLM"). ollama_options carries
+    # keep_alive/num_ctx for Ollama models; without num_ctx the context is sized
+    # to the request. Report pairs over the model's token budget are split into
+    # aligned section chunks and the per-chunk answers merged. With section_memo,
+    # Multi-Agent category agents reuse stored verdicts (Section_Memo) for the
+    # section groups they have already judged and are only sent the rest
+    # (not when use_cache is False).
+    # With triage_model (cascade mode, Multi-Agent only), that model first picks
+    # the categories and changed sections worth sending to the category agents
+    # (Triage); triage_thresholds maps a category to its escalation threshold.
+    # exam_type defaults to the study named in the reports' exam/technique section.
+    paragraph = output_type == "Paragraph Output"
+    use_ollama = model in OLLAMA_MODEL
+    if prune_sections:
+        resident_sent, attending_sent, _, _ = prune_reports(resident_text, attending_text)
+    else:
+        resident_sent, attending_sent = resident_text, attending_text
+
+    def prepare(prompts: list) -> list:
+        # Chunk for the longest prompt so every agent sees the same chunks
+        nonlocal ollama_options
+        texts = chunk_reports(resident_sent, attending_sent, max(prompts, key=len), model, use_ollama, build_text)
+        if use_ollama and not (ollama_options or {}).get("num_ctx"):
+            ollama_options = {**(ollama_options or {}), "num_ctx": context_size(prompts, texts, model)}
+        return texts
+
+    record = {
+        "Model": model,
+        "Output Style": output_type,
+        "Single or Multi-Agent": agent_style,
+        "Prompt": "",
+        "Resident Note": resident_text.strip(),
+        "Attending Note": attending_text.strip(),
+        "Exam Type": exam_type or find_exam_type(attending_text, resident_text),
+    }
+
+    if agent_style == "Single Agent":
+        system_prompt = system_prompt or default_prompt(output_type)
+        texts = prepare([system_prompt])
+        table = TableStream(on_text)
+        stream = on_text if paragraph or on_text is None else table.on_text(0)
+        response = await extract_chunks(system_prompt, texts, model, use_ollama, use_cache, False, ollama_options, stream, label="Single Agent")
+        record["Prompt"] = system_prompt
+        record["Output"] = strip_llm_wrappers(response).strip()
+        if paragraph:
+            return record, None
+        table.finish(0, response)
+        frame = table.frame()
+        record["Difference Rows"] = frame.to_csv(index=False).strip()
+        return record, frame
+
+    paragraph_prompt = paragraph_prompt or SYSTEM_PROMPT_PARAGRAPH_MULTI
+    if agent_style == "Fused Structured":
+        # One structured call covers all seven categories
+        fused_prompt = fused_prompt or AGENT_PROMPT_FUSED
+        record["Prompt"] = f"Fused Prompt:\n{fused_prompt}\n\n"
+        texts = prepare([fused_prompt, paragraph_prompt] if paragraph else [fused_prompt])
+        calls = [extract_chunks(fused_prompt, texts, model, use_ollama, use_cache, True, ollama_options, label="Fused")]
+        if paragraph:
+            record["Prompt"] += f"Paragraph Portion Prompt:\n{paragraph_prompt}\n\n"
+            calls.append(extract_chunks(paragraph_prompt, texts, model, use_ollama, use_cache, False, ollama_options, on_text, label="Paragraph"))
+        responses = await asyncio.gather(*calls)
+        return finish_record(record, structured2df(responses[0]), responses[1] if paragraph else None)
+
+    agent_prompts = list(agent_prompts or MULTI_AGENT_PROMPTS)
+    category_modes = category_modes or {}
+    # Stored verdicts are neither read nor written when the cache is bypassed
+    section_memo = section_memo and use_cache
+    prompt = ""
+    local_rows = {}
+    llm_categories = []
+    # Categories whose agent runs unconditionally; only these are triaged
+    llm_only = []
+    for category, agent_prompt in enumerate(agent_prompts, start=1):
+        mode = category_modes.get(category, "LLM") if category in DETECTORS else "LLM"
+        if mode == "LLM":
+            prompt += f"{category}:\n{agent_prompt}\n\n"
+            llm_categories.append(category)
+            llm_only.append(category)
+            continue
+        # Local detectors diff the full reports themselves, so they ignore prune_sections
+        local_rows[category] = DETECTORS[category](resident_text, attending_text)
+        if mode == "Local + LLM Confirmation" and local_rows[category]:
+            llm_categories.append(category)
+            prompt += f"{category} ({mode}):\n{agent_prompt}\n\n"
+        else:
+            prompt += f"{category} ({mode}): local detector\n\n"
+
+    diff = diff_reports(resident_text, attending_text) if triage_model or section_memo else []
+    groups = [(resident, attending) for resident, attending, changed in diff if changed or not prune_sections]
+    # Categories whose agent is only sent some of the section groups
+    agent_groups = {}
+    if triage_model and llm_only:
+        changed = [(resident, attending) for resident, attending, is_changed in diff if is_changed]
+        escalated = await triage_reports(
+            build_text(*number_groups(changed)), len(changed), llm_only, triage_model, triage_model in OLLAMA_MODEL,
+            triage_thresholds, use_cache, ollama_options)
+        for category, indices in escalated.items():
+            if indices and len(indices) < len(changed):
+                agent_groups[category] = [changed[i] for i in indices]
+        llm_categories = [category for category in llm_categories if escalated.get(category, True)]
+        record["Triage Model"] = triage_model
+        record["Escalated Categories"], record["Triage Categories"] = sum(bool(indices) for indices in escalated.values()), len(escalated)
+        record["Escalated Sections"], record["Triage Sections"] = sum(len(indices) for indices in escalated.values()), len(changed) * len(escalated)
+        prompt += f"Triage ({triage_model}): escalated {', '.join(str(category) for category, indices in escalated.items() if indices) or 'none'}\n\n"
+
+    # Fan out the category agents (and the paragraph agent) on one event loop
+    calls = [agent_prompts[category - 1] for category in llm_categories]
+    labels = [f"Agent {category}" for category in llm_categories]
+    table = TableStream(None if paragraph else on_text)
+    for category, rows in local_rows.items():
+        if category not in llm_categories:
+            # Detectors return dicts; the table holds rows in COLUMNS order
+            table.add(category, [[row[column] for column in COLUMNS] for row in rows])
+    streamed = {}
+    if on_text is not None and not paragraph:
+        # Table rows are shown as each category agent produces them
+        streamed = {index: table.on_text(category) for index, category in enumerate(llm_categories)}
+    if paragraph:
+        prompt += f"Paragraph Portion Prompt:\n{paragraph_prompt}\n\n"
+        calls.append(paragraph_prompt)
+        labels.append("Paragraph")
+        if on_text is not None:
+            streamed[len(calls) - 1] = on_text
+    texts = prepare(calls) if calls else []
+    memo_plan = {}
+    if section_memo and llm_categories:
+        memo_plan, record["Memo Hits"], record["Memo Lookups"] = plan_memo(
+            {category: agent_groups.get(category, groups) for category in llm_categories}, agent_prompts, model)
+    for category, (missing, keys, cached, partial) in memo_plan.items():
+        # Cached verdicts go straight into the table; the agent only sees the rest
+        table.add(category, cached)
+        if partial or category in agent_groups:
+            agent_groups[category] = missing
+    prompt_texts = {}
+    for category, sent in agent_groups.items():
+        index = llm_categories.index(category)
+        prompt_texts[index] = chunk_reports(
+            format_sections([section for resident, _ in sent for section in resident]),
+            format_sections([section for _, attending in sent for section in attending]),
+            calls[index], model, use_ollama, build_text) if sent else None
+    # Categories with every group cached make no call at all
+    skipped = {index for index, chunks in prompt_texts.items() if chunks is None}
+    run = [index for index in range(len(calls)) if index not in skipped]
+    responses = dict(zip(run, await run_agents(
+        [calls[index] for index in run], texts, model, use_ollama, max_concurrency, use_cache,
+        {position: streamed[index] for position, index in enumerate(run) if index in streamed}, ollama_options,
+        [labels[index] for index in run], {position: prompt_texts[index] for position, index in enumerate(run) if index in prompt_texts},
+        {position for position, index in enumerate(run) if paragraph and index == len(calls) - 1})))
+    verdicts = {}
+    for index, category in enumerate(llm_categories):
+        if index in skipped:
+            continue
+        table.finish(category, responses[index])
+        if category in memo_plan:
+            missing, keys, cached, _ = memo_plan[category]
+            new_rows = table.rows(category)[len(cached):]
+            # A reply with no table at all is not a verdict of "no differences"
+            assigned = assign_rows(new_rows, missing) if new_rows or looks_like_table(responses[index]) else None
+            if assigned is not None:
+                verdicts.update(zip(keys, assigned))
+    if verdicts:
+        get_section_memo().put_many(verdicts)
+    responses = [responses.get(index) for index in range(len(calls))]
+
+    record["Prompt"] = prompt
+    return finish_record(record, table.frame(), responses[-1] if paragraph else None)
@@ -0,0 +1,178 @@
+import asyncio
+from utils.Agent_Runner import warm_up_OpenAI
+from utils.Comparison import compare_reports, admit_comparison, OLLAMA_MODEL, OPENAI_MODEL, OUTPUT_TYPES, AGENT_STYLES
+from utils.Local_Detectors import DETECTORS, CATEGORY_MODES
+from utils.Ollama_Agent import warm_up_Ollama, running_Ollama
+from utils.Ollama_Pool import get_ollama_pool
+from utils.Response_Cache import get_response_cache
+from utils.Report_Parsing import COLUMNS, parse_rows
+from utils.Results_Store import get_results_store
+
+# The JSON requests and responses of the comparison service (service.py),
+# also run in-process by Service_Client when no service is configured.
+# A compare request is
+#   {"resident": ..., "attending": ..., "model": ..., "output_type": ..., "agent_style": ...}
+# plus any of OPTIONS (the compare_reports keyword arguments) and
+#   "session": fair-queuing session (default "api"), "store_results": add the
+#   result to the results store, "stream_text": send partial output (streamed
+#   requests), "wait": queue however long rather than be turned away (SchedulerBusy)
+# and its response is {"record": the result record, "rows": the difference rows}
+# with each row keyed by Report_Parsing.COLUMNS.
+OPTIONS = {
+    "system_prompt": str, "agent_prompts": list, "paragraph_prompt": str, "fused_prompt": str,
+    "max_concurrency": int, "use_cache": bool, "prune_sections": bool, "category_modes": dict,
+    "section_memo": bool, "ollama_options": dict, "exam_type": str,
+    "triage_model": str, "triage_thresholds": dict,
+}
+REQUEST_FIELDS = ["resident", "attending", "model", "output_type", "agent_style", "session", "store_results", "stream", "stream_text", "wait"]
+DEFAULT_SESSION = "api"
+# A batch request is {"pairs": [{"resident", "attending", optional "exam_type" and "id"}, ...]}
+# plus the compare fields shared by every pair and "concurrency"
+MAX_BATCH_PAIRS = 1000
+BATCH_CONCURRENCY = 4
+MAX_BATCH_CONCURRENCY = 32
+
+class RequestError(ValueError):
+    pass
+
+def _categories(value: dict, name: str, check) -> dict:
+    # JSON object keys are strings: {"5": x} -> {5: x}
+    result = {}
+    for key, item in value.items():
+        if not str(key).isdigit() or not 1 <= int(key) <= 7 or not check(item):
+            raise RequestError(f"invalid {name} entry {key!r}: {item!r}")
+        result[int(key)] = item
+    return result
+
+def comparison_args(body: dict) -> dict:
+    # compare_reports arguments (resident_text, attending_text, model, output_type,
+    # agent_style and options) from a compare request; raises RequestError
+    if not isinstance(body, dict):
+        raise RequestError("the request body must be a JSON object")
+    unknown = set(body) - set(REQUEST_FIELDS) - set(OPTIONS)
+    if unknown:
+        raise RequestError(f"unknown fields: {', '.join(sorted(unknown))}")
+    for field in ["resident", "attending"]:
+        if not isinstance(body.get(field), str) or not body[field].strip():
+            raise RequestError(f"{field} must be a non-empty string")
+    for field, choices in [("model", OLLAMA_MODEL + OPENAI_MODEL), ("output_type", OUTPUT_TYPES), ("agent_style", AGENT_STYLES)]:
+        if body.get(field) not in choices:
+            raise RequestError(f"{field} must be one of: {', '.join(choices)}")
+    options = {}
+    for name, kind in OPTIONS.items():
+        value = body.get(name)
+        if value is None:
+            continue
+        if not isinstance(value, kind) or kind is int and isinstance(value, bool):
+            raise RequestError(f"{name} must be a JSON {kind.__name__}")
+        options[name] = value
+    if "agent_prompts" in options and (len(options["agent_prompts"]) != 7 or not all(isinstance(p, str) for p in options["agent_prompts"])):
+        raise RequestError("agent_prompts must hold seven strings, one per category")
+    if "category_modes" in options:
+        options["category_modes"] = _categories(options["category_modes"], "category_modes", lambda mode: mode in CATEGORY_MODES)
+        if set(options["category_modes"]) - set(DETECTORS):
+            raise RequestError(f"category_modes only applies to categories {', '.join(map(str, DETECTORS))}")
+    if "triage_thresholds" in options:
+        options["triage_thresholds"] = _categories(options["triage_thresholds"], "triage_thresholds",
+                                                   lambda percent: isinstance(percent, int) and not isinstance(percent, bool) and 0 <= percent <= 100)
+    if options.get("triage_model") is not None and options["triage_model"] not in OLLAMA_MODEL + OPENAI_MODEL:
+        raise RequestError(f"triage_model must be one of: {', '.join(OLLAMA_MODEL + OPENAI_MODEL)}")
+    return {"resident_text": body["resident"], "attending_text": body["attending"], "model": body["model"],
+            "output_type": body["output_type"], "agent_style": body["agent_style"], **options}
+
+def admit_request(body: dict):
+    # Raises RequestError or SchedulerBusy before any work is queued
+    args = comparison_args(body)
+    if not body.get("wait"):
+        admit_comparison(args["model"], args["agent_style"])
+
+def result_payload(record: dict, table) -> dict:
+    if table is not None:
+        rows = table.reindex(columns=COLUMNS).fillna("").astype(str).to_dict("records")
+    else:
+        # Paragraph output keeps its parsed rows (if any) in the record
+        rows = [dict(zip(COLUMNS, row)) for row in parse_rows(record.get("Difference Rows") or "")]
+    return {"record": record, "rows": rows}
+
+async def run_compare(body: dict, emit=None, admit: bool = True) -> dict:
+    # The response to a compare request. emit, if given, receives
+    # ("status", queue status or None) and, with stream_text, ("text", partial
+    # output) updates, as Backend_Clients.run_with_updates expects.
+    args = comparison_args(body)
+    session = body.get("session") or DEFAULT_SESSION
+    scheduling = {}
+    if emit is not None:
+        scheduling["on_status"] = lambda status: emit(("status", status))
+        if body.get("stream_text", True):
+            scheduling["on_text"] = lambda partial: emit(("text", partial))
+    record, table = await compare_reports(session=session, admit=admit and not body.get("wait"), **scheduling, **args)
+    if body.get("store_results"):
+        get_results_store().add(record, session)
+    return result_payload(record, table)
+
+def batch_bodies(body: dict) -> list:
+    # One compare request per pair; raises RequestError, also for a bad concurrency
+    if not isinstance(body, dict) or not isinstance(body.get("pairs"), list) or not body["pairs"]:
+        raise RequestError("pairs must be a non-empty list")
+    if len(body["pairs"]) > MAX_BATCH_PAIRS:
+        raise RequestError(f"at most {MAX_BATCH_PAIRS} pairs per batch")
+    concurrency = body.get("concurrency", BATCH_CONCURRENCY)
+    if not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1:
+        raise RequestError("concurrency must be a positive integer")
+    shared = {key: value for key, value in body.items() if key not in ("pairs", "concurrency", "stream")}
+    bodies = []
+    for index, pair in enumerate(body["pairs"]):
+        if not isinstance(pair, dict) or set(pair) - {"resident", "attending", "exam_type", "id"}:
+            raise RequestError(f"pairs[{index}] must be an object with resident, attending and optional exam_type and id")
+        request = {**shared, **{key: value for key, value in pair.items() if key != "id"}}
+        try:
+            comparison_args(request)
+        except RequestError as e:
+            raise RequestError(f"pairs[{index}]: {e}")
+        bodies.append(request)
+    return bodies
+
+async def run_batch(body: dict, emit=None) -> list:
+    # One {"id", "record", "rows"} or {"id", "error"} per pair, in request
+    # order; emit, if given, receives ("item", ...) as each pair finishes.
+    # Batches wait for model slots however long it takes, like batch.py.
+    bodies = batch_bodies(body)
+    semaphore = asyncio.Semaphore(min(body.get("concurrency", BATCH_CONCURRENCY), MAX_BATCH_CONCURRENCY))
+    ids = [pair.get("id", index) for index, pair in enumerate(body["pairs"])]
+
+    async def run_one(index: int) -> dict:
+        async with semaphore:
+            try:
+                item = {"id": ids[index], **await run_compare({**bodies[index], "session": bodies[index].get("session") or "api-batch"}, admit=False)}
+            except Exception as e:
+                item = {"id": ids[index], "error": repr(e)}
+        if emit is not None:
+            emit(("item", item))
+        return item
+
+    return await asyncio.gather(*(run_one(index) for index in range(len(bodies))))
+
+def warm_up(body: dict):
+    # A warm-up request is {"model": ..., optional "ollama_options"}: starts
+    # loading an Ollama model (or the OpenAI backend) in the background
+    if not isinstance(body, dict) or body.get("model") not in OLLAMA_MODEL + OPENAI_MODEL:
+        raise RequestError(f"model must be one of: {', '.join(OLLAMA_MODEL + OPENAI_MODEL)}")
+    options = body.get("ollama_options")
+    if options is not None and not isinstance(options, dict):
+        raise RequestError("ollama_options must be a JSON dict")
+    if body["model"] in OLLAMA_MODEL:
+        warm_up_Ollama(body["model"], options)
+    else:
+        warm_up_OpenAI()
+
+async def backend_state() -> dict:
+    # The models loaded on the Ollama hosts (None if no host is reachable) and
+    # the hosts that are not
+    try:
+        running = await running_Ollama()
+    except ConnectionError:
+        running = None
+    return {"resident_models": running, "unreachable": [host.url for host in get_ollama_pool().hosts if not host.healthy]}
+
+def cache_stats() -> dict:
+    return get_response_cache().stats()
@@ -0,0 +1,310 @@
+import argparse, json, os, random, re, sys, threading, time, uuid, zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from utils.Prompt_Layout import SHARED_PREFIX, TASK_HEADER
+
+# Stand-in for Ollama (/api/chat, /api/generate, /api/ps) and the OpenAI
+# Responses API (/v1/responses) used by benchmark.py. Answers are canned but
+# built from the submitted reports, and include the things real models send
+# back: <think> blocks, fenced CSV and unescaped quotes inside fields.
+
+CATEGORY = re.compile(r'The number "(\d)"')
+SECTION = re.compile(r"^\s*([A-Z][A-Za-z /&-]{1,40}):", re.MULTILINE)
+HEADER = '"Section","Resident Report","Attending Report","Difference Type","Explanation"'
+NUMBERED = re.compile(r"^\[(\d+)\]", re.MULTILINE)
+# Share of (report pair, category) that triage flags
+TRIAGE_RATE = 0.3
+
+# Pretend prompt caches: OpenAI remembers recent prompts per model; Ollama
+# keeps one KV cache per parallel slot (OLLAMA_NUM_PARALLEL) and reuses the
+# longest prefix any slot shares with a request, copying it into the slot the
+# request is given if need be
+CACHE_ENTRIES = 32
+OLLAMA_SLOTS = 4
+# OpenAI caches prefixes of 1024+ tokens, in 128-token steps
+OPENAI_MIN_CACHED, OPENAI_CACHE_STEP = 1024, 128
+
+def split_prompt(contents: list) -> tuple:
+    # (instructions, report text) from the message contents in either
+    # Prompt_Layout; the shared prefix is left out of the instructions
+    text = " ".join(c for c in contents if c.lstrip().startswith("Resident Report:"))
+    instructions = [c[len(TASK_HEADER):] if c.startswith(TASK_HEADER) else c for c in contents
+                    if c != SHARED_PREFIX and not c.lstrip().startswith("Resident Report:")]
+    return " ".join(instructions), text
+
+def split_reports(text: str) -> tuple:
+    resident, _, attending = text.partition("Attending Report:")
+    return resident.replace("Resident Report:", "", 1).strip(), attending.strip()
+
+def sentences(text: str) -> list:
+    return [s.strip().replace('"', "'") for s in re.split(r"(?<=[.!?])\s+|\n+", text) if len(s.strip()) > 3]
+
+def csv_rows(text: str, categories: list) -> list:
+    resident, attending = split_reports(text)
+    resident_lines, attending_lines = sentences(resident) or ["None"], sentences(attending) or ["None"]
+    sections = SECTION.findall(attending) or ["Impression"]
+    rows = []
+    for i, category in enumerate(categories):
+        for j in range(2):
+            n = i * 2 + j
+            section = sections[n % len(sections)].strip()
+            res = resident_lines[n % len(resident_lines)][:200]
+            att = attending_lines[n % len(attending_lines)][:200]
+            if (n + category) % 3 == 0:
+                # Unescaped quotes, as models often emit them
+                att = f'the "{att.split(" ")[0]}" {att}'
+            rows.append(f'"{section}","{res}","{att}","{category}","Category {category} change in {section.lower()}."')
+    return rows
+
+def triage(text: str) -> str:
+    # A stable, report-dependent pick of categories and numbered sections
+    _, attending = split_reports(text)
+    sections = [int(n) for n in NUMBERED.findall(attending)] or [1]
+    categories = []
+    for category in range(1, 8):
+        draw = zlib.crc32(f"{category}:{text}".encode()) / 2 ** 32
+        flagged = draw < TRIAGE_RATE
+        categories.append({"category": category, "likelihood": int(60 + draw * 100) if flagged else int(draw * 15),
+                           "sections": [sections[int(draw * 1000) % len(sections)]] if flagged else []})
+    return json.dumps({"categories": categories})
+
+def reply(system: str, text: str, structured: bool) -> str:
+    category = CATEGORY.findall(system)
+    if structured and "likelihood" in system:
+        return triage(text)
+    if structured:
+        resident, attending = split_reports(text)
+        rows = [
+            {"section": "Impression", "resident_report": r[:200], "attending_report": a[:200], "difference_type": i % 7 + 1, "explanation": "Changed."}
+            for i, (r, a) in enumerate(zip(sentences(resident)[:7], sentences(attending)[:7]))
+        ]
+        return json.dumps({"rows": rows})
+    if len(set(category)) == 1:
+        body = "\n".join([HEADER] + csv_rows(text, [int(category[0])]))
+    elif "Difference Type" in system:
+        body = "\n".join([HEADER] + csv_rows(text, list(range(1, 8))))
+    else:
+        _, attending = split_reports(text)
+        lines = sentences(attending)[:4]
+        return "<think>Reviewing the two reports.</think>\n" + " ".join(f"The attending revised: {line}" for line in lines)
+    return f"<think>Comparing sections one at a time.</think>\n```csv\n{body}\n```"
+
+def pieces(text: str, size: int = 16) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, data: str):
+        data = data.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            self.send_json({"models": [{"name": model, "model": model, "size_vram": 0} for model in sorted(self.server.loaded)]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.count(self.path)
+        if self.path in ("/api/chat", "/v1/responses") and self.server.misbehave():
+            self.send_error(503, "Injected failure")
+            return
+        if self.path == "/api/generate":
+            self.server.loaded.add(body.get("model", ""))
+            self.send_json({"model": body.get("model"), "response": "", "done": True})
+        elif self.path == "/api/chat":
+            self.ollama_chat(body)
+        elif self.path == "/v1/responses":
+            self.openai_responses(body)
+        else:
+            self.send_error(404)
+
+    def ollama_chat(self, body: dict):
+        contents = [m["content"] for m in body.get("messages", [])]
+        system, text = split_prompt(contents)
+        content = reply(system, text, bool(body.get("format")))
+        model = body.get("model", "")
+        # Like Ollama, only the prompt tokens past the cached prefix are counted
+        prompt_tokens, cached = self.server.prefill_slot(model, "".join(contents))
+        stats = {"prompt_eval_count": prompt_tokens - cached, "eval_count": len(content) // 4,
+                 "prompt_eval_duration": int(self.server.prefill_delay * (prompt_tokens - cached) / 1000 * 1e9),
+                 # The first request for a model pays a (pretend) load
+                 "load_duration": 0 if model in self.server.loaded else int(self.server.latency * 1e9)}
+        self.server.loaded.add(model)
+        time.sleep(self.server.latency)
+        if not body.get("stream"):
+            time.sleep(self.server.token_delay * len(pieces(content)))
+            self.send_json({"model": body.get("model"), "message": {"role": "assistant", "content": content}, "done": True, **stats})
+            return
+        self.start_stream("application/x-ndjson")
+        for piece in pieces(content):
+            time.sleep(self.server.token_delay)
+            self.write_chunk(json.dumps({"message": {"role": "assistant", "content": piece}, "done": False}) + "\n")
+        self.write_chunk(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True, **stats}) + "\n")
+        self.end_stream()
+
+    def openai_responses(self, body: dict):
+        items = body.get("input")
+        contents = [body.get("instructions") or ""] + ([items] if isinstance(items, str) else [
+            item.get("content") if isinstance(item.get("content"), str) else "" for item in items
+        ])
+        system, text = split_prompt(contents)
+        prompt_tokens, cached = self.server.prefill(body.get("model", ""), "".join(contents))
+        cached = cached // OPENAI_CACHE_STEP * OPENAI_CACHE_STEP if cached >= OPENAI_MIN_CACHED else 0
+        structured = ((body.get("text") or {}).get("format") or {}).get("type") == "json_schema"
+        content = reply(system, text, structured)
+        response_id, item_id = "resp_" + uuid.uuid4().hex, "msg_" + uuid.uuid4().hex
+        response = {
+            "id": response_id, "object": "response", "created_at": int(time.time()), "model": body.get("model"),
+            "status": "completed", "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+            "output": [{
+                "id": item_id, "type": "message", "role": "assistant", "status": "completed",
+                "content": [{"type": "output_text", "text": content, "annotations": []}],
+            }],
+            "usage": {
+                "input_tokens": prompt_tokens, "output_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+                "input_tokens_details": {"cached_tokens": cached}, "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+        time.sleep(self.server.latency)
+        if not body.get("stream"):
+            time.sleep(self.server.token_delay * len(pieces(content)))
+            self.send_json(response)
+            return
+        self.start_stream("text/event-stream")
+        sequence = 0
+
+        def event(payload: dict):
+            nonlocal sequence
+            payload["sequence_number"] = sequence
+            sequence += 1
+            self.write_chunk(f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n")
+
+        event({"type": "response.created", "response": {**response, "status": "in_progress", "output": [], "usage": None}})
+        for piece in pieces(content):
+            time.sleep(self.server.token_delay)
+            event({"type": "response.output_text.delta", "item_id": item_id, "output_index": 0, "content_index": 0, "delta": piece})
+        event({"type": "response.completed", "response": response})
+        self.end_stream()
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port: int = 0, latency: float = 0.05, token_delay: float = 0.0,
+                 stall_rate: float = 0.0, stall_seconds: float = 5.0, error_rate: float = 0.0, seed: int = 0,
+                 prefill_delay: float = 0.0):
+        # latency: seconds before the first token; token_delay: seconds per streamed piece;
+        # prefill_delay: extra seconds per 1000 prompt tokens not in the prompt cache.
+        # stall_rate of the chat/response requests wait stall_seconds first and
+        # error_rate of them fail with a 503, to exercise retries and hedging
+        super().__init__(("127.0.0.1", port), Handler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.error_rate = error_rate
+        self.prefill_delay = prefill_delay
+        self._prompts = {}
+        self._slots = {}
+        self._random = random.Random(seed)
+        self.loaded = set()
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def handle_error(self, request, client_address):
+        # Cancelled (e.g. hedged) requests hang up mid-answer; that is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def prefill(self, model: str, prompt: str) -> tuple:
+        # (prompt tokens, tokens cached): the longest prefix shared with a
+        # recent prompt for the model, at 4 characters a token. Waits out the
+        # prefill of the rest before the prompt is cached itself.
+        with self._lock:
+            recent = self._prompts.setdefault(model, [])
+            shared = max((len(os.path.commonprefix([prompt, other])) for other in recent), default=0)
+        tokens, cached = len(prompt) // 4, shared // 4
+        time.sleep(self.prefill_delay * (tokens - cached) / 1000)
+        with self._lock:
+            recent.append(prompt)
+            del recent[:-CACHE_ENTRIES]
+        return tokens, cached
+
+    def prefill_slot(self, model: str, prompt: str) -> tuple:
+        # Like prefill, for Ollama: the request gets the idle slot sharing the
+        # longest prefix with it (else the least recently used one) and leaves
+        # its prompt there
+        with self._lock:
+            slots = self._slots.setdefault(model, [[0, ""] for _ in range(OLLAMA_SLOTS)])
+            idle = [slot for slot in slots if slot[0] >= 0] or slots
+            slot = max(idle, key=lambda slot: (len(os.path.commonprefix([prompt, slot[1]])), -slot[0]))
+            shared = max(len(os.path.commonprefix([prompt, other[1]])) for other in slots)
+            # -1 marks the slot busy; otherwise it holds when it was last used
+            slot[0] = -1
+        tokens, cached = len(prompt) // 4, shared // 4
+        time.sleep(self.prefill_delay * (tokens - cached) / 1000)
+        with self._lock:
+            slot[0], slot[1] = time.monotonic(), prompt
+        return tokens, cached
+
+    def misbehave(self) -> bool:
+        # Stalls (in the handler thread) and/or returns True for an injected error
+        with self._lock:
+            stall = self._random.random() < self.stall_rate
+            error = self._random.random() < self.error_rate
+        if stall:
+            time.sleep(self.stall_seconds)
+        return error
+
+    def start(self) -> "FakeLLMServer":
+        threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned Ollama/OpenAI responses for offline runs of the app.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of requests that stall first")
+    parser.add_argument("--stall-seconds", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--prefill-delay", type=float, default=0.0, help="seconds per 1000 prompt tokens not in the prompt cache")
+    args = parser.parse_args()
+    server = FakeLLMServer(args.port, args.latency, args.token_delay, args.stall_rate, args.stall_seconds, args.error_rate,
+                           prefill_delay=args.prefill_delay)
+    print(f"serving on {server.url} (OLLAMA_BASE_URL={server.url}, OPENAI_BASE_URL={server.url}/v1)")
+    server.serve_forever()
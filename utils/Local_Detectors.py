@@ -0,0 +1,86 @@
+import re
+from utils.Report_Sections import diff_reports, normalize_text
+
+CATEGORY_MODES = ["LLM", "Local", "Local + LLM Confirmation"]
+
+SENTENCE_END = re.compile(r"(?<=[.;!?])\s+")
+# Only sentences that open with the negation; "... with no evidence of ..." is a positive finding
+NEGATIVE_FINDING = re.compile(r"^\W*(no|without|negative for|absence of|there (is|are) no)\b", re.IGNORECASE)
+NEGATION_WORDS = re.compile(
+    r"\b(no|not|without|negative|for|absence|of|there|is|are|evidence|definite|acute|focal|abnormal|significant"
+    r"|identified|seen|noted|present|demonstrated|the|a|an|or|and)\b",
+    re.IGNORECASE,
+)
+# "consider" only as an instruction; "differential considerations" is a diagnosis
+RECOMMENDATION = re.compile(
+    r"\b(recommend\w*|follow[- ]?up|advised?|consider|correlat\w*|further evaluation|referral|biopsy|consultation|tissue sampling)\b",
+    re.IGNORECASE,
+)
+
+def split_sentences(text: str) -> list:
+    return [sentence.strip() for sentence in SENTENCE_END.split(text) if sentence.strip()]
+
+def content_words(sentence: str) -> set:
+    return set(normalize_text(NEGATION_WORDS.sub(" ", sentence)).split())
+
+def added_sentences(resident_text: str, attending_text: str) -> list:
+    # Attending sentences that have no normalized match in the resident text
+    resident = {normalize_text(sentence) for sentence in split_sentences(resident_text)}
+    return [sentence for sentence in split_sentences(attending_text) if normalize_text(sentence) not in resident]
+
+def section_pairs(resident_text: str, attending_text: str):
+    for resident, attending, changed in diff_reports(resident_text, attending_text):
+        if not changed or not attending:
+            continue
+        name = "/".join(name for name, _ in attending if name) or "/".join(name for name, _ in resident if name)
+        yield (
+            name,
+            " ".join(body for _, body in resident),
+            " ".join(body for _, body in attending),
+        )
+
+def detect_added_negatives(resident_text: str, attending_text: str) -> list:
+    # Category 3, e.g. "No ascites." --> "No ascites. No free air."
+    rows = []
+    for name, resident, attending in section_pairs(resident_text, attending_text):
+        resident_words = set(normalize_text(resident).split())
+        for sentence in added_sentences(resident, attending):
+            if not NEGATIVE_FINDING.search(sentence):
+                continue
+            # Already covered (reworded) or a removed positive finding (category 2)
+            words = content_words(sentence)
+            if not words or words <= resident_words:
+                continue
+            rows.append({
+                "Section": name,
+                "Resident Report": resident,
+                "Attending Report": attending,
+                "Difference Type": "3",
+                "Explanation": f"Include pertinent negatives such as \"{sentence}\"",
+            })
+    return rows
+
+def detect_recommendations(resident_text: str, attending_text: str) -> list:
+    # Category 6, e.g. "Recommend 6-month follow-up MRI."
+    rows = []
+    for name, resident, attending in section_pairs(resident_text, attending_text):
+        resident_words = set(normalize_text(resident).split())
+        for sentence in added_sentences(resident, attending):
+            if not RECOMMENDATION.search(sentence):
+                continue
+            if content_words(sentence) <= resident_words:
+                continue
+            rows.append({
+                "Section": name,
+                "Resident Report": resident,
+                "Attending Report": attending,
+                "Difference Type": "6",
+                "Explanation": f"Add the follow-up or treatment recommendation \"{sentence}\"",
+            })
+    return rows
+
+# Category number -> detector
+DETECTORS = {
+    3: detect_added_negatives,
+    6: detect_recommendations,
+}
@@ -1,16 +1,89 @@
-import requests, json, textwrap, tqdm, re
-import pandas as pd
+import json, os, threading
+from utils.Backend_Clients import get_ollama_client, run_background
+from utils.Token_Budget import DEFAULT_CONTEXT
+from utils.Call_Stats import record_ollama_usage
+from utils.Ollama_Pool import get_ollama_pool
+from utils.Prompt_Layout import build_messages
 
-URL   = "http://localhost:11434/api/chat"
+# Requests go to a host from the Ollama_Pool (OLLAMA_HOSTS / OLLAMA_BASE_URL)
+CHAT_PATH = "/api/chat"
 
-def extract_Ollama(prompt: str, text: str, model: str) -> str:
+# How long Ollama keeps a model in memory after its last request; "-1" keeps it loaded
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+_warming = {}
+_warming_lock = threading.Lock()
+
+def build_payload(prompt: str, text: str, model: str, stream: bool = False, schema: dict = None, options: dict = None) -> dict:
+    # options: {"keep_alive": "30m", "num_ctx": 8192}; either may be omitted
+    options = options or {}
     payload = {
         "model": model,
-        "stream": False,
-        "messages": [
-            {"role": "system", "content": prompt},
-            {"role": "user",   "content": text[:30000]}
-        ]}
-    r = requests.post(URL, json=payload, timeout=600)
-    r.raise_for_status()
-    return r.json()["message"]["content"]
\ No newline at end of file
+        "stream": stream,
+        "keep_alive": options.get("keep_alive") or KEEP_ALIVE,
+        "messages": build_messages(prompt, text)}
+    if options.get("num_ctx"):
+        payload["options"] = {"num_ctx": int(options["num_ctx"])}
+    if schema is not None:
+        # Structured outputs: Ollama constrains generation to the JSON schema
+        payload["format"] = schema
+    return payload
+
+async def extract_Ollama_async(prompt: str, text: str, model: str, schema: dict = None, options: dict = None) -> str:
+    payload = build_payload(prompt, text, model, schema=schema, options=options)
+    async with get_ollama_pool().request(model) as base_url:
+        r = await get_ollama_client().post(base_url + CHAT_PATH, json=payload)
+        r.raise_for_status()
+        data = r.json()
+    record_ollama_usage(data)
+    return data["message"]["content"]
+
+async def stream_Ollama(prompt: str, text: str, model: str, options: dict = None):
+    payload = build_payload(prompt, text, model, stream=True, options=options)
+    async with get_ollama_pool().request(model) as base_url:
+        async with get_ollama_client().stream("POST", base_url + CHAT_PATH, json=payload) as r:
+            r.raise_for_status()
+            # /api/chat streams one JSON object per line
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    record_ollama_usage(chunk)
+                    break
+
+# --- Model residency ---
+async def preload_Ollama(model: str, options: dict = None):
+    # A generate request without a prompt just loads the model into memory.
+    # Load with the context size requests will use, or Ollama reloads on the first one.
+    options = options or {}
+    payload = {
+        "model": model,
+        "keep_alive": options.get("keep_alive") or KEEP_ALIVE,
+        "options": {"num_ctx": int(options.get("num_ctx") or DEFAULT_CONTEXT)},
+    }
+    # On the host the first requests will be routed to
+    async with get_ollama_pool().request(model) as base_url:
+        r = await get_ollama_client().post(base_url + "/api/generate", json=payload)
+        r.raise_for_status()
+
+def warm_up_Ollama(model: str, options: dict = None):
+    # Starts loading the model in the background; concurrent callers share one request
+    with _warming_lock:
+        future = _warming.get(model)
+        if future is None or future.done():
+            future = run_background(preload_Ollama(model, options))
+            _warming[model] = future
+    return future
+
+async def running_Ollama() -> list:
+    # Models currently loaded into memory on every reachable host, as reported
+    # by /api/ps, each with its "host" added
+    pool = get_ollama_pool()
+    await pool.check_all()
+    if not any(host.healthy for host in pool.hosts):
+        raise ConnectionError("no Ollama host reachable: " + ", ".join(host.url for host in pool.hosts))
+    return [{**m, "host": host.url} for host in pool.hosts for m in host.models]
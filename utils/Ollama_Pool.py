@@ -0,0 +1,100 @@
+import asyncio, os, threading, time
+from contextlib import asynccontextmanager, contextmanager
+import httpx
+from utils.Backend_Clients import get_ollama_client
+
+# A pool of Ollama servers. OLLAMA_HOSTS lists them (comma-separated base
+# URLs); without it the pool is just OLLAMA_BASE_URL. Every host is polled on
+# /api/ps, which says both whether it is up and which models it has loaded.
+# Requests go to a healthy host with the model already loaded and the fewest
+# requests outstanding; once those are all busy (HOST_CONCURRENCY each) they
+# spill over to the least loaded healthy host, which then loads the model too.
+BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+HOSTS = [url.strip().rstrip("/") for url in os.environ.get("OLLAMA_HOSTS", BASE_URL).split(",") if url.strip()]
+HOST_CONCURRENCY = int(os.environ.get("RCT_OLLAMA_CONCURRENCY", 4))
+HEALTH_INTERVAL = float(os.environ.get("RCT_OLLAMA_HEALTH_INTERVAL", 15))
+HEALTH_TIMEOUT = 5
+
+class OllamaHost:
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self.resident = set()
+        self.models = []
+        self.checked = None
+
+class OllamaPool:
+    def __init__(self, urls: list):
+        self.hosts = [OllamaHost(url) for url in urls]
+        self._lock = threading.Lock()
+        self._monitor = None
+
+    def healthy_count(self) -> int:
+        return sum(host.healthy for host in self.hosts)
+
+    def pick(self, model: str) -> OllamaHost:
+        with self._lock:
+            # Hosts all marked down may have recovered since; try them anyway
+            candidates = [host for host in self.hosts if host.healthy] or self.hosts
+            warm = [host for host in candidates if model in host.resident and host.outstanding < HOST_CONCURRENCY]
+            # Among equally loaded hosts, one that has the model loaded wins
+            return min(warm or candidates, key=lambda host: (host.outstanding, model not in host.resident))
+
+    @contextmanager
+    def _track(self, host: OllamaHost, model: str):
+        with self._lock:
+            host.outstanding += 1
+        try:
+            yield host.url
+        except httpx.TransportError:
+            # Unreachable or dropped: route around it until the next health check
+            host.healthy = False
+            raise
+        else:
+            host.resident.add(model)
+        finally:
+            with self._lock:
+                host.outstanding -= 1
+
+    @asynccontextmanager
+    async def request(self, model: str):
+        # Yields the base URL to send one request for model to
+        self._start_monitor()
+        with self._track(self.pick(model), model) as url:
+            yield url
+
+    async def check(self, host: OllamaHost):
+        try:
+            r = await get_ollama_client().get(host.url + "/api/ps", timeout=HEALTH_TIMEOUT)
+            r.raise_for_status()
+            host.models = r.json().get("models", [])
+            host.resident = {m.get("name") for m in host.models} | {m.get("model") for m in host.models}
+            host.healthy = True
+        except (httpx.HTTPError, ValueError):
+            host.healthy = False
+            host.models = []
+            host.resident = set()
+        host.checked = time.time()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(host) for host in self.hosts))
+
+    def _start_monitor(self):
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.ensure_future(self._watch())
+
+    async def _watch(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_ollama_pool() -> OllamaPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OllamaPool(HOSTS)
+    return _pool
@@ -1,18 +1,71 @@
-from agents import Agent, Runner
+from agents import Agent, Runner, set_default_openai_client
+from openai import AsyncOpenAI
+from openai.types.responses import ResponseTextDeltaEvent
 from datetime import datetime, timedelta
+from functools import lru_cache
 import json
 import ast
+from utils.Backend_Clients import get_openai_http_client
+from utils.Call_Stats import record_usage
+from utils.Prompt_Layout import build_agent_input
 
-def get_availability_parser_agent(prompt: str, use_model: str):
+_client = None
+
+def get_openai_client() -> AsyncOpenAI:
+    # One pooled client for every run; otherwise the SDK builds a new one per Runner.run
+    global _client
+    if _client is None:
+        # Call_Policy owns retries, so the SDK's own are turned off
+        _client = AsyncOpenAI(http_client=get_openai_http_client(), max_retries=0)
+        set_default_openai_client(_client, use_for_tracing=False)
+    return _client
+
+def record_run_usage(result):
+    usage = result.context_wrapper.usage
+    # Input tokens OpenAI served from its prompt cache (shared prefixes of 1024+ tokens)
+    record_usage(usage.input_tokens, usage.output_tokens, cached_tokens=usage.input_tokens_details.cached_tokens)
+
+@lru_cache(maxsize=64)
+def get_availability_parser_agent(instructions: str, use_model: str):
     return Agent(
         name="Availability Parser Agent",
-        instructions=prompt,
+        instructions=instructions,
+        model=use_model,
+    )
+
+@lru_cache(maxsize=16)
+def get_structured_agent(instructions: str, use_model: str, output_type: type):
+    return Agent(
+        name="Structured Comparison Agent",
+        instructions=instructions,
         model=use_model,
+        output_type=output_type,
     )
 
+async def extract_OpenAI_structured(prompt: str, text: str, model: str, output_type: type) -> str:
+    get_openai_client()
+    instructions, agent_input = build_agent_input(prompt, text)
+    agent = get_structured_agent(instructions, model, output_type)
+    result = await Runner.run(agent, agent_input)
+    record_run_usage(result)
+
+    return result.final_output.model_dump_json()
+
 async def extract_OpenAI(prompt: str, text: str, model: str) -> str:
-    runner = Runner()
-    agent = get_availability_parser_agent(prompt, model)
-    result = await runner.run(agent, text)
+    get_openai_client()
+    instructions, agent_input = build_agent_input(prompt, text)
+    agent = get_availability_parser_agent(instructions, model)
+    result = await Runner.run(agent, agent_input)
+    record_run_usage(result)
+
+    return result.final_output
 
-    return result.final_output
\ No newline at end of file
+async def stream_OpenAI(prompt: str, text: str, model: str):
+    get_openai_client()
+    instructions, agent_input = build_agent_input(prompt, text)
+    agent = get_availability_parser_agent(instructions, model)
+    result = Runner.run_streamed(agent, agent_input)
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            yield event.data.delta
+    record_run_usage(result)
@@ -0,0 +1,71 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# How a prompt and the report pair are put into messages. By default a call
+# sends its prompt as the system message and the reports after it, so the
+# prompt (the same in every comparison) is the cached prefix. The Multi-Agent
+# category agents of an Ollama fan-out all get the same reports but different
+# prompts, so inside shared_prefix() (Agent_Runner.run_agents) they send
+#   system: SHARED_PREFIX   - the same for every call of every comparison
+#   user:   the report pair - the same for every call of the fan-out
+#   user:   TASK_HEADER + the agent prompt, as written
+# and Ollama's KV cache reuse serves everything before the agent prompt to
+# the calls queued behind the first ones. OpenAI keeps the prompt-first layout: its calls of a fan-out
+# all start before any has been cached, while the agent prompts alone are long
+# enough (1024+ tokens) to be cached from one comparison to the next.
+# RCT_PROMPT_LAYOUT=system keeps the prompt-first layout for Ollama too.
+LAYOUTS = ["shared-prefix", "system"]
+PROMPT_LAYOUT = os.environ.get("RCT_PROMPT_LAYOUT", "shared-prefix")
+
+SHARED_PREFIX = '''You are a feedback tool that compares radiologist resident report drafts with the final attending physician report. The feedback is meant to inform the resident on how they can improve their report writing to better match the attending.
+
+Changes made by the attending fall into these categories:
+    * 1: Addition of missing positive findings (e.g. "Lung Bases: Unremarkable" --> "Scattered subcentimeter nodules likely incidental.")
+    * 2: Deletion of (incorrect) positive findings (e.g. "Small left pleural effusion is noted." --> "No definite pleural effusion is identified.")
+    * 3: Addition of negative findings (e.g. "Lungs are clear with no consolidation." --> "Lungs are clear with no consolidation, effusion, or pneumothorax.")
+    * 4: Correction of the expression of findings / Proofreading
+    * 5: Correction of the diagnosis
+    * 6: Follow-up exam or treatment recommendations
+    * 7: Level of certainty of finding
+
+The next message holds the resident and attending reports. The message after it is your task: it says which changes to look for and exactly what to output. Follow the task, not this overview, wherever they differ.'''
+
+TASK_HEADER = "Task:\n"
+
+_shared = ContextVar("shared_prefix", default=False)
+
+@contextmanager
+def shared_prefix():
+    # Calls made inside (including from gathered tasks, which inherit the
+    # context) use the shared-prefix layout
+    token = _shared.set(PROMPT_LAYOUT == "shared-prefix")
+    try:
+        yield
+    finally:
+        _shared.reset(token)
+
+def uses_shared_prefix() -> bool:
+    return _shared.get()
+
+def prefix_messages(text: str) -> list:
+    # The part of a shared-prefix call that is the same for every agent
+    return [{"role": "system", "content": SHARED_PREFIX}, {"role": "user", "content": text}]
+
+def build_messages(prompt: str, text: str) -> list:
+    # Chat messages (Ollama /api/chat) for one call
+    if not uses_shared_prefix():
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": text}]
+    return prefix_messages(text) + [{"role": "user", "content": TASK_HEADER + prompt}]
+
+def build_agent_input(prompt: str, text: str) -> tuple:
+    # (instructions, input) for an OpenAI agents SDK Agent and Runner.run;
+    # the instructions are sent first. Only used with the shared prefix if a
+    # caller enters shared_prefix() for OpenAI.
+    if not uses_shared_prefix():
+        return prompt, text
+    return SHARED_PREFIX, [{"role": "user", "content": text}, {"role": "user", "content": TASK_HEADER + prompt}]
+
+def layout_overhead() -> str:
+    # Text a call may send besides its prompt and the reports, for token budgets
+    return SHARED_PREFIX + TASK_HEADER if PROMPT_LAYOUT == "shared-prefix" else ""
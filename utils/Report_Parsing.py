@@ -0,0 +1,295 @@
+from io import StringIO
+import pandas as pd
+import re, csv, json
+
+COLUMNS = ["Section", "Resident Report", "Attending Report", "Difference Type", "Explanation"]
+
+def strip_llm_wrappers(text: str) -> str:
+    if not isinstance(text, str):
+        return text
+
+    # Remove all <think>...</think> blocks
+    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
+
+    # Remove fenced code blocks like ```json\n...\n```
+    text = re.sub(r"```(?:\w+)?\n(.*?)```", r"\1", text, flags=re.DOTALL)
+
+    # Remove triple single or double quotes
+    text = re.sub(r"'''(.*?)'''", r"\1", text, flags=re.DOTALL)
+    text = re.sub(r'"""(.*?)"""', r"\1", text, flags=re.DOTALL)
+
+    # Remove ~~~ fenced blocks
+    text = re.sub(r"~~~(?:\w+)?\n(.*?)~~~", r"\1", text, flags=re.DOTALL)
+
+    # Final cleanup
+    return text.strip()
+
+def string2df(response: str):
+    return rows2df(parse_rows(response))
+
+
+def merge_responses(responses: list) -> str:
+    # Reduce step when a report pair was split into section chunks: one JSON
+    # rows list, or one CSV table with the rows from every chunk, or the
+    # paragraphs joined
+    cleaned = [strip_llm_wrappers(response) for response in responses]
+    try:
+        documents = [json.loads(response) for response in cleaned]
+        if all(isinstance(document, dict) and "rows" in document for document in documents):
+            return json.dumps({"rows": [row for document in documents for row in document["rows"]]})
+    except json.JSONDecodeError:
+        pass
+
+    if any(looks_like_table(response) for response in cleaned):
+        return rows2csv([row for response in cleaned for row in parse_rows(response)])
+    return "\n\n".join(response for response in cleaned if response)
+
+class ThinkFilter:
+    # Drops <think>...</think> blocks from streamed text as chunks arrive,
+    # holding back anything that could be the start of a tag split across chunks
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._thinking = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        visible = ""
+        while True:
+            tag = self.CLOSE if self._thinking else self.OPEN
+            idx = self._buffer.lower().find(tag)
+            if idx == -1:
+                break
+            if not self._thinking:
+                visible += self._buffer[:idx]
+            self._buffer = self._buffer[idx + len(tag):]
+            self._thinking = not self._thinking
+
+        tag = self.CLOSE if self._thinking else self.OPEN
+        keep = 0
+        for n in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+            if tag.startswith(self._buffer[-n:].lower()):
+                keep = n
+                break
+        if not self._thinking:
+            visible += self._buffer[:len(self._buffer) - keep]
+        self._buffer = self._buffer[len(self._buffer) - keep:]
+        return visible
+
+    def flush(self) -> str:
+        rest = "" if self._thinking else self._buffer
+        self._buffer = ""
+        return rest
+
+# --- Agent CSV parsing ---
+# Agents are asked for COLUMNS but answer with variations: other header names
+# (AGENT_PROMPT_2..7 describe a "Quote Identified" column), fences and <think>
+# blocks around the table, and quotes inside fields left unescaped. RowParser
+# reads that text as it streams in and yields rows in the COLUMNS layout.
+
+COLUMN_ALIASES = {
+    "section": "Section", "sectionname": "Section",
+    "residentreport": "Resident Report", "resident": "Resident Report", "residenttext": "Resident Report",
+    "residentquote": "Resident Report", "residentquotation": "Resident Report",
+    "attendingreport": "Attending Report", "attending": "Attending Report", "attendingtext": "Attending Report",
+    "attendingquote": "Attending Report", "attendingquotation": "Attending Report",
+    "differencetype": "Difference Type", "difference": "Difference Type", "type": "Difference Type", "category": "Difference Type",
+    "explanation": "Explanation", "reason": "Explanation", "feedback": "Explanation",
+    "quoteidentified": "Quote Identified", "quote": "Quote Identified",
+}
+WRAPPER_LINE = re.compile(r"^(`{3}|~{3}|'{3}|\"{3})\w*$")
+MAX_ROW_LINES = 10
+
+def split_row(line: str) -> tuple:
+    # CSV fields of one line, and whether the last quoted field was closed.
+    # A quote only ends a field when a comma or the end of the line follows,
+    # so stray quotes inside a field are kept as text.
+    fields, i, n = [], 0, len(line)
+    while True:
+        while i < n and line[i] == " ":
+            i += 1
+        if i < n and line[i] == '"':
+            i += 1
+            value = []
+            closed = False
+            while i < n:
+                if line[i] == '"':
+                    rest = line[i + 1:].lstrip(" ")
+                    if not rest or rest[0] == ",":
+                        closed = True
+                        i = n - len(rest)
+                        break
+                    value.append('"')
+                    i += 2 if line.startswith('""', i) else 1
+                    continue
+                value.append(line[i])
+                i += 1
+            fields.append("".join(value))
+            if not closed:
+                return fields, False
+        else:
+            end = line.find(",", i)
+            end = n if end == -1 else end
+            fields.append(line[i:end].strip())
+            i = end
+        if i >= n:
+            return fields, True
+        i += 1  # the comma
+
+def header_columns(fields: list) -> list:
+    # Canonical name per field if this line is a header, else None
+    names = [COLUMN_ALIASES.get(re.sub(r"[^a-z]", "", field.lower())) for field in fields]
+    if "Section" in names and sum(name is not None for name in names) >= 2:
+        return names
+    return None
+
+def looks_like_table(text: str) -> bool:
+    return any(header_columns(split_row(line.strip())[0]) for line in text.splitlines() if "," in line)
+
+class RowParser:
+    def __init__(self):
+        self._think = ThinkFilter()
+        self._buffer = ""
+        self._pending = None
+        self._pending_lines = 0
+        self._header = None
+
+    def feed(self, text: str) -> list:
+        # New complete rows in text, which continues whatever was fed before
+        self._buffer += self._think.feed(text)
+        *lines, self._buffer = self._buffer.split("\n")
+        return [row for line in lines for row in self._line(line)]
+
+    def close(self) -> list:
+        rows = self._line(self._buffer + self._think.flush())
+        self._buffer = ""
+        if self._pending is not None:
+            rows += self._line("", force=True)
+        return rows
+
+    def _line(self, line: str, force: bool = False) -> list:
+        if self._pending is not None:
+            line = self._pending + "\n" + line
+            self._pending = None
+        text = line.strip()
+        if not text or WRAPPER_LINE.match(text):
+            return []
+        fields, complete = split_row(text)
+        if not complete and not force and self._pending_lines < MAX_ROW_LINES:
+            # A quoted field continues on the next line
+            self._pending = line
+            self._pending_lines += 1
+            return []
+        self._pending_lines = 0
+
+        header = header_columns(fields)
+        if header:
+            self._header = header
+            return []
+        if len(fields) < 2:
+            # Prose around the table
+            return []
+        if self._header is None:
+            # No header yet: only accept fully quoted rows in the requested layout
+            if not text.startswith('"') or len(fields) not in (len(COLUMNS), len(COLUMNS) - 1):
+                return []
+            self._header = COLUMNS[:len(fields)]
+        row = self._map(fields)
+        return [row] if any(row) else []
+
+    def _map(self, fields: list) -> list:
+        header = self._header
+        if "Difference Type" in header:
+            # An unquoted category list ("1, 4") splits into fields of one number each
+            i = header.index("Difference Type")
+            while len(fields) > len(header) and i + 1 < len(fields) and re.fullmatch(r"\W*[1-7]\W*", fields[i + 1]):
+                fields = fields[:i] + [fields[i] + ", " + fields[i + 1]] + fields[i + 2:]
+        if len(fields) > len(header):
+            # Unquoted commas split the last field
+            fields = fields[:len(header) - 1] + [", ".join(fields[len(header) - 1:])]
+        row = dict.fromkeys(COLUMNS, "")
+        quote = ""
+        for name, value in zip(header, fields):
+            if name == "Quote Identified":
+                quote = value.strip()
+            elif name is not None and not row[name]:
+                row[name] = value.strip()
+        # Single-agent tables list every category of a row ("1, 4", "[3, 7]")
+        categories = re.findall(r"[1-7]", row["Difference Type"])
+        if categories:
+            row["Difference Type"] = ", ".join(categories)
+        if quote:
+            # Removed findings (category 2) are quoted from the resident report
+            target = "Resident Report" if row["Difference Type"] == "2" else "Attending Report"
+            row[target] = row[target] or quote
+        return [row[column] for column in COLUMNS]
+
+def parse_rows(response: str) -> list:
+    parser = RowParser()
+    return parser.feed(response) + parser.close()
+
+def rows2df(rows: list) -> pd.DataFrame:
+    # Built once from all rows, column by column
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    return pd.DataFrame({name: list(values) for name, values in zip(COLUMNS, columns)}, columns=COLUMNS)
+
+def rows2csv(rows: list) -> str:
+    out = StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return out.getvalue().strip()
+
+class TableStream:
+    # Rows from several agents (keyed by category), parsed while their text
+    # streams in. on_rows, if given, receives every row so far in key order
+    # whenever new rows arrive; frame() builds the final table once.
+    def __init__(self, on_rows=None):
+        self.on_rows = on_rows
+        self._parsers = {}
+        self._rows = {}
+
+    def on_text(self, key):
+        # Callback for extract_streaming, which passes the visible text so far.
+        # Parsed rows follow any already added for key.
+        parser = self._parsers[key] = RowParser()
+        self._rows.setdefault(key, [])
+        seen = 0
+
+        def receive(visible: str):
+            nonlocal seen
+            rows = parser.feed(visible[seen:])
+            seen = len(visible)
+            if rows:
+                self._rows[key] += rows
+                self._emit()
+        return receive
+
+    def add(self, key, rows: list):
+        self._rows[key] = list(rows)
+        self._emit()
+
+    def finish(self, key, response: str):
+        # The complete response for key; only what the streaming parser has
+        # not seen yet is parsed
+        parser = self._parsers.pop(key, None)
+        rows = parse_rows(response) if parser is None else parser.close()
+        self._rows.setdefault(key, [])
+        if rows:
+            self._rows[key] += rows
+            self._emit()
+
+    def _emit(self):
+        if self.on_rows is not None:
+            self.on_rows(self.rows())
+
+    def rows(self, key=None) -> list:
+        # Every row in key order, or only key's
+        if key is not None:
+            return list(self._rows.get(key, []))
+        return [row for key in sorted(self._rows) for row in self._rows[key]]
+
+    def frame(self) -> pd.DataFrame:
+        return rows2df(self.rows())
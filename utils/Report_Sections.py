@@ -0,0 +1,117 @@
+import re
+
+# "Liver: ...", "FINDINGS:", "Mesentery/Peritoneum: ..." at the start of a line
+HEADING = re.compile(r"^\s*([A-Za-z][A-Za-z &/,()\-]{0,60}):\s*(.*)$")
+
+# Different spellings of the same anatomy used across reports
+ALIASES = {
+    "lymph node": "node",
+    "adrenal gland": "adrenal",
+    "osseous structure": "bone",
+    "urinary bladder": "bladder",
+    "mesentary": "mesentery",
+}
+
+def parse_sections(report: str) -> list:
+    # Split a report into (heading, body) pairs in report order. Text before
+    # the first heading is kept under an empty heading.
+    sections = []
+    name, lines = "", []
+    for line in report.splitlines():
+        match = HEADING.match(line)
+        if match:
+            if name or any(l.strip() for l in lines):
+                sections.append((name, "\n".join(lines).strip()))
+            name, lines = match.group(1).strip(), [match.group(2)]
+        else:
+            lines.append(line)
+    if name or any(l.strip() for l in lines):
+        sections.append((name, "\n".join(lines).strip()))
+    return sections
+
+def heading_tokens(name: str) -> set:
+    # "Spleen/Adrenals/Kidneys" -> {"spleen", "adrenal", "kidney"}
+    tokens = set()
+    for part in re.split(r"/|,|&|\band\b", name.lower()):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        part = " ".join(word[:-1] if word.endswith("s") and len(word) > 3 else word for word in part.split())
+        tokens.add(ALIASES.get(part, part))
+    return tokens or {""}
+
+def normalize_text(text: str) -> str:
+    # Case, whitespace and punctuation differences are not worth an LLM call
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def align_sections(resident_sections: list, attending_sections: list) -> list:
+    # Group resident and attending sections that share any heading token, so
+    # "Spleen/Adrenals/Kidneys" lines up with separate Spleen, Adrenals and
+    # Kidneys sections. Returns [(resident_sections, attending_sections), ...]
+    # in report order.
+    nodes = [("r", i) for i in range(len(resident_sections))] + [("a", j) for j in range(len(attending_sections))]
+    parent = {node: node for node in nodes}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    owner = {}
+    for side, sections in (("r", resident_sections), ("a", attending_sections)):
+        for i, (name, _) in enumerate(sections):
+            for token in heading_tokens(name):
+                if token in owner:
+                    parent[find((side, i))] = find(owner[token])
+                else:
+                    owner[token] = (side, i)
+
+    groups = {}
+    for node in nodes:
+        groups.setdefault(find(node), []).append(node)
+
+    aligned = []
+    for members in groups.values():
+        resident = [resident_sections[i] for side, i in members if side == "r"]
+        attending = [attending_sections[i] for side, i in members if side == "a"]
+        aligned.append((resident, attending))
+    return aligned
+
+def format_sections(sections: list) -> str:
+    return "\n\n".join(f"{name}: {body}" if name else body for name, body in sections)
+
+def diff_reports(resident_text: str, attending_text: str) -> list:
+    # [(resident_sections, attending_sections, changed), ...]
+    aligned = align_sections(parse_sections(resident_text), parse_sections(attending_text))
+    diff = []
+    for resident, attending in aligned:
+        changed = normalize_text(" ".join(body for _, body in resident)) != normalize_text(" ".join(body for _, body in attending))
+        diff.append((resident, attending, changed))
+    return diff
+
+def prune_reports(resident_text: str, attending_text: str):
+    # Keep only the sections that differ between the two reports.
+    # Returns (resident_text, attending_text, changed_groups, total_groups);
+    # the original texts are returned unchanged if nothing can be pruned.
+    diff = diff_reports(resident_text, attending_text)
+    changed = [(resident, attending) for resident, attending, is_changed in diff if is_changed]
+    if not changed or len(changed) == len(diff):
+        return resident_text, attending_text, len(changed), len(diff)
+    resident_pruned = format_sections([section for resident, _ in changed for section in resident])
+    attending_pruned = format_sections([section for _, attending in changed for section in attending])
+    return resident_pruned, attending_pruned, len(changed), len(diff)
+
+# Sections that name the study, in order of preference
+EXAM_HEADINGS = ["exam", "examination", "study", "procedure", "technique"]
+
+def find_exam_type(*reports: str) -> str:
+    # "CT of the abdomen and pelvis with intravenous contrast" from the first
+    # report with an exam/technique section; "" if none has one
+    for report in reports:
+        sections = {name.lower(): body for name, body in parse_sections(report) if name}
+        for heading in EXAM_HEADINGS:
+            body = " ".join(sections.get(heading, "").split())
+            if body:
+                return re.split(r"(?<=[a-z)])\.\s", body, maxsplit=1)[0].rstrip(".")[:120]
+    return ""
@@ -0,0 +1,111 @@
+import hashlib, json, os, sqlite3, threading, time
+
+CACHE_PATH = os.environ.get("RCT_CACHE_PATH", os.path.join(".cache", "responses.sqlite"))
+MAX_ENTRIES = int(os.environ.get("RCT_CACHE_MAX_ENTRIES", 5000))
+MAX_BYTES = int(os.environ.get("RCT_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+MAX_AGE_SECONDS = int(os.environ.get("RCT_CACHE_MAX_AGE_DAYS", 30)) * 24 * 3600
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+def cache_key(model: str, prompt: str, text: str) -> str:
+    return hashlib.sha256(json.dumps([model, prompt, text]).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES, max_age: int = MAX_AGE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # WAL lets several Streamlit processes read while one writes
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _count(self, name: str):
+        self._conn.execute(
+            "INSERT INTO counters(name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, model: str, prompt: str, text: str):
+        key = cache_key(model, prompt, text)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            return row[0]
+
+    def put(self, model: str, prompt: str, text: str, response: str):
+        key = cache_key(model, prompt, text)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses(key, model, response, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        # Drop least recently used entries until both limits hold again
+        removed_entries, removed_size = 0, 0
+        stale = []
+        for key, entry_size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if entries - removed_entries <= self.max_entries and size - removed_size <= self.max_bytes:
+                break
+            stale.append((key,))
+            removed_entries += 1
+            removed_size += entry_size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM counters")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+    return _cache
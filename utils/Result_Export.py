@@ -0,0 +1,91 @@
+import json, os, tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.Comparison import EXPORT_COLUMNS
+
+FORMATS = {
+    "CSV": ("comparison_outputs.csv", "text/csv"),
+    "Parquet": ("comparison_outputs.parquet", "application/vnd.apache.parquet"),
+    "JSONL": ("comparison_outputs.jsonl", "application/x-ndjson"),
+}
+
+NUMERIC_COLUMNS = {
+    "Number": pa.int64(),
+    "Seconds": pa.float64(),
+    "Queue Seconds": pa.float64(),
+    "Model Load Seconds": pa.float64(),
+    "Input Tokens": pa.int64(),
+    "Output Tokens": pa.int64(),
+}
+SCHEMA = pa.schema([(column, NUMERIC_COLUMNS.get(column, pa.string())) for column in EXPORT_COLUMNS])
+
+def format_for(path: str) -> str:
+    # Format from the file extension; anything unrecognized is CSV
+    return {".parquet": "Parquet", ".jsonl": "JSONL"}.get(os.path.splitext(path)[1].lower(), "CSV")
+
+def export_row(record: dict, number: int) -> dict:
+    row = {column: record.get(column) for column in EXPORT_COLUMNS}
+    row["Number"] = number
+    return row
+
+def write_rows(chunks, f, fmt: str, header: bool = True):
+    # chunks: an iterable of lists of export rows, written to the binary file f
+    # one chunk at a time
+    if fmt == "Parquet":
+        with pq.ParquetWriter(f, SCHEMA) as writer:
+            for rows in chunks:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=SCHEMA))
+        return
+    for rows in chunks:
+        if fmt == "JSONL":
+            f.write("".join(json.dumps(row) + "\n" for row in rows).encode())
+        else:
+            f.write(pd.DataFrame(rows, columns=EXPORT_COLUMNS).to_csv(index=False, header=header).encode())
+            header = False
+    if fmt == "CSV" and header:
+        f.write(pd.DataFrame(columns=EXPORT_COLUMNS).to_csv(index=False).encode())
+
+class ResultExport:
+    # Download files for the results in a ResultsStore (one session, or all).
+    # Files are spooled to disk and nothing is serialized until a download is
+    # asked for; CSV and JSONL then only append the results added since the
+    # last download. Parquet files cannot be appended to, so they are rewritten.
+    def __init__(self, store, session: str = None):
+        self.store = store
+        self.session = session
+        self._dir = tempfile.TemporaryDirectory(prefix="rct-export-")
+        self._written = {}
+
+    def path(self, fmt: str) -> str:
+        # The up-to-date file for fmt
+        path = os.path.join(self._dir.name, fmt)
+        last_id, written = self._written.get(fmt, (0, 0))
+        if os.path.exists(path) and self.store.last_id(self.session) == last_id:
+            return path
+        if fmt == "Parquet":
+            last_id, written = 0, 0
+        state = {"last_id": last_id, "number": written}
+
+        def chunks():
+            for records in self.store.iter_records(self.session, last_id):
+                rows = []
+                for record in records:
+                    state["number"] += 1
+                    state["last_id"] = record["ID"]
+                    rows.append(export_row(record, state["number"]))
+                yield rows
+
+        with open(path, "ab" if written else "wb") as f:
+            write_rows(chunks(), f, fmt, header=not written)
+        self._written[fmt] = (state["last_id"], state["number"])
+        return path
+
+    def data(self, fmt: str) -> bytes:
+        with open(self.path(fmt), "rb") as f:
+            return f.read()
+
+def write_records(records: list, path: str):
+    # records: (number, record) pairs, e.g. batch.py's finished rows
+    with open(path, "wb") as f:
+        write_rows([[export_row(record, number) for number, record in records]], f, format_for(path))
@@ -0,0 +1,205 @@
+import hashlib, os, sqlite3, threading, time
+
+RESULTS_PATH = os.environ.get("RCT_RESULTS_PATH", os.path.join("results", "results.sqlite"))
+
+# Prompts, notes and outputs are stored once in texts, keyed by their sha256,
+# and referenced from result rows: the multi-agent prompt is mostly identical
+# from run to run and would otherwise be copied into every row.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS texts (
+    hash TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    created REAL NOT NULL,
+    model TEXT NOT NULL,
+    output_style TEXT NOT NULL,
+    agent_style TEXT NOT NULL,
+    prompt TEXT NOT NULL REFERENCES texts(hash),
+    resident_note TEXT NOT NULL REFERENCES texts(hash),
+    attending_note TEXT NOT NULL REFERENCES texts(hash),
+    output TEXT NOT NULL REFERENCES texts(hash),
+    seconds REAL,
+    queue_seconds REAL,
+    model_load_seconds REAL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    call_timings TEXT,
+    exam_type TEXT,
+    difference_rows TEXT REFERENCES texts(hash),
+    cached_tokens INTEGER,
+    memo_hits INTEGER,
+    memo_lookups INTEGER,
+    triage_model TEXT,
+    escalated_categories INTEGER,
+    triage_categories INTEGER,
+    escalated_sections INTEGER,
+    triage_sections INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_session ON results(session, id);
+'''
+
+# Record key -> column; TEXT_FIELDS are stored by hash. Per-call details
+# (retries, hedging, prefill) are kept in call_timings.
+VALUE_FIELDS = {
+    "Model": "model",
+    "Output Style": "output_style",
+    "Single or Multi-Agent": "agent_style",
+    "Seconds": "seconds",
+    "Queue Seconds": "queue_seconds",
+    "Model Load Seconds": "model_load_seconds",
+    "Input Tokens": "input_tokens",
+    "Output Tokens": "output_tokens",
+    "Call Timings": "call_timings",
+    "Exam Type": "exam_type",
+    "Cached Tokens": "cached_tokens",
+    "Memo Hits": "memo_hits",
+    "Memo Lookups": "memo_lookups",
+    "Triage Model": "triage_model",
+    "Escalated Categories": "escalated_categories",
+    "Triage Categories": "triage_categories",
+    "Escalated Sections": "escalated_sections",
+    "Triage Sections": "triage_sections",
+}
+TEXT_FIELDS = {"Prompt": "prompt", "Resident Note": "resident_note", "Attending Note": "attending_note", "Output": "output",
+               "Difference Rows": "difference_rows"}
+# Columns added since the first release, for databases created before them
+ADDED_COLUMNS = {
+    "exam_type": "TEXT", "difference_rows": "TEXT REFERENCES texts(hash)", "cached_tokens": "INTEGER",
+    "memo_hits": "INTEGER", "memo_lookups": "INTEGER", "triage_model": "TEXT", "escalated_categories": "INTEGER",
+    "triage_categories": "INTEGER", "escalated_sections": "INTEGER", "triage_sections": "INTEGER",
+}
+
+RECORD_QUERY = (
+    "SELECT r.id, " + ", ".join(f"r.{column}" for column in VALUE_FIELDS.values()) + ", "
+    + ", ".join(f"(SELECT body FROM texts WHERE hash = r.{column})" for column in TEXT_FIELDS.values())
+    + " FROM results r"
+)
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ResultsStore:
+    def __init__(self, path: str = RESULTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # WAL lets every Streamlit session (and process) read while one writes
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE results ADD COLUMN {column} {definition}")
+
+    def _scope(self, session: str) -> tuple:
+        return ("WHERE session = ?", (session,)) if session else ("", ())
+
+    def add(self, record: dict, session: str) -> int:
+        texts = {column: str(record.get(key) or "") for key, column in TEXT_FIELDS.items()}
+        hashes = {column: text_hash(text) for column, text in texts.items()}
+        values = {column: record.get(key) for key, column in VALUE_FIELDS.items()}
+        columns = ["session", "created"] + list(values) + list(hashes)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO texts(hash, body) VALUES (?, ?)",
+                    [(hashes[column], text) for column, text in texts.items()],
+                )
+                cursor = self._conn.execute(
+                    f"INSERT INTO results({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [session, time.time()] + list(values.values()) + list(hashes.values()),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.lastrowid
+
+    def count(self, session: str = None) -> int:
+        where, params = self._scope(session)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM results {where}", params).fetchone()[0]
+
+    def last_id(self, session: str = None) -> int:
+        where, params = self._scope(session)
+        with self._lock:
+            return self._conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM results {where}", params).fetchone()[0]
+
+    def page(self, session: str = None, offset: int = 0, limit: int = 20) -> list:
+        # Newest first, with short previews instead of the full texts
+        where, params = self._scope(session)
+        with self._lock:
+            rows = self._conn.execute(
+                f'''SELECT r.id, r.created, r.model, r.output_style, r.agent_style, r.seconds, r.input_tokens, r.output_tokens,
+                           (SELECT substr(body, 1, 80) FROM texts WHERE hash = r.resident_note),
+                           (SELECT substr(body, 1, 120) FROM texts WHERE hash = r.output)
+                    FROM results r {where} ORDER BY r.id DESC LIMIT ? OFFSET ?''',
+                params + (limit, offset),
+            ).fetchall()
+        return [
+            {"ID": row[0], "Created": time.strftime("%Y-%m-%d %H:%M", time.localtime(row[1])), "Model": row[2],
+             "Output Style": row[3], "Single or Multi-Agent": row[4], "Seconds": row[5],
+             "Input Tokens": row[6], "Output Tokens": row[7], "Resident Note": row[8], "Output": row[9]}
+            for row in rows
+        ]
+
+    def _record(self, row: tuple) -> dict:
+        keys = ["ID"] + list(VALUE_FIELDS) + list(TEXT_FIELDS)
+        return dict(zip(keys, row))
+
+    def get(self, result_id: int) -> dict:
+        with self._lock:
+            row = self._conn.execute(RECORD_QUERY + " WHERE r.id = ?", (result_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def iter_records(self, session: str = None, after_id: int = 0, chunk_size: int = 200):
+        # Full records in id order, a chunk at a time so exports never hold
+        # the whole history in memory
+        condition = "WHERE r.id > ?" + (" AND r.session = ?" if session else "")
+        while True:
+            params = (after_id, session) if session else (after_id,)
+            with self._lock:
+                rows = self._conn.execute(f"{RECORD_QUERY} {condition} ORDER BY r.id LIMIT ?", params + (chunk_size,)).fetchall()
+            if not rows:
+                return
+            yield [self._record(row) for row in rows]
+            after_id = rows[-1][0]
+
+    def iter_differences(self, after_id: int = 0, chunk_size: int = 2000):
+        # What Analytics_Store needs from each result after after_id, in id
+        # order, without the prompt and report texts
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    '''SELECT r.id, r.session, r.created, r.model, r.output_style, r.agent_style, r.exam_type,
+                              (SELECT body FROM texts WHERE hash = r.difference_rows),
+                              CASE WHEN r.difference_rows IS NULL AND r.output_style = 'Table Output'
+                                   THEN (SELECT body FROM texts WHERE hash = r.output) END
+                       FROM results r WHERE r.id > ? ORDER BY r.id LIMIT ?''',
+                    (after_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            # Results stored before difference_rows existed fall back to their table output
+            yield [
+                {"ID": row[0], "Session": row[1], "Created": row[2], "Model": row[3], "Output Style": row[4],
+                 "Single or Multi-Agent": row[5], "Exam Type": row[6], "Difference Rows": row[7] if row[7] is not None else row[8]}
+                for row in rows
+            ]
+            after_id = rows[-1][0]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_results_store() -> ResultsStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore()
+    return _store
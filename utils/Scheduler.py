@@ -0,0 +1,200 @@
+import asyncio, os, time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from utils.Backend_Clients import run_sync
+from utils.Call_Stats import record_queue
+from utils.Ollama_Pool import get_ollama_pool, HOST_CONCURRENCY
+
+# Process-wide admission control in front of the model backends. Every
+# Streamlit session shares this process and the backend event loop, so one
+# scheduler sees all of their calls: each model gets a fixed number of calls
+# in flight, waiting calls are served round-robin between sessions (FIFO
+# within a session), and comparisons that could not start within
+# MAX_WAIT_SECONDS are turned away up front instead of piling onto the GPU.
+# Ollama limits are per host in the Ollama_Pool, so adding hosts adds slots
+OLLAMA_CONCURRENCY = HOST_CONCURRENCY
+OPENAI_CONCURRENCY = int(os.environ.get("RCT_OPENAI_CONCURRENCY", 16))
+# Per-model overrides (per host for Ollama), e.g. "deepseek-r1:70b=1,gemma3:27b=4"
+MODEL_CONCURRENCY = {
+    model.strip(): int(limit)
+    for model, _, limit in (item.rpartition("=") for item in os.environ.get("RCT_MODEL_CONCURRENCY", "").split(",") if "=" in item)
+}
+MAX_QUEUED_CALLS = int(os.environ.get("RCT_MAX_QUEUED_CALLS", 48))
+MAX_WAIT_SECONDS = float(os.environ.get("RCT_MAX_WAIT_SECONDS", 600))
+STATUS_INTERVAL = 1.0
+
+_job = ContextVar("scheduler_job", default=("default", None))
+
+class SchedulerBusy(RuntimeError):
+    pass
+
+class ModelQueue:
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        # session -> waiting futures; the first session is served next
+        self.waiting = OrderedDict()
+        self.mean_seconds = None
+
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self.waiting.values())
+
+    def observe(self, seconds: float):
+        # Moving average of how long a call holds its slot, for ETAs
+        self.mean_seconds = seconds if self.mean_seconds is None else 0.8 * self.mean_seconds + 0.2 * seconds
+
+    def ahead_of(self, session: str, future) -> int:
+        # Calls served before this one under round-robin between sessions
+        waiters = self.waiting.get(session, ())
+        if future not in waiters:
+            return 0
+        index = waiters.index(future)
+        ahead = index
+        before = True
+        for other, queue in self.waiting.items():
+            if other == session:
+                before = False
+                continue
+            # Each other session gets index turns first, plus one more if it
+            # comes earlier in this round
+            ahead += min(len(queue), index + (1 if before else 0))
+        return ahead
+
+    def wait_estimate(self, ahead: int) -> float:
+        if self.mean_seconds is None:
+            return None
+        return (ahead // self.limit + 1) * self.mean_seconds
+
+class Scheduler:
+    def __init__(self):
+        self._queues = {}
+
+    def limit_for(self, model: str, use_ollama: bool) -> int:
+        if use_ollama:
+            return MODEL_CONCURRENCY.get(model, OLLAMA_CONCURRENCY) * max(1, get_ollama_pool().healthy_count())
+        return MODEL_CONCURRENCY.get(model, OPENAI_CONCURRENCY)
+
+    def _queue(self, model: str, use_ollama: bool) -> ModelQueue:
+        if model not in self._queues:
+            self._queues[model] = ModelQueue(self.limit_for(model, use_ollama))
+        # Follows Ollama hosts going down and coming back
+        self._queues[model].limit = max(1, self.limit_for(model, use_ollama))
+        return self._queues[model]
+
+    def admit(self, model: str, use_ollama: bool, calls: int):
+        # Early rejection: raise rather than queue work that cannot start in time
+        queue = self._queue(model, use_ollama)
+        queued = queue.queued()
+        if queue.active + queued < queue.limit:
+            return
+        if queued + calls > MAX_QUEUED_CALLS:
+            raise SchedulerBusy(f"{model} is busy ({queued} calls already waiting). Please try again in a few minutes.")
+        wait = queue.wait_estimate(queued + calls)
+        if wait is not None and wait > MAX_WAIT_SECONDS:
+            raise SchedulerBusy(f"{model} is busy (about {wait / 60:.0f} min of queued work). Please try again later.")
+
+    def has_capacity(self, model: str, use_ollama: bool) -> bool:
+        # True if slot() would start right away
+        queue = self._queue(model, use_ollama)
+        return queue.active < queue.limit and not queue.waiting
+
+    @asynccontextmanager
+    async def slot(self, model: str, use_ollama: bool):
+        queue = self._queue(model, use_ollama)
+        session, on_status = _job.get()
+        queued_at = time.perf_counter()
+        if self.has_capacity(model, use_ollama):
+            queue.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            queue.waiting.setdefault(session, deque()).append(future)
+            try:
+                while not future.done():
+                    if on_status is not None:
+                        ahead = queue.ahead_of(session, future)
+                        on_status(future, {"model": model, "position": ahead + 1, "eta": queue.wait_estimate(ahead)})
+                    try:
+                        await asyncio.wait_for(asyncio.shield(future), STATUS_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self._release(queue)
+                else:
+                    future.cancel()
+                    self._forget(queue, session, future)
+                raise
+            finally:
+                if on_status is not None:
+                    on_status(future, None)
+        record_queue(time.perf_counter() - queued_at)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            queue.observe(time.perf_counter() - start)
+            self._release(queue)
+
+    def _forget(self, queue: ModelQueue, session: str, future):
+        waiters = queue.waiting.get(session)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del queue.waiting[session]
+
+    def _release(self, queue: ModelQueue):
+        # Hand the slot straight to the next session's oldest call
+        while queue.waiting:
+            session, waiters = next(iter(queue.waiting.items()))
+            future = waiters.popleft()
+            if waiters:
+                queue.waiting.move_to_end(session)
+            else:
+                del queue.waiting[session]
+            if not future.done():
+                future.set_result(None)
+                return
+        queue.active -= 1
+
+    async def queue_state(self) -> dict:
+        # snapshot() for code running on the backend loop
+        return {
+            model: {"limit": queue.limit, "running": queue.active, "queued": queue.queued(), "mean_seconds": queue.mean_seconds}
+            for model, queue in self._queues.items()
+        }
+
+    def snapshot(self) -> dict:
+        # Safe to call from the Streamlit thread
+        return run_sync(self.queue_state())
+
+@contextmanager
+def scheduler_job(session: str = None, on_status=None):
+    # Tags the calls made inside with a session (for fairness). While any of
+    # them waits, on_status receives {"model", "position", "eta", "waiting"}
+    # for the one nearest the front (eta is None until a call has finished);
+    # None once none are waiting.
+    waiting = {}
+
+    def report(key, status):
+        if status is None:
+            waiting.pop(key, None)
+        else:
+            waiting[key] = status
+        if waiting:
+            on_status({**min(waiting.values(), key=lambda item: item["position"]), "waiting": len(waiting)})
+        else:
+            on_status(None)
+
+    token = _job.set((session or "default", report if on_status is not None else None))
+    try:
+        yield
+    finally:
+        _job.reset(token)
+
+_scheduler = Scheduler()
+
+def get_scheduler() -> Scheduler:
+    return _scheduler
@@ -0,0 +1,114 @@
+import hashlib, json, os, sqlite3, threading, time
+from utils.Report_Sections import format_sections, heading_tokens, normalize_text
+
+MEMO_PATH = os.environ.get("RCT_MEMO_PATH", os.path.join(".cache", "section_memo.sqlite"))
+# Bump when parsing changes what a stored verdict means
+MEMO_VERSION = 1
+
+# Category verdicts per aligned section group. Reports reuse boilerplate, so
+# the same resident/attending section pair turns up in many reports; once a
+# category agent has judged it, the rows it produced for that group (often
+# none) are reused instead of sending the group again. Keys are normalized
+# the same way prune_sections compares sections.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS verdicts (
+    key TEXT PRIMARY KEY,
+    rows TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+def memo_key(group: tuple, category: int, model: str, prompt: str) -> str:
+    # group: (resident_sections, attending_sections) from Report_Sections.diff_reports
+    resident, attending = group
+    prompt_version = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(json.dumps([
+        MEMO_VERSION, normalize_text(format_sections(resident)), normalize_text(format_sections(attending)),
+        category, model, prompt_version,
+    ]).encode("utf-8")).hexdigest()
+
+def assign_rows(rows: list, groups: list) -> list:
+    # Splits one call's rows (COLUMNS order) between the section groups it was
+    # sent, by section heading and failing that by quoted text. Returns one row
+    # list per group, or None if any row cannot be placed.
+    if len(groups) == 1:
+        return [list(rows)]
+    tokens = [
+        set().union(*(heading_tokens(name) for name, _ in resident + attending)) - {""}
+        for resident, attending in groups
+    ]
+    texts = [normalize_text(format_sections(resident) + " " + format_sections(attending)) for resident, attending in groups]
+    assigned = [[] for _ in groups]
+    for row in rows:
+        section = heading_tokens(str(row[0])) - {""}
+        matches = [i for i, group_tokens in enumerate(tokens) if section & group_tokens]
+        if len(matches) != 1:
+            quotes = [normalize_text(str(text)) for text in row[1:3] if str(text).strip() and str(text).strip().lower() != "none"]
+            matches = [i for i, text in enumerate(texts) if quotes and all(quote in text for quote in quotes)]
+        if len(matches) != 1:
+            return None
+        assigned[matches[0]].append(row)
+    return assigned
+
+class SectionMemo:
+    def __init__(self, path: str = MEMO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _count(self, name: str, value: int):
+        self._conn.execute(
+            "INSERT INTO counters(name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def get_many(self, keys: list) -> dict:
+        # key -> stored rows, for the keys that have a verdict
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # SQLite limits the number of ? parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                query = f"SELECT key, rows FROM verdicts WHERE key IN ({', '.join('?' * len(batch))})"
+                found.update((key, json.loads(rows)) for key, rows in self._conn.execute(query, batch))
+            self._count("hits", len(found))
+            self._count("misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, verdicts: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO verdicts(key, rows, created) VALUES (?, ?, ?)",
+                [(key, json.dumps(rows), now) for key, rows in verdicts.items()],
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM verdicts")
+            self._conn.execute("DELETE FROM counters")
+
+_memo = None
+_memo_lock = threading.Lock()
+
+def get_section_memo() -> SectionMemo:
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = SectionMemo()
+    return _memo
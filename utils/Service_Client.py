@@ -0,0 +1,82 @@
+import json, os
+import requests
+from utils.Backend_Clients import get_service_client, run_sync
+from utils.Comparison_API import run_compare, warm_up as warm_up_local, backend_state as backend_state_local, cache_stats as cache_stats_local, RequestError
+from utils.Ollama_Agent import KEEP_ALIVE
+from utils.Scheduler import get_scheduler, SchedulerBusy
+
+# How the Streamlit page runs comparisons: through the comparison service at
+# RCT_SERVICE_URL (service.py) if set, else in this process. Either way the
+# page sends the same request and gets the same {"record", "rows"} back, and
+# the warm-up, Ollama host and response cache state it shows are that
+# process's too.
+SERVICE_URL = os.environ.get("RCT_SERVICE_URL", "").rstrip("/")
+STATUS_TIMEOUT = 5
+
+def service_error(response) -> Exception:
+    try:
+        message = response.json()["error"]
+    except (ValueError, KeyError, TypeError):
+        message = response.text or response.reason_phrase
+    if response.status_code == 503:
+        return SchedulerBusy(message)
+    if response.status_code == 400:
+        return RequestError(message)
+    return RuntimeError(f"comparison service: {response.status_code} {message}")
+
+async def compare(body: dict, emit) -> dict:
+    # Runs a compare request; emit receives its status/text updates. Raises
+    # SchedulerBusy if the model's queue is full. Run on the backend loop.
+    if not SERVICE_URL:
+        return await run_compare(body, emit)
+    async with get_service_client().stream("POST", SERVICE_URL + "/compare", json={**body, "stream": True}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise service_error(response)
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event["event"] == "result":
+                return event["data"]
+            if event["event"] == "error":
+                raise RuntimeError(f"comparison service: {event['data']['message']}")
+            emit((event["event"], event["data"]))
+    raise RuntimeError("comparison service: the stream ended without a result")
+
+def get_state(path: str):
+    # A GET endpoint of the service; None if it cannot be reached
+    try:
+        response = requests.get(SERVICE_URL + path, timeout=STATUS_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return None
+
+def queue_state() -> dict:
+    # Scheduler.snapshot() of whichever process runs the comparisons; None if
+    # the service cannot be reached
+    if not SERVICE_URL:
+        return get_scheduler().snapshot()
+    return get_state("/queue")
+
+def backend_state() -> dict:
+    # {"resident_models", "unreachable"} (Comparison_API.backend_state)
+    if not SERVICE_URL:
+        return run_sync(backend_state_local())
+    return get_state("/backends")
+
+def cache_stats() -> dict:
+    if not SERVICE_URL:
+        return cache_stats_local()
+    return get_state("/cache")
+
+def warm_up(model: str, ollama_options: dict = None):
+    # Best effort: the comparison loads the model anyway
+    body = {"model": model, "ollama_options": ollama_options}
+    if not SERVICE_URL:
+        return warm_up_local(body)
+    try:
+        requests.post(SERVICE_URL + "/warm-up", json=body, timeout=STATUS_TIMEOUT)
+    except requests.RequestException:
+        pass
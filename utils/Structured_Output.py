@@ -0,0 +1,49 @@
+import json
+import pandas as pd
+from pydantic import BaseModel, ValidationError
+from utils.Report_Parsing import COLUMNS
+
+class DifferenceRow(BaseModel):
+    section: str
+    resident_report: str
+    attending_report: str
+    # 1-7; kept unconstrained since strict OpenAI schemas reject minimum/maximum
+    difference_type: int
+    explanation: str
+
+class DifferenceTable(BaseModel):
+    rows: list[DifferenceRow]
+
+# JSON schema for Ollama's "format" field
+DIFFERENCE_SCHEMA = DifferenceTable.model_json_schema()
+
+class CategoryTriage(BaseModel):
+    # 1-7
+    category: int
+    # 0-100: how likely the attending made at least one change of this category
+    likelihood: int
+    # Numbers of the (numbered) sections holding such changes
+    sections: list[int]
+
+class TriageResult(BaseModel):
+    categories: list[CategoryTriage]
+
+def parse_structured(response: str, output_type=DifferenceTable):
+    # Raises ValueError (pydantic's ValidationError or json's JSONDecodeError)
+    # when the reply is not a valid document
+    try:
+        return output_type.model_validate_json(response)
+    except ValidationError:
+        # Some models still wrap the JSON; retry on the outermost object
+        start, end = response.find("{"), response.rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return output_type.model_validate(json.loads(response[start:end + 1]))
+
+def structured2df(response: str) -> pd.DataFrame:
+    # Map the fused agent's JSON onto the multi-agent table columns
+    table = parse_structured(response)
+    return pd.DataFrame(
+        [[row.section, row.resident_report, row.attending_report, str(row.difference_type), row.explanation] for row in table.rows if 1 <= row.difference_type <= 7],
+        columns=COLUMNS,
+    )
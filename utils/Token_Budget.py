@@ -0,0 +1,100 @@
+import os
+from functools import lru_cache
+from utils.Report_Sections import parse_sections, align_sections, format_sections
+from utils.Prompt_Layout import layout_overhead
+
+try:
+    import tiktoken
+except ImportError:  # optional; falls back to a character estimate
+    tiktoken = None
+
+# Maximum context each model supports
+CONTEXT_WINDOW = {
+    "deepseek-r1:70b": 131072,
+    "llama3.3:latest": 131072,
+    "llama3.2-vision:90b": 131072,
+    "gemma3:27b": 131072,
+    "gpt-4.1": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4o-mini": 128000,
+}
+# Context we are willing to use per call: larger Ollama contexts cost KV memory
+# and prefill time, so inputs beyond this are split by section instead
+CALL_BUDGET = {
+    "ollama": int(os.environ.get("RCT_OLLAMA_TOKEN_BUDGET", 16384)),
+    "openai": int(os.environ.get("RCT_OPENAI_TOKEN_BUDGET", 32768)),
+}
+# Tokens kept free for the answer; reasoning models spend extra on <think>
+OUTPUT_RESERVE = {"deepseek-r1:70b": 4096}
+DEFAULT_OUTPUT_RESERVE = 2048
+# Smallest num_ctx we request, and the one models are preloaded with: it fits the
+# default prompts plus a typical report pair. Ollama reloads a model whenever
+# num_ctx changes, so sizes only grow in powers of two from here.
+DEFAULT_CONTEXT = 8192
+CHARS_PER_TOKEN = 3.5
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    # Exact for OpenAI models when tiktoken is installed; otherwise a slightly
+    # pessimistic estimate (clinical text tokenizes worse than prose)
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def prompt_tokens(prompt: str, model: str) -> int:
+    # The prompt plus whatever the prompt layout sends around it
+    return count_tokens(prompt, model) + count_tokens(layout_overhead(), model)
+
+def call_budget(model: str, use_ollama: bool) -> int:
+    limit = CALL_BUDGET["ollama" if use_ollama else "openai"]
+    return min(limit, CONTEXT_WINDOW.get(model, limit))
+
+def output_reserve(model: str) -> int:
+    return OUTPUT_RESERVE.get(model, DEFAULT_OUTPUT_RESERVE)
+
+def context_size(prompts: list, texts: list, model: str) -> int:
+    # One num_ctx for every call of a comparison, large enough for the longest
+    # prompt with the longest chunk
+    needed = max(prompt_tokens(prompt, model) for prompt in prompts) + max(count_tokens(text, model) for text in texts) + output_reserve(model)
+    size = DEFAULT_CONTEXT
+    while size < needed:
+        size *= 2
+    return min(size, CONTEXT_WINDOW.get(model, size))
+
+def fits(prompt: str, text: str, model: str, use_ollama: bool) -> bool:
+    needed = prompt_tokens(prompt, model) + count_tokens(text, model) + output_reserve(model)
+    return needed <= call_budget(model, use_ollama)
+
+def chunk_reports(resident_text: str, attending_text: str, prompt: str, model: str, use_ollama: bool, build_text) -> list:
+    # Split an over-budget report pair into texts that each fit the call budget.
+    # Aligned sections stay together so every chunk compares like with like.
+    text = build_text(resident_text, attending_text)
+    if fits(prompt, text, model, use_ollama):
+        return [text]
+
+    available = call_budget(model, use_ollama) - prompt_tokens(prompt, model) - output_reserve(model) - count_tokens(build_text("", ""), model)
+    chunks, resident_chunk, attending_chunk, used = [], [], [], 0
+    for resident, attending in align_sections(parse_sections(resident_text), parse_sections(attending_text)):
+        size = count_tokens(format_sections(resident), model) + count_tokens(format_sections(attending), model)
+        if resident_chunk or attending_chunk:
+            if used + size > available:
+                chunks.append(build_text(format_sections(resident_chunk), format_sections(attending_chunk)))
+                resident_chunk, attending_chunk, used = [], [], 0
+        # A single section larger than the budget is still sent whole; splitting
+        # mid-section would hide the change from the agent
+        resident_chunk += resident
+        attending_chunk += attending
+        used += size
+    if resident_chunk or attending_chunk:
+        chunks.append(build_text(format_sections(resident_chunk), format_sections(attending_chunk)))
+    return chunks
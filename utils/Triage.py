@@ -0,0 +1,70 @@
+import os
+from utils.Agent_Runner import extract_chunks
+from utils.Report_Sections import format_sections
+from utils.Structured_Output import TriageResult, parse_structured
+from utils.Token_Budget import fits, context_size
+from utils.Prompts import TRIAGE_PROMPT
+
+# Cascade mode for the Multi-Agent style: before the category agents run, a
+# fast triage model rates how likely each category's changes are and names the
+# changed sections holding them. Only categories rated at or above their
+# escalation threshold go to the selected model, and only with those sections;
+# the rest count as having no differences. Whatever the triage cannot answer
+# (a failed call, unreadable JSON, reports over its context) is escalated.
+TRIAGE_THRESHOLD = int(os.environ.get("RCT_TRIAGE_THRESHOLD", "20"))
+# The triage model when none is given, by the selected model's backend
+DEFAULT_TRIAGE_MODEL = {"ollama": "gemma3:27b", "openai": "gpt-4.1-mini"}
+
+def number_groups(groups: list) -> tuple:
+    # (resident text, attending text) with the aligned section groups numbered
+    # alike, "[1] Liver: ..."; a group missing from one report says so
+    def side(index: int) -> str:
+        return "\n\n".join(f"[{n}] {format_sections(group[index]) or '(not in this report)'}" for n, group in enumerate(groups, start=1))
+    return side(0), side(1)
+
+def parse_triage(response: str) -> dict:
+    # {category: (likelihood, section numbers)}; None if the reply is unreadable
+    try:
+        result = parse_structured(response, TriageResult)
+    except ValueError:
+        return None
+    return {item.category: (item.likelihood, item.sections) for item in result.categories}
+
+def escalations(ratings: dict, categories: list, count: int, thresholds: dict = None) -> dict:
+    # {category: indices of the section groups to send}, [] for a category
+    # that is not escalated. A category the triage left out, or escalated
+    # without naming a valid section, gets every group.
+    thresholds = thresholds or {}
+    plan = {}
+    for category in categories:
+        if category not in ratings:
+            plan[category] = list(range(count))
+            continue
+        likelihood, sections = ratings[category]
+        if likelihood < thresholds.get(category, TRIAGE_THRESHOLD):
+            plan[category] = []
+            continue
+        plan[category] = sorted({n - 1 for n in sections if 1 <= n <= count}) or list(range(count))
+    return plan
+
+async def triage_reports(text: str, count: int, categories: list, model: str, use_ollama: bool, thresholds: dict = None,
+                         use_cache: bool = True, ollama_options: dict = None) -> dict:
+    # text holds the count changed section groups, numbered by number_groups.
+    # Returns escalations() for the categories.
+    if not count:
+        # Identical reports: nothing for any agent to find
+        return {category: [] for category in categories}
+    everything = {category: list(range(count)) for category in categories}
+    if not fits(TRIAGE_PROMPT, text, model, use_ollama):
+        return everything
+    if use_ollama and not (ollama_options or {}).get("num_ctx"):
+        ollama_options = {**(ollama_options or {}), "num_ctx": context_size([TRIAGE_PROMPT], [text], model)}
+    try:
+        response = await extract_chunks(TRIAGE_PROMPT, [text], model, use_ollama, use_cache, TriageResult, ollama_options, label="Triage")
+    except Exception:
+        # The agents run as if there were no triage
+        return everything
+    ratings = parse_triage(response)
+    if ratings is None:
+        return everything
+    return escalations(ratings, categories, count, thresholds)